@@ -1,12 +1,17 @@
+from functools import cached_property
 from pathlib import Path
-from typing import Optional
+from typing import Any, Literal, Optional
 
 from litestar.stores.redis import RedisStore
-from pydantic import AmqpDsn, PostgresDsn, field_validator
+from pydantic import AmqpDsn, PositiveInt, PostgresDsn, field_validator
 from pydantic_core.core_schema import FieldValidationInfo
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from redis.asyncio import Redis
-from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from redis.asyncio import BlockingConnectionPool, Redis
+from redis.exceptions import RedisError
+
+from app.utils.cache import RecordCache, ResponseCacheStore
+from app.utils.circuitbreaker import CircuitBreaker
+from app.utils.revocation import TokenRevocations
 
 
 class CurrentEnvType(BaseSettings):
@@ -26,12 +31,30 @@ class Database(CurrentEnvType):
     ECHO_POOL: bool
     POOL_MAX_OVERFLOW: int = 10
     POOL_SIZE: int = 5
-    POOL_TIMEOUT: int = 0
+    POOL_TIMEOUT: float = 30.0
+    """Seconds to wait for a pooled connection, at most until the request deadline."""
     POOL_PRE_PING: bool = True
 
-    POSTGRES_DATABASE_URI: Optional[str] = None
+    QUERY_STATS_ENABLED: bool = True
+    """Count queries per request, for ``Server-Timing`` and the logs."""
+    QUERY_STATS_ENFORCE_BUDGETS: bool = False
+    """Fail requests issuing more queries than their ``query_budget``."""
+
+    REPLICA_URIS: list[str] = []
+    """Read replicas as a JSON list of URLs, GET routes and auth lookups use them."""
+    REPLICA_SELECTION: Literal["round_robin", "least_busy"] = "round_robin"
+    REPLICA_MAX_LAG: float = 5.0
+    """Seconds of replication lag after which a replica is skipped."""
+    REPLICA_LAG_CHECK_INTERVAL: float = 2.0
+    READ_YOUR_WRITES_WINDOW: int = 5
+    """Seconds a client keeps reading from the primary after it wrote."""
+
+    MIGRATION_LOCK_TIMEOUT: str = "3s"
+    """Longest wait of a migration for a table lock, requests queue behind it."""
+    MIGRATION_STATEMENT_TIMEOUT: str = "1min"
+    """Longest migration statement, concurrent index builds excepted."""
 
-    ENGINE: Optional[AsyncEngine] = None
+    POSTGRES_DATABASE_URI: Optional[str] = None
 
     # MIGRATIONS_CONFIG: str = "app/database/migrations/alembic.ini"
     # MIGRATIONS_PATH: str = "app/database/migrations"
@@ -55,22 +78,17 @@ class Database(CurrentEnvType):
             )
         )
 
-    @field_validator("ENGINE", mode="before")
-    @classmethod
-    def assemble_db_engine(
-        cls, v: Optional[AsyncEngine], info: FieldValidationInfo
-    ) -> AsyncEngine:
-        if isinstance(v, AsyncEngine):
-            return v
-        return create_async_engine(
-            url=info.data.get("POSTGRES_DATABASE_URI"),
-            echo=info.data.get("ECHO"),
-            echo_pool=info.data.get("ECHO_POOL"),
-            max_overflow=info.data.get("POOL_MAX_OVERFLOW"),
-            pool_size=info.data.get("POOL_SIZE"),
-            pool_timeout=info.data.get("POOL_TIMEOUT"),
-            pool_pre_ping=info.data.get("POOL_PRE_PING"),
-        )
+    @property
+    def engine_options(self) -> dict[str, Any]:
+        """``create_async_engine`` arguments of the primary and the replicas"""
+        return {
+            "echo": self.ECHO,
+            "echo_pool": self.ECHO_POOL,
+            "max_overflow": self.POOL_MAX_OVERFLOW,
+            "pool_size": self.POOL_SIZE,
+            "pool_timeout": self.POOL_TIMEOUT,
+            "pool_pre_ping": self.POOL_PRE_PING,
+        }
 
 
 class LogSettings(CurrentEnvType):
@@ -83,6 +101,8 @@ class LogSettings(CurrentEnvType):
     """Regex to exclude paths from logging."""
     HTTP_EVENT: str = "HTTP"
     """Log event name for logs from Litestar handlers."""
+    SQL_EVENT: str = "SQL"
+    """Log event name for per-request query statistics."""
     INCLUDE_COMPRESSED_BODY: bool = False
     """Include 'body' of compressed responses in log output."""
     LEVEL: int = 10
@@ -108,20 +128,108 @@ class LogSettings(CurrentEnvType):
 
 class RedisSettings(CurrentEnvType):
     REDIS_URL: str
+    REDIS_MAX_CONNECTIONS: Optional[int] = None
+    """Connection limit of the pool, callers wait for a free connection."""
+    REDIS_POOL_TIMEOUT: float = 5.0
+    """Seconds to wait for a connection once the limit is reached."""
+
+    CACHE_XFETCH_BETA: float = 1.0
+    """Eagerness to recompute cache entries before they expire, 0 disables it."""
+    CACHE_LOCK_TTL: Optional[float] = None
+    """Seconds of the Redis lock letting one worker recompute a missing entry."""
+    CACHE_WAIT_TIMEOUT: float = 5.0
+    """Seconds a miss waits for a concurrent recompute before computing itself."""
+    CACHE_TIMEOUT: float = 0.1
+    """Seconds a cache call may take, slower calls count as failures."""
+    CACHE_BREAKER_FAILURES: int = 5
+    """Consecutive failures after which the cache is skipped."""
+    CACHE_BREAKER_RECOVERY_TIME: float = 5.0
+    """Seconds the cache is skipped before a request probes Redis again."""
+    CACHE_RECORD_TTL: int = 60
+    """Seconds user records stay in the cache of the batch lookups."""
+    REVOCATION_FILTER_CAPACITY: int = 100_000
+    """Revoked tokens the Bloom filter of each worker is sized for."""
+    REVOCATION_FILTER_ERROR_RATE: float = 0.001
+    """Share of valid tokens the filter flags, each costs a Redis lookup."""
+    REVOCATION_REBUILD_INTERVAL: float = 300.0
+    """Seconds between rebuilds of the filter, dropping the expired tokens."""
 
     _instance: Redis | None = None
-    _store: RedisStore | None = None
+    _breaker: CircuitBreaker | None = None
+    _store: ResponseCacheStore | None = None
+    _records: RecordCache | None = None
+    _revocations: TokenRevocations | None = None
 
     @property
     def instance(self) -> Redis:
-        self._instance = RedisStore.with_client(url=self.REDIS_URL)._redis
+        if self._instance is not None:
+            return self._instance
+        if self.REDIS_MAX_CONNECTIONS is None:
+            self._instance = RedisStore.with_client(url=self.REDIS_URL)._redis
+        else:
+            self._instance = Redis(
+                connection_pool=BlockingConnectionPool.from_url(
+                    self.REDIS_URL,
+                    max_connections=self.REDIS_MAX_CONNECTIONS,
+                    timeout=self.REDIS_POOL_TIMEOUT,
+                )
+            )
         return self._instance
 
     @property
-    def store(self) -> RedisStore:
-        self._store = RedisStore(redis=self.instance, namespace="users")
+    def store(self) -> ResponseCacheStore:
+        if self._store is not None:
+            return self._store
+        self._store = ResponseCacheStore(
+            redis=self.instance,
+            namespace="users",
+            beta=self.CACHE_XFETCH_BETA,
+            lock_ttl=self.CACHE_LOCK_TTL,
+            wait_timeout=self.CACHE_WAIT_TIMEOUT,
+            breaker=self.breaker,
+        )
         return self._store
 
+    @property
+    def records(self) -> RecordCache:
+        if self._records is not None:
+            return self._records
+        self._records = RecordCache(
+            redis=self.instance,
+            namespace="users_records",
+            ttl=self.CACHE_RECORD_TTL,
+            breaker=self.breaker,
+        )
+        return self._records
+
+    @property
+    def revocations(self) -> TokenRevocations:
+        if self._revocations is not None:
+            return self._revocations
+        self._revocations = TokenRevocations(
+            redis=self.instance,
+            namespace="revoked_tokens",
+            capacity=self.REVOCATION_FILTER_CAPACITY,
+            error_rate=self.REVOCATION_FILTER_ERROR_RATE,
+            rebuild_interval=self.REVOCATION_REBUILD_INTERVAL,
+            breaker=self.breaker,
+        )
+        return self._revocations
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        """Breaker of the cache calls, shared by the response and record caches"""
+        if self._breaker is not None:
+            return self._breaker
+        self._breaker = CircuitBreaker(
+            "redis_cache",
+            failure_threshold=self.CACHE_BREAKER_FAILURES,
+            recovery_time=self.CACHE_BREAKER_RECOVERY_TIME,
+            timeout=self.CACHE_TIMEOUT,
+            exceptions=(RedisError, OSError),
+        )
+        return self._breaker
+
     # @field_validator("REDIS_URI", mode="before")
     # def assemble_db_connection(
     #     cls,  # noqa: N805
@@ -139,6 +247,134 @@ class RedisSettings(CurrentEnvType):
     #     )
 
 
+class RateLimitSettings(CurrentEnvType):
+    """Rate limits of the unauthenticated auth endpoints"""
+
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_IP_HEADER: Optional[str] = None
+    """Header the trusted proxies append the client address to, e.g. X-Forwarded-For."""
+    RATE_LIMIT_TRUSTED_PROXIES: PositiveInt = 1
+    """Trusted proxies in front of the API, the client address is taken this many
+    entries from the right of the header."""
+    RATE_LIMIT_LOGIN_PER_IP: int = 20
+    RATE_LIMIT_LOGIN_PER_USERNAME: int = 5
+    """Login attempts per username and window, whatever the client address."""
+    RATE_LIMIT_LOGIN_WINDOW: float = 60.0
+    """Seconds of the login sliding window."""
+    RATE_LIMIT_REGISTER_PER_IP: int = 10
+    RATE_LIMIT_REGISTER_PER_EMAIL: int = 3
+    RATE_LIMIT_REGISTER_WINDOW: float = 600.0
+    """Seconds of the registration sliding window."""
+    RATE_LIMIT_INTROSPECT_PER_IP: int = 120
+    """Introspection batches per client address and window."""
+    RATE_LIMIT_INTROSPECT_WINDOW: float = 60.0
+    RATE_LIMIT_REDIS_TIMEOUT: float = 0.25
+    """Seconds to wait for Redis before counting in the worker instead."""
+
+
+class DeadlineSettings(CurrentEnvType):
+    """Time limits of requests, propagated to Postgres, Redis and RabbitMQ"""
+
+    REQUEST_TIMEOUT: float = 10.0
+    """Seconds a request may take unless its route sets one, 0 disables it."""
+    REQUEST_TIMEOUT_HEADER: str = "X-Request-Timeout"
+    """Header with the seconds a client waits, it can only shorten the deadline."""
+    STATEMENT_TIMEOUT_ENABLED: bool = True
+    """Set the time left as ``statement_timeout`` of each transaction."""
+
+
+class ConcurrencySettings(CurrentEnvType):
+    """Adaptive in-flight limits per worker, requests over them get 503"""
+
+    CONCURRENCY_LIMIT_ENABLED: bool = True
+    CONCURRENCY_AUTH_LIMIT: int = 4
+    """Initial limit of the password hashing routes (login, registration)."""
+    CONCURRENCY_AUTH_MAX_LIMIT: int = 32
+    CONCURRENCY_READ_LIMIT: int = 50
+    CONCURRENCY_READ_MAX_LIMIT: int = 500
+    CONCURRENCY_WRITE_LIMIT: int = 20
+    CONCURRENCY_WRITE_MAX_LIMIT: int = 200
+    CONCURRENCY_TOLERANCE: float = 2.0
+    """Latency growth over the baseline tolerated before the limits shrink."""
+
+
+class UsersSettings(CurrentEnvType):
+    """User routes"""
+
+    USERS_BATCH_MAX_SIZE: int = 100
+    """Ids or emails a batch lookup may ask for at once."""
+
+
+class ServerSettings(CurrentEnvType):
+    """Process launcher and startup configuration"""
+
+    SERVER_HOST: str = "0.0.0.0"  # noqa: S104
+    SERVER_PORT: int = 80
+    SERVER_WORKERS: int = 0
+    """Worker processes, 0 starts one per CPU available to the container."""
+    DB_CONNECTION_BUDGET: int = 0
+    """Postgres connections (pool and overflow) shared by all workers.
+
+    0 keeps ``POOL_SIZE``/``POOL_MAX_OVERFLOW`` for every worker as they are.
+    """
+    REDIS_CONNECTION_BUDGET: int = 0
+    """Redis connections shared by all workers, 0 leaves the pools unbounded."""
+    WORKER_MAX_REQUESTS: int = 0
+    """Requests after which a worker is replaced, 0 never replaces it."""
+    WORKER_MAX_REQUESTS_JITTER: int = 0
+    """Random extra requests per worker, so they don't all restart at once."""
+    WORKER_MAX_MEMORY_MB: int = 0
+    """Resident memory after which a worker is replaced, 0 disables the check."""
+    WORKER_GRACEFUL_TIMEOUT: int = 30
+    """Seconds a retiring worker gets to finish its in-flight requests."""
+    WARMUP_ENABLED: bool = True
+    """Open connections and prime the hot paths before reporting ready."""
+
+
+class MetricsSettings(CurrentEnvType):
+    """Prometheus metrics configuration"""
+
+    METRICS_APP_NAME: str = "users-service"
+    """Value of the ``app_name`` label of HTTP metrics."""
+    METRICS_PATH: str = "/metrics"
+    """Path of the scrape endpoint, relative to the application path."""
+
+
+class CompressionSettings(CurrentEnvType):
+    """Negotiated response compression"""
+
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 500
+    """Bodies smaller than this many bytes are sent uncompressed."""
+    COMPRESSION_ENCODINGS: list[str] = ["zstd", "br", "gzip"]
+    """Preference order, brotli and zstd need the ``compression`` extra."""
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+
+
+class ProfilingSettings(CurrentEnvType):
+    """Sampling profiler configuration"""
+
+    PROFILING_ENABLED: bool = False
+    """Register the profiler; it is opt-in as the sampler thread costs CPU."""
+    PROFILING_INTERVAL: float = 0.01
+    """Seconds between samples of the continuous sampler."""
+    PROFILING_DEEP_INTERVAL: float = 0.001
+    """Seconds between samples while a per-request profile is running."""
+    PROFILING_MAX_OVERHEAD: float = 0.02
+    """Upper bound of the CPU time share spent sampling."""
+    PROFILING_MAX_STACKS: int = 10_000
+    """Distinct stacks kept per route."""
+    PROFILING_HEADER: str = "X-Profile"
+    """Request header which triggers a per-request profile (superusers only)."""
+    PROFILING_OUTPUT_DIR: Path = Path("/tmp/profiles")  # noqa: S108
+    PROFILING_OUTPUT_FORMAT: str = "speedscope"
+    """Format of per-request profiles: ``speedscope`` or ``collapsed``."""
+    PROFILING_MAX_REQUEST_PROFILES: int = 100
+    """Per-request profiles kept on disk, the oldest are removed first."""
+
+
 class AuthenticationSettings(CurrentEnvType):
     KEY_HEADER: str = "Authorization"
     TOKEN_TYPE: str = "bearer"
@@ -147,6 +383,15 @@ class AuthenticationSettings(CurrentEnvType):
     JWT_PRIVATE_KEY_PATH: Path
     JWT_PUBLIC_KEY_PATH: Path
     ALGORITHM: str = "RS256"
+    JWT_ADDITIONAL_PUBLIC_KEY_PATHS: list[Path] = []
+    """Public keys accepted and published next to the signing one, to rotate it:
+    the next key ahead of the switch, the previous one until its tokens expire."""
+    JWKS_MAX_AGE: int = 3600
+    """Seconds verifiers may cache the published keys."""
+    TOKEN_CACHE_SIZE: int = 10_000
+    """Verified access tokens each worker remembers until they expire."""
+    INTROSPECTION_BATCH_MAX_SIZE: int = 100
+    """Most tokens a single introspection request may carry."""
 
 
 class RabbitMQSettings(CurrentEnvType):
@@ -156,6 +401,15 @@ class RabbitMQSettings(CurrentEnvType):
     AMQP_PASSWORD: str
     AMQP_VHOST: str
 
+    AMQP_TIMEOUT: float = 2.0
+    """Seconds to connect or get a publish confirmed, slower counts as a failure."""
+    AMQP_BREAKER_FAILURES: int = 3
+    """Consecutive failures after which publishes fail fast."""
+    AMQP_BREAKER_RECOVERY_TIME: float = 10.0
+    """Seconds publishes fail fast before one probes RabbitMQ again."""
+    AMQP_BUFFER_SIZE: int = 1000
+    """Messages held while RabbitMQ is unavailable, the oldest are dropped first."""
+
     AMQP_BROKER_URI: Optional[str] = None
 
     @field_validator("AMQP_BROKER_URI", mode="before")
@@ -178,22 +432,54 @@ class RabbitMQSettings(CurrentEnvType):
 
 
 class Settings(CurrentEnvType):
-    @property
+    @cached_property
     def database(self) -> Database:
         return Database()
 
-    @property
+    @cached_property
     def logging(self) -> LogSettings:
         return LogSettings()
 
-    @property
+    @cached_property
     def redis(self) -> RedisSettings:
         return RedisSettings()
 
-    @property
+    @cached_property
+    def ratelimit(self) -> RateLimitSettings:
+        return RateLimitSettings()
+
+    @cached_property
+    def deadline(self) -> DeadlineSettings:
+        return DeadlineSettings()
+
+    @cached_property
+    def concurrency(self) -> ConcurrencySettings:
+        return ConcurrencySettings()
+
+    @cached_property
+    def users(self) -> UsersSettings:
+        return UsersSettings()
+
+    @cached_property
+    def server(self) -> ServerSettings:
+        return ServerSettings()
+
+    @cached_property
+    def metrics(self) -> MetricsSettings:
+        return MetricsSettings()
+
+    @cached_property
+    def compression(self) -> CompressionSettings:
+        return CompressionSettings()
+
+    @cached_property
+    def profiling(self) -> ProfilingSettings:
+        return ProfilingSettings()
+
+    @cached_property
     def auth(self) -> AuthenticationSettings:
         return AuthenticationSettings()
 
-    @property
+    @cached_property
     def rabbitmq(self) -> RabbitMQSettings:
         return RabbitMQSettings()
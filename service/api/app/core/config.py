@@ -1,15 +1,41 @@
 import logging
+from typing import Any
+from urllib.parse import urlencode
 
+import structlog
+from litestar import Request
 from litestar.config.response_cache import ResponseCacheConfig
 from litestar.logging.config import LoggingConfig, StructLoggingConfig
 from litestar.middleware.logging import LoggingMiddlewareConfig
-from litestar.plugins.sqlalchemy import (
-    AsyncSessionConfig,
-    SQLAlchemyAsyncConfig,
-)
+from litestar.openapi import OpenAPIConfig
+from litestar.plugins.sqlalchemy import AsyncSessionConfig, EngineConfig
 from litestar.plugins.structlog import StructlogConfig
+from litestar.stores.base import Store
+from litestar.stores.memory import MemoryStore
 
+from app.lib.negotiation import response_media_type
+from app.utils.cache import RecordCache, ResponseCacheStore, cache_response_filter
+from app.utils.circuitbreaker import CircuitBreaker
+from app.utils.compression import NegotiatedCompressionConfig
+from app.utils.concurrency import ConcurrencyConfig, ConcurrencyLimit
+from app.utils.deadline import (
+    DeadlineAsyncAdaptedQueuePool,
+    DeadlineConfig,
+    InstrumentedDeadlineQueuePool,
+)
 from app.utils.message_brokers import RabbitMQConfig
+from app.utils.metrics import MetricsConfig
+from app.utils.profiling import ProfilingConfig
+from app.utils.ratelimit import RateLimitConfig, RateLimitPolicy
+from app.utils.revocation import RevocationConfig, TokenRevocations
+from app.utils.sql import (
+    ROUTER_INFO_KEY,
+    LazySQLAlchemyAsyncConfig,
+    QueryStatsConfig,
+    ReadReplicaConfig,
+    ReplicaRouter,
+    RoutingSession,
+)
 
 from .base import Settings
 
@@ -20,16 +46,169 @@ def get_settings() -> Settings:
 
 settings = get_settings()
 
-alchemy_config = SQLAlchemyAsyncConfig(
+API_PATH = "/api"
+"""Prefix of the API routes, the ``/.well-known`` documents are served from the root"""
+
+replica_router = ReplicaRouter(
+    settings.database.REPLICA_URIS,
+    engine_options={
+        **settings.database.engine_options,
+        "poolclass": DeadlineAsyncAdaptedQueuePool,
+    },
+    selection=settings.database.REPLICA_SELECTION,
+    max_lag=settings.database.REPLICA_MAX_LAG,
+    check_interval=settings.database.REPLICA_LAG_CHECK_INTERVAL,
+)
+
+alchemy_config = LazySQLAlchemyAsyncConfig(
     session_dependency_key="db_session",
-    engine_instance=settings.database.ENGINE,
-    session_config=AsyncSessionConfig(expire_on_commit=False),
+    connection_string=settings.database.POSTGRES_DATABASE_URI,
+    engine_config=EngineConfig(
+        **settings.database.engine_options,
+        poolclass=InstrumentedDeadlineQueuePool,
+    ),
+    session_config=AsyncSessionConfig(
+        expire_on_commit=False,
+        sync_session_class=RoutingSession,
+        info={ROUTER_INFO_KEY: replica_router},
+    ),
+)
+
+replica_config = ReadReplicaConfig(
+    router=replica_router,
+    read_your_writes_window=settings.database.READ_YOUR_WRITES_WINDOW,
+)
+
+query_stats_config = QueryStatsConfig(
+    engines=lambda: [alchemy_config.get_engine(), *replica_router.replicas],
+    enabled=settings.database.QUERY_STATS_ENABLED,
+    enforce_budgets=settings.database.QUERY_STATS_ENFORCE_BUDGETS,
+    log_event=settings.logging.SQL_EVENT,
+)
+
+compression_config = (
+    NegotiatedCompressionConfig(
+        minimum_size=settings.compression.COMPRESSION_MINIMUM_SIZE,
+        encodings=tuple(settings.compression.COMPRESSION_ENCODINGS),
+        gzip_compress_level=settings.compression.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.compression.COMPRESSION_BROTLI_QUALITY,
+        zstd_level=settings.compression.COMPRESSION_ZSTD_LEVEL,
+    )
+    if settings.compression.COMPRESSION_ENABLED
+    else None
+)
+
+
+def request_cache_key(request: Request[Any, Any, Any]) -> str:
+    """``default_cache_key_builder`` with the ``fields`` selection as a sorted
+    set, ``fields=email,id`` and ``fields=id,email`` return the same body"""
+    params = request.query_params.dict()
+    if "fields" in params:
+        fields = {f.strip() for value in params["fields"] for f in value.split(",")}
+        params["fields"] = [",".join(sorted(fields - {""}))]
+    query = urlencode(sorted(params.items()), doseq=True)
+    return f"{request.method}{request.url.path}{query}"
+
+
+def cache_key_builder(request: Request[Any, Any, Any]) -> str:
+    """Response cache key, one entry per negotiated media type and encoding.
+
+    Cached bodies are stored encoded and compressed, as they're replayed.
+    """
+    key = request_cache_key(request)
+    if compression_config:
+        key = f"{key}:{compression_config.encoding_key(request)}"
+    return f"{key}:{response_media_type(request)}"
+
+
+cache_config = ResponseCacheConfig(
+    store="response_cache",
+    cache_response_filter=cache_response_filter,
+    key_builder=cache_key_builder,
 )
 
-cache_config = ResponseCacheConfig(store=settings.redis.store)
+
+def get_cache_store() -> ResponseCacheStore:
+    """Redis store of the response cache, created on first use"""
+    return settings.redis.store
+
+
+def get_record_cache() -> RecordCache:
+    """Redis cache of the user records of the batch lookups, created on first use"""
+    return settings.redis.records
+
+
+def get_token_revocations() -> TokenRevocations:
+    """Revoked access tokens, created on first use"""
+    return settings.redis.revocations
+
+
+revocation_config = RevocationConfig(revocations=get_token_revocations)
+
+
+def provide_store(name: str) -> Store:
+    """``StoreRegistry`` factory, stores are created the first time they're used"""
+    if name == cache_config.store:
+        return get_cache_store()
+    return MemoryStore()
+
+
+rate_limit_config = RateLimitConfig(
+    redis=lambda: settings.redis.instance,
+    enabled=settings.ratelimit.RATE_LIMIT_ENABLED,
+    ip_header=settings.ratelimit.RATE_LIMIT_IP_HEADER,
+    trusted_proxies=settings.ratelimit.RATE_LIMIT_TRUSTED_PROXIES,
+    timeout=settings.ratelimit.RATE_LIMIT_REDIS_TIMEOUT,
+    policies={
+        "login": RateLimitPolicy(
+            per_ip=settings.ratelimit.RATE_LIMIT_LOGIN_PER_IP,
+            per_username=settings.ratelimit.RATE_LIMIT_LOGIN_PER_USERNAME,
+            window=settings.ratelimit.RATE_LIMIT_LOGIN_WINDOW,
+            username_field="username",
+        ),
+        "register": RateLimitPolicy(
+            per_ip=settings.ratelimit.RATE_LIMIT_REGISTER_PER_IP,
+            per_username=settings.ratelimit.RATE_LIMIT_REGISTER_PER_EMAIL,
+            window=settings.ratelimit.RATE_LIMIT_REGISTER_WINDOW,
+            username_field="email",
+        ),
+        "introspect": RateLimitPolicy(
+            per_ip=settings.ratelimit.RATE_LIMIT_INTROSPECT_PER_IP,
+            window=settings.ratelimit.RATE_LIMIT_INTROSPECT_WINDOW,
+        ),
+    },
+)
+
+deadline_config = DeadlineConfig(
+    default_timeout=settings.deadline.REQUEST_TIMEOUT,
+    header=settings.deadline.REQUEST_TIMEOUT_HEADER,
+    statement_timeout=settings.deadline.STATEMENT_TIMEOUT_ENABLED,
+)
+
+concurrency_config = ConcurrencyConfig(
+    enabled=settings.concurrency.CONCURRENCY_LIMIT_ENABLED,
+    limits={
+        "auth": ConcurrencyLimit(
+            initial_limit=settings.concurrency.CONCURRENCY_AUTH_LIMIT,
+            max_limit=settings.concurrency.CONCURRENCY_AUTH_MAX_LIMIT,
+            tolerance=settings.concurrency.CONCURRENCY_TOLERANCE,
+        ),
+        "read": ConcurrencyLimit(
+            initial_limit=settings.concurrency.CONCURRENCY_READ_LIMIT,
+            max_limit=settings.concurrency.CONCURRENCY_READ_MAX_LIMIT,
+            tolerance=settings.concurrency.CONCURRENCY_TOLERANCE,
+        ),
+        "write": ConcurrencyLimit(
+            initial_limit=settings.concurrency.CONCURRENCY_WRITE_LIMIT,
+            max_limit=settings.concurrency.CONCURRENCY_WRITE_MAX_LIMIT,
+            tolerance=settings.concurrency.CONCURRENCY_TOLERANCE,
+        ),
+    },
+)
 
 log_config = StructlogConfig(
     structlog_logging_config=StructLoggingConfig(
+        wrapper_class=structlog.make_filtering_bound_logger(settings.logging.LEVEL),
         log_exceptions="always",
         traceback_line_limit=4,
         standard_lib_logging_config=LoggingConfig(
@@ -80,3 +259,32 @@ rabbitmq_config = RabbitMQConfig(
         "password": settings.rabbitmq.AMQP_PASSWORD,
     },
 )
+
+broker_breaker = CircuitBreaker(
+    "rabbitmq",
+    failure_threshold=settings.rabbitmq.AMQP_BREAKER_FAILURES,
+    recovery_time=settings.rabbitmq.AMQP_BREAKER_RECOVERY_TIME,
+    timeout=settings.rabbitmq.AMQP_TIMEOUT,
+)
+
+openapi_config = OpenAPIConfig(
+    title="Litestar API", version="1.0.0", path=f"{API_PATH}/schema"
+)
+
+metrics_config = MetricsConfig(
+    app_name=settings.metrics.METRICS_APP_NAME,
+    path=f"{API_PATH}{settings.metrics.METRICS_PATH}",
+)
+
+profiling_config = ProfilingConfig(
+    enabled=settings.profiling.PROFILING_ENABLED,
+    interval=settings.profiling.PROFILING_INTERVAL,
+    deep_interval=settings.profiling.PROFILING_DEEP_INTERVAL,
+    max_overhead=settings.profiling.PROFILING_MAX_OVERHEAD,
+    max_stacks=settings.profiling.PROFILING_MAX_STACKS,
+    header=settings.profiling.PROFILING_HEADER,
+    output_dir=settings.profiling.PROFILING_OUTPUT_DIR,
+    output_format=settings.profiling.PROFILING_OUTPUT_FORMAT,
+    max_request_profiles=settings.profiling.PROFILING_MAX_REQUEST_PROFILES,
+    path=f"{API_PATH}/profiling",
+)
@@ -0,0 +1,493 @@
+"""Lock-impact report and linter of the migrations::
+
+    python -m app.database.lint
+    python -m app.database.lint app/database/migrations/versions/1a2b_users.py
+    python -m app.database.lint --stats
+
+Lists the operations of each ``upgrade()`` with the lock they take, what it
+blocks and for how long, and flags those blocking the requests for a time
+growing with the table: exits with 1 when there are any. ``--stats`` reads
+the table sizes from the database to estimate the time.
+
+A call with a ``# migration-lint: ignore`` comment is reported but not
+flagged, for the tables known to stay small. Operations on tables created in
+the same migration never block anything.
+"""
+
+import argparse
+import ast
+import asyncio
+import re
+import sys
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Literal, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core import settings
+
+MIGRATIONS_PATH = Path("app/database/migrations/versions")
+IGNORE_COMMENT = "migration-lint: ignore"
+
+Duration = Literal["none", "brief", "batched", "scan", "build", "rewrite"]
+Severity = Literal["info", "warning", "error"]
+
+MB = 1024 * 1024
+THROUGHPUT = {"scan": 200 * MB, "build": 50 * MB, "rewrite": 25 * MB}
+"""Bytes per second of the table, rough rates: the estimates are orders of
+magnitude"""
+
+
+@dataclass(frozen=True)
+class LockImpact:
+    lock: str
+    blocks: Literal["nothing", "writes", "reads and writes"]
+    duration: Duration
+    """How long the lock is held: ``scan``, ``build`` and ``rewrite`` grow
+    with the table"""
+
+    @property
+    def blocking(self) -> bool:
+        return self.blocks != "nothing" and self.duration in THROUGHPUT
+
+
+@dataclass(frozen=True)
+class Finding:
+    path: Path
+    line: int
+    operation: str
+    table: Optional[str]
+    impact: LockImpact
+    severity: Severity
+    message: str
+    ignored: bool = False
+
+
+NO_LOCK = LockImpact("none", "nothing", "none")
+BRIEF_EXCLUSIVE = LockImpact("ACCESS EXCLUSIVE", "reads and writes", "brief")
+SCAN_EXCLUSIVE = LockImpact("ACCESS EXCLUSIVE", "reads and writes", "scan")
+REWRITE = LockImpact("ACCESS EXCLUSIVE", "reads and writes", "rewrite")
+INDEX_BUILD = LockImpact("SHARE", "writes", "build")
+CONCURRENT = LockImpact("SHARE UPDATE EXCLUSIVE", "nothing", "build")
+UNBATCHED_UPDATE = LockImpact("ROW EXCLUSIVE", "writes", "scan")
+
+TABLE_ARGUMENT = {
+    "create_table": 0,
+    "drop_table": 0,
+    "rename_table": 0,
+    "add_column": 0,
+    "drop_column": 0,
+    "alter_column": 0,
+    "bulk_insert": 0,
+    "backfill": 0,
+    "set_not_null": 0,
+    "create_index": 1,
+    "create_index_concurrently": 1,
+    "drop_index": 1,
+    "drop_index_concurrently": 1,
+    "create_foreign_key": 1,
+    "create_unique_constraint": 1,
+    "create_primary_key": 1,
+    "create_check_constraint": 1,
+    "drop_constraint": 1,
+}
+TABLE_KEYWORDS = ("table_name", "source_table", "source", "table")
+VOLATILE_DEFAULT = re.compile(r"random|uuid|clock_timestamp|nextval", re.IGNORECASE)
+
+SQL_RULES: list[tuple[re.Pattern[str], LockImpact, Severity, str]] = [
+    (
+        re.compile(r"\bcreate\s+(unique\s+)?index\s+concurrently\b", re.I),
+        CONCURRENT,
+        "error",
+        "CONCURRENTLY fails in the transaction, use op.create_index_concurrently",
+    ),
+    (
+        re.compile(r"\bdrop\s+index\s+concurrently\b", re.I),
+        CONCURRENT,
+        "error",
+        "CONCURRENTLY fails in the transaction, use op.drop_index_concurrently",
+    ),
+    (
+        re.compile(r"\bcreate\s+(unique\s+)?index\s+(?!concurrently)", re.I),
+        INDEX_BUILD,
+        "error",
+        "index built without CONCURRENTLY, use op.create_index_concurrently",
+    ),
+    (
+        re.compile(r"\bdrop\s+index\s+(?!concurrently)", re.I),
+        BRIEF_EXCLUSIVE,
+        "warning",
+        "index dropped without CONCURRENTLY, use op.drop_index_concurrently",
+    ),
+    (
+        re.compile(r"\balter\s+column\b.*\btype\b", re.I | re.S),
+        REWRITE,
+        "error",
+        "column type change, the table and its indexes may be rewritten",
+    ),
+    (
+        re.compile(r"\bset\s+not\s+null\b", re.I),
+        SCAN_EXCLUSIVE,
+        "error",
+        "SET NOT NULL scans the table, use op.set_not_null",
+    ),
+    (
+        re.compile(
+            r"\badd\s+constraint\b(?!.*\bnot\s+valid\b)(?!.*\busing\s+index\b)",
+            re.I | re.S,
+        ),
+        SCAN_EXCLUSIVE,
+        "error",
+        "constraint validated under lock, add it NOT VALID then VALIDATE it",
+    ),
+    (
+        re.compile(r"\b(vacuum\s+full|cluster|lock\s+table)\b", re.I),
+        REWRITE,
+        "error",
+        "locks the whole table for its duration",
+    ),
+    (
+        re.compile(r"^\s*(update|delete\s+from)\b", re.I),
+        UNBATCHED_UPDATE,
+        "error",
+        "rows locked until the migration commits, use op.backfill",
+    ),
+]
+SQL_TABLE = re.compile(
+    r"\b(?:table|on|update|from)\s+(?:only\s+)?(?:if\s+(?:not\s+)?exists\s+)?"
+    r"([\w.\"]+)",
+    re.I,
+)
+
+
+OPERATIONS: dict[str, tuple[LockImpact, Severity, str]] = {
+    "create_table": (NO_LOCK, "info", "new table"),
+    "create_index_concurrently": (CONCURRENT, "info", "built without blocking"),
+    "drop_index_concurrently": (CONCURRENT, "info", "dropped without blocking"),
+    "backfill": (
+        LockImpact("ROW EXCLUSIVE", "nothing", "batched"),
+        "info",
+        "rows locked one batch at a time",
+    ),
+    "set_not_null": (
+        LockImpact("SHARE UPDATE EXCLUSIVE", "nothing", "scan"),
+        "info",
+        "validated without blocking, then a brief exclusive lock",
+    ),
+    "bulk_insert": (LockImpact("ROW EXCLUSIVE", "nothing", "brief"), "info", ""),
+    "drop_index": (BRIEF_EXCLUSIVE, "warning", "use op.drop_index_concurrently"),
+    "rename_table": (BRIEF_EXCLUSIVE, "warning", "rename breaks the running workers"),
+    "create_foreign_key": (
+        LockImpact("SHARE ROW EXCLUSIVE", "writes", "scan"),
+        "error",
+        (
+            "both tables locked while the rows are checked, add it NOT VALID "
+            "then VALIDATE it"
+        ),
+    ),
+    "create_unique_constraint": (
+        LockImpact("ACCESS EXCLUSIVE", "reads and writes", "build"),
+        "error",
+        (
+            "index built under lock, build it with op.create_index_concurrently "
+            "then ADD CONSTRAINT ... USING INDEX"
+        ),
+    ),
+    "create_check_constraint": (
+        SCAN_EXCLUSIVE,
+        "error",
+        "add it NOT VALID then VALIDATE it",
+    ),
+    "drop_column": (BRIEF_EXCLUSIVE, "info", "catalog change"),
+    "drop_constraint": (BRIEF_EXCLUSIVE, "info", "catalog change"),
+    "drop_table": (BRIEF_EXCLUSIVE, "info", "catalog change"),
+}
+"""Lock of the operations whatever their arguments"""
+OPERATIONS["create_primary_key"] = OPERATIONS["create_unique_constraint"]
+
+
+def check_operation(name: str, call: ast.Call) -> tuple[LockImpact, Severity, str]:
+    """Lock of an ``op.<name>(...)`` call, how bad it is and why"""
+    if name in OPERATIONS:
+        return OPERATIONS[name]
+    keywords = {keyword.arg: keyword.value for keyword in call.keywords}
+    if name == "create_index":
+        if _is_true(keywords.get("postgresql_concurrently")):
+            return CONCURRENT, "error", "CONCURRENTLY fails in the transaction"
+        return INDEX_BUILD, "error", "use op.create_index_concurrently"
+    if name == "add_column":
+        column = call.args[1] if len(call.args) > 1 else keywords.get("column")
+        return _check_new_column(column)
+    if name == "alter_column":
+        return _check_altered_column(keywords)
+    if name == "execute":
+        return check_sql(call.args[0] if call.args else keywords.get("sqltext"))
+    return BRIEF_EXCLUSIVE, "warning", "unknown operation, check its locks"
+
+
+def check_sql(sql: Optional[ast.expr]) -> tuple[LockImpact, Severity, str]:
+    text = _sql_text(sql)
+    if text is None:
+        return BRIEF_EXCLUSIVE, "warning", "dynamic SQL, check its locks"
+    for pattern, impact, severity, message in SQL_RULES:
+        if pattern.search(text):
+            return impact, severity, message
+    return BRIEF_EXCLUSIVE, "info", "SQL statement"
+
+
+def lint_migration(path: Path) -> Iterator[Finding]:
+    source = path.read_text()
+    lines = source.splitlines()
+    upgrade = next(
+        (
+            node
+            for node in ast.parse(source, str(path)).body
+            if isinstance(node, ast.FunctionDef) and node.name == "upgrade"
+        ),
+        None,
+    )
+    if upgrade is None:
+        return
+
+    new_tables: set[str] = set()
+    for name, call in _op_calls(upgrade):
+        table = _table(name, call)
+        if name == "create_table" and table is not None:
+            new_tables.add(table)
+
+        if table is not None and table in new_tables:
+            impact, severity, message = NO_LOCK, "info", "on a new table"
+        else:
+            impact, severity, message = check_operation(name, call)
+
+        end = call.end_lineno or call.lineno
+        ignored = any(IGNORE_COMMENT in line for line in lines[call.lineno - 1 : end])
+        yield Finding(
+            path=path,
+            line=call.lineno,
+            operation=name,
+            table=table,
+            impact=impact,
+            severity="info" if ignored else severity,
+            message=message,
+            ignored=ignored,
+        )
+
+
+def estimate(impact: LockImpact, size: Optional[int]) -> str:
+    """How long the lock blocks the requests"""
+    if impact.blocks == "nothing":
+        return "blocks nothing"
+    blocks = f"blocks {impact.blocks}"
+    if impact.duration == "brief":
+        timeout = settings.database.MIGRATION_LOCK_TIMEOUT
+        return f"{blocks} briefly, queued up to {timeout} behind other locks"
+    if impact.duration not in THROUGHPUT:
+        return blocks
+    if size is None:
+        return f"{blocks} for a time growing with the table ({impact.duration})"
+    seconds = size / THROUGHPUT[impact.duration]
+    return f"{blocks} for ~{seconds:.1f}s ({impact.duration} of {size / MB:.0f} MB)"
+
+
+async def table_sizes() -> dict[str, int]:
+    """Bytes of the tables with their indexes, from the database"""
+    engine = create_async_engine(settings.database.POSTGRES_DATABASE_URI)
+    try:
+        async with engine.connect() as connection:
+            rows = await connection.execute(
+                sa.text(
+                    "SELECT relname, pg_total_relation_size(oid) FROM pg_class "
+                    "WHERE relkind IN ('r', 'p') "
+                    "AND relnamespace = to_regnamespace(current_schema())"
+                )
+            )
+            return dict(rows.tuples().all())
+    finally:
+        await engine.dispose()
+
+
+def migration_files(paths: Sequence[Path]) -> list[Path]:
+    """Migrations of ``paths``, the missing ones are left out"""
+    files: list[Path] = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(sorted(path.glob("*.py")))
+        elif path.exists():
+            files.append(path)
+    return files
+
+
+def report(path: Path, findings: list[Finding], sizes: dict[str, int]) -> None:
+    print(f"{path} ({_revision(path) or 'no revision'})")  # noqa: T201
+    for finding in findings:
+        impact = finding.impact
+        severity = "ignored" if finding.ignored else finding.severity
+        print(  # noqa: T201
+            f"  {finding.line:>4}  {severity:<8} {finding.operation:<26} "
+            f"{finding.table or '?':<16} {impact.lock}, "
+            f"{estimate(impact, sizes.get(finding.table or ''))}"
+        )
+        if finding.severity != "info":
+            print(f"{'':<16}{finding.message}")  # noqa: T201
+
+    blocking = [finding for finding in findings if finding.impact.blocking]
+    if blocking:
+        worst = max(
+            blocking,
+            key=lambda finding: (
+                sizes.get(finding.table or "", 0) / THROUGHPUT[finding.impact.duration],
+                list(THROUGHPUT).index(finding.impact.duration),
+            ),
+        )
+        print(  # noqa: T201
+            f"  lock impact: {estimate(worst.impact, sizes.get(worst.table or ''))} "
+            f"on {worst.table or '?'}"
+        )
+    else:
+        print("  lock impact: no lock held longer than a catalog change")  # noqa: T201
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="*", type=Path, default=[MIGRATIONS_PATH])
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="estimate the lock durations from the table sizes in the database",
+    )
+    args = parser.parse_args()
+    # without a versions directory there are no migrations yet, the paths
+    # given on the command line have to exist
+    missing = [str(p) for p in args.paths if p != MIGRATIONS_PATH and not p.exists()]
+    if missing:
+        parser.error(f"no such file or directory: {', '.join(missing)}")
+
+    files = migration_files(args.paths)
+    if not files:
+        print("no migrations")  # noqa: T201
+        return
+    sizes = asyncio.run(table_sizes()) if args.stats else {}
+    errors = 0
+    for path in files:
+        findings = list(lint_migration(path))
+        report(path, findings, sizes)
+        errors += sum(finding.severity == "error" for finding in findings)
+
+    if errors:
+        print(f"{errors} blocking operation(s)")  # noqa: T201
+        sys.exit(1)
+
+
+def _op_calls(function: ast.FunctionDef) -> Iterator[tuple[str, ast.Call]]:
+    """``op.<name>(...)`` calls in the order they run"""
+    calls = [
+        node
+        for node in ast.walk(function)
+        if isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and isinstance(node.func.value, ast.Name)
+        and node.func.value.id == "op"
+        and node.func.attr != "f"
+    ]
+    for call in sorted(calls, key=lambda call: (call.lineno, call.col_offset)):
+        yield call.func.attr, call  # type: ignore[attr-defined]
+
+
+def _table(name: str, call: ast.Call) -> Optional[str]:
+    if name == "execute":
+        text = _sql_text(call.args[0] if call.args else None)
+        match = SQL_TABLE.search(text) if text is not None else None
+        return match.group(1).strip('"') if match else None
+    if name not in TABLE_ARGUMENT:
+        return None
+    return _table_argument(call, TABLE_ARGUMENT[name], TABLE_KEYWORDS)
+
+
+def _table_argument(
+    call: ast.Call, position: int, keywords: Sequence[str]
+) -> Optional[str]:
+    if len(call.args) > position:
+        value: Optional[ast.expr] = call.args[position]
+    else:
+        value = next(
+            (keyword.value for keyword in call.keywords if keyword.arg in keywords),
+            None,
+        )
+    if isinstance(value, ast.Constant) and isinstance(value.value, str):
+        return value.value
+    return None
+
+
+def _sql_text(sql: Optional[ast.expr]) -> Optional[str]:
+    # sa.text("...") and plain strings, the rest is only known when it runs
+    if isinstance(sql, ast.Call) and sql.args:
+        sql = sql.args[0]
+    if isinstance(sql, ast.Constant) and isinstance(sql.value, str):
+        return sql.value
+    return None
+
+
+def _check_new_column(
+    column: Optional[ast.expr],
+) -> tuple[LockImpact, Severity, str]:
+    if not isinstance(column, ast.Call):
+        return BRIEF_EXCLUSIVE, "warning", "column unknown, check its default"
+    keywords = {keyword.arg: keyword.value for keyword in column.keywords}
+    default = keywords.get("server_default")
+    if default is not None and VOLATILE_DEFAULT.search(ast.unparse(default)):
+        return REWRITE, "error", "volatile default, every row is rewritten"
+    if default is None and _is_false(keywords.get("nullable")):
+        return (
+            BRIEF_EXCLUSIVE,
+            "error",
+            (
+                "NOT NULL without a default fails on a table with rows, add it "
+                "nullable, op.backfill it then op.set_not_null"
+            ),
+        )
+    return BRIEF_EXCLUSIVE, "info", "catalog change"
+
+
+def _check_altered_column(
+    keywords: dict[Optional[str], ast.expr],
+) -> tuple[LockImpact, Severity, str]:
+    if "type_" in keywords:
+        return REWRITE, "error", "type change, the table may be rewritten"
+    if _is_false(keywords.get("nullable")):
+        return SCAN_EXCLUSIVE, "error", "SET NOT NULL scans, use op.set_not_null"
+    if "new_column_name" in keywords:
+        return BRIEF_EXCLUSIVE, "warning", "rename breaks the running workers"
+    return BRIEF_EXCLUSIVE, "info", "catalog change"
+
+
+def _is_true(value: Optional[ast.expr]) -> bool:
+    return isinstance(value, ast.Constant) and value.value is True
+
+
+def _is_false(value: Optional[ast.expr]) -> bool:
+    return isinstance(value, ast.Constant) and value.value is False
+
+
+def _revision(path: Path) -> Optional[str]:
+    for node in ast.parse(path.read_text()).body:
+        if isinstance(node, ast.AnnAssign):
+            targets = [node.target]
+        elif isinstance(node, ast.Assign):
+            targets = node.targets
+        else:
+            continue
+        named = any(
+            isinstance(target, ast.Name) and target.id == "revision"
+            for target in targets
+        )
+        if named and isinstance(node.value, ast.Constant):
+            return str(node.value.value)
+    return None
+
+
+if __name__ == "__main__":
+    main()
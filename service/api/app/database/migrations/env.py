@@ -4,6 +4,7 @@ from logging.config import fileConfig
 from alembic import context
 from app.core import settings
 from app.database.models import Base
+from app.database.operations import lock_safe_directives, migration_timeouts
 from sqlalchemy import pool
 from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import async_engine_from_config
@@ -49,15 +50,24 @@ def run_migrations_offline() -> None:
         literal_binds=True,
         # dialect_opts={"paramstyle": "named"},
         compare_type=True,
+        transaction_per_migration=True,
     )
 
     with context.begin_transaction():
+        for name, value in migration_timeouts().items():
+            context.execute(f"SET {name} = '{value}'")
         context.run_migrations()
 
 
 def do_run_migrations(connection: Connection) -> None:
     context.configure(
-        connection=connection, target_metadata=target_metadata, compare_type=True
+        connection=connection,
+        target_metadata=target_metadata,
+        compare_type=True,
+        # the lock-safe operations commit the steps before them, a migration
+        # failing afterwards leaves the previous ones applied
+        transaction_per_migration=True,
+        process_revision_directives=lock_safe_directives,
     )
 
     with context.begin_transaction():
@@ -77,6 +87,8 @@ async def run_async_migrations() -> None:
         configuration,
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
+        # a migration waiting for a lock queues every request behind it
+        connect_args={"server_settings": migration_timeouts()},
     )
 
     async with connectable.connect() as connection:
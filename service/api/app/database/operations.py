@@ -0,0 +1,407 @@
+"""Lock-safe operations for the migrations, registered on ``op``.
+
+Plain DDL takes locks that queue every request touching the table until the
+statement ends: ``CREATE INDEX`` blocks writes for the whole build, ``SET NOT
+NULL`` blocks reads and writes for a full scan, a large ``UPDATE`` holds its
+row locks until commit. These build indexes ``CONCURRENTLY`` outside the
+migration transaction, validate constraints without blocking writes and
+update rows in small committed batches::
+
+    op.create_index_concurrently("ix_users_email", "users", ["email"])
+    op.backfill("users", {"is_activated": "is_active"}, where="NOT is_activated")
+    op.set_not_null("users", "is_activated")
+
+The migration connection waits at most ``MIGRATION_LOCK_TIMEOUT`` for a lock
+and ``MIGRATION_STATEMENT_TIMEOUT`` for a statement, ``timeouts`` changes
+them for a few steps. Migrations run in a transaction each, those using these
+operations commit the steps before them. ``python -m app.database.lint``
+flags the blocking operations left in a migration.
+"""
+
+import time
+from collections.abc import Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from typing import Any, Optional, Union
+
+import sqlalchemy as sa
+import structlog
+from alembic import op
+from alembic.autogenerate import renderers
+from alembic.autogenerate.api import AutogenContext
+from alembic.operations import MigrateOperation, Operations, ops
+from alembic.runtime.migration import MigrationContext
+from alembic.util import CommandError
+
+from app.core import settings
+
+logger = structlog.get_logger()
+
+
+def migration_timeouts() -> dict[str, str]:
+    """Session settings of the migration connection"""
+    return {
+        "lock_timeout": settings.database.MIGRATION_LOCK_TIMEOUT,
+        "statement_timeout": settings.database.MIGRATION_STATEMENT_TIMEOUT,
+    }
+
+
+@contextmanager
+def timeouts(
+    *,
+    lock_timeout: Optional[str] = None,
+    statement_timeout: Optional[str] = None,
+    operations: Optional[Operations] = None,
+) -> Iterator[None]:
+    """Change the timeouts of the migration connection for the block, e.g.
+    ``statement_timeout="0"`` around a step known to be long"""
+    operations = op if operations is None else operations
+    changed = {
+        name: value
+        for name, value in (
+            ("lock_timeout", lock_timeout),
+            ("statement_timeout", statement_timeout),
+        )
+        if value is not None
+    }
+    for name, value in changed.items():
+        operations.execute(f"SET {name} = '{value}'")
+    try:
+        yield
+    finally:
+        defaults = migration_timeouts()
+        for name in changed:
+            operations.execute(f"SET {name} = '{defaults[name]}'")
+
+
+@Operations.register_operation("create_index_concurrently")
+class CreateIndexConcurrentlyOp(ops.CreateIndexOp):
+    """``CREATE INDEX CONCURRENTLY``, writes go on during the build"""
+
+    @classmethod
+    def create_index_concurrently(
+        cls,
+        operations: Operations,
+        index_name: Optional[str],
+        table_name: str,
+        columns: Sequence[Union[str, sa.TextClause, sa.ColumnElement[Any]]],
+        *,
+        schema: Optional[str] = None,
+        unique: bool = False,
+        **kw: Any,
+    ) -> None:
+        """Build an index without blocking writes, outside the transaction.
+
+        An index left invalid by a failed build is dropped first, one already
+        built is kept: a failed migration can run again.
+        """
+        operation = cls(
+            index_name, table_name, columns, schema=schema, unique=unique, **kw
+        )
+        return operations.invoke(operation)
+
+    def reverse(self) -> "DropIndexConcurrentlyOp":
+        return DropIndexConcurrentlyOp.from_index(self.to_index())
+
+
+@Operations.register_operation("drop_index_concurrently")
+class DropIndexConcurrentlyOp(ops.DropIndexOp):
+    """``DROP INDEX CONCURRENTLY``, without locking the table"""
+
+    @classmethod
+    def drop_index_concurrently(
+        cls,
+        operations: Operations,
+        index_name: str,
+        table_name: Optional[str] = None,
+        *,
+        schema: Optional[str] = None,
+        **kw: Any,
+    ) -> None:
+        """Drop an index without blocking reads and writes, outside the
+        transaction"""
+        operation = cls(index_name, table_name=table_name, schema=schema, **kw)
+        return operations.invoke(operation)
+
+    def reverse(self) -> CreateIndexConcurrentlyOp:
+        return CreateIndexConcurrentlyOp.from_index(self.to_index())
+
+
+@Operations.register_operation("backfill")
+class BackfillOp(MigrateOperation):
+    """``UPDATE`` of a table in batches of rows, each committed"""
+
+    def __init__(
+        self,
+        table_name: str,
+        values: Mapping[str, Any],
+        *,
+        where: Optional[str] = None,
+        schema: Optional[str] = None,
+        key: str = "id",
+        batch_size: int = 1000,
+        pause: float = 0.0,
+    ) -> None:
+        self.table_name = table_name
+        self.values = values
+        self.where = where
+        self.schema = schema
+        self.key = key
+        self.batch_size = batch_size
+        self.pause = pause
+
+    @classmethod
+    def backfill(
+        cls,
+        operations: Operations,
+        table_name: str,
+        values: Mapping[str, Any],
+        *,
+        where: Optional[str] = None,
+        schema: Optional[str] = None,
+        key: str = "id",
+        batch_size: int = 1000,
+        pause: float = 0.0,
+    ) -> None:
+        """Set ``values`` on the rows matching ``where``, ``batch_size`` rows
+        per transaction in ``key`` order.
+
+        Strings in ``values`` and ``where`` are SQL expressions, other values
+        are bound. Each batch holds its row locks for a few milliseconds,
+        ``pause`` seconds between them leave room to the replicas. A failed
+        backfill can run again, ``where`` should skip the rows already done.
+        """
+        operation = cls(
+            table_name,
+            values,
+            where=where,
+            schema=schema,
+            key=key,
+            batch_size=batch_size,
+            pause=pause,
+        )
+        return operations.invoke(operation)
+
+
+@Operations.register_operation("set_not_null")
+class SetNotNullOp(MigrateOperation):
+    """``SET NOT NULL`` proven by a constraint validated beforehand"""
+
+    def __init__(
+        self, table_name: str, column_name: str, *, schema: Optional[str] = None
+    ) -> None:
+        self.table_name = table_name
+        self.column_name = column_name
+        self.schema = schema
+
+    @classmethod
+    def set_not_null(
+        cls,
+        operations: Operations,
+        table_name: str,
+        column_name: str,
+        *,
+        schema: Optional[str] = None,
+    ) -> None:
+        """Make a column ``NOT NULL`` without scanning the table under an
+        exclusive lock, outside the transaction.
+
+        A ``CHECK (column IS NOT NULL) NOT VALID`` constraint is validated
+        while writes go on, ``SET NOT NULL`` then relies on it instead of a
+        scan and the constraint is dropped.
+        """
+        return operations.invoke(cls(table_name, column_name, schema=schema))
+
+
+@Operations.implementation_for(CreateIndexConcurrentlyOp)
+def create_index_concurrently(
+    operations: Operations, operation: CreateIndexConcurrentlyOp
+) -> None:
+    context = operations.get_context()
+    with (
+        context.autocommit_block(),
+        timeouts(statement_timeout="0", operations=operations),
+    ):
+        if operation.index_name is not None:
+            _drop_invalid_index(operations, operation.index_name, operation.schema)
+        operations.create_index(
+            operation.index_name,
+            operation.table_name,
+            operation.columns,
+            schema=operation.schema,
+            unique=operation.unique,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+            **operation.kw,
+        )
+
+
+@Operations.implementation_for(DropIndexConcurrentlyOp)
+def drop_index_concurrently(
+    operations: Operations, operation: DropIndexConcurrentlyOp
+) -> None:
+    with operations.get_context().autocommit_block():
+        operations.drop_index(
+            operation.index_name,
+            operation.table_name,
+            schema=operation.schema,
+            if_exists=True,
+            postgresql_concurrently=True,
+            **operation.kw,
+        )
+
+
+@Operations.implementation_for(BackfillOp)
+def backfill(operations: Operations, operation: BackfillOp) -> None:
+    context = operations.get_context()
+    if context.as_sql:
+        raise CommandError("Backfills run in batches, they can't be rendered as SQL")
+
+    first = _backfill_statement(operation, after=False)
+    following = _backfill_statement(operation, after=True)
+    bind = operations.get_bind()
+    rows, last = 0, None
+    with context.autocommit_block():
+        while True:
+            if last is None:
+                keys = bind.execute(first).scalars().all()
+            else:
+                keys = bind.execute(following, {"last": last}).scalars().all()
+            if not keys:
+                break
+            rows += len(keys)
+            last = max(keys)
+            if operation.pause:
+                time.sleep(operation.pause)
+    logger.info("Backfill done", table=operation.table_name, rows=rows)
+
+
+@Operations.implementation_for(SetNotNullOp)
+def set_not_null(operations: Operations, operation: SetNotNullOp) -> None:
+    preparer = operations.get_context().dialect.identifier_preparer
+    table = preparer.format_table(
+        sa.table(operation.table_name, schema=operation.schema)
+    )
+    column = preparer.quote(operation.column_name)
+    constraint = preparer.quote(
+        f"{operation.table_name}_{operation.column_name}_not_null"[:63]
+    )
+    with operations.get_context().autocommit_block():
+        operations.execute(
+            f"ALTER TABLE {table} ADD CONSTRAINT {constraint} "
+            f"CHECK ({column} IS NOT NULL) NOT VALID"
+        )
+        with timeouts(statement_timeout="0", operations=operations):
+            operations.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {constraint}")
+        operations.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL")
+        operations.execute(f"ALTER TABLE {table} DROP CONSTRAINT {constraint}")
+
+
+def _backfill_statement(operation: BackfillOp, *, after: bool) -> sa.Update:
+    """``UPDATE`` of the next batch, after the key ``last`` when ``after``"""
+    table = sa.table(
+        operation.table_name,
+        *(sa.column(name) for name in {operation.key, *operation.values}),
+        schema=operation.schema,
+    )
+    key = table.c[operation.key]
+    batch = sa.select(key).order_by(key).limit(operation.batch_size)
+    if after:
+        batch = batch.where(key > sa.bindparam("last"))
+    if operation.where is not None:
+        batch = batch.where(sa.text(operation.where))
+    return (
+        sa.update(table)
+        .where(key.in_(batch.scalar_subquery()))
+        .values(
+            {
+                name: sa.literal_column(value) if isinstance(value, str) else value
+                for name, value in operation.values.items()
+            }
+        )
+        .returning(key)
+    )
+
+
+def _drop_invalid_index(
+    operations: Operations, index_name: str, schema: Optional[str]
+) -> None:
+    if operations.get_context().as_sql:
+        return
+    preparer = operations.get_context().dialect.identifier_preparer
+    name = preparer.quote(index_name)
+    if schema is not None:
+        name = f"{preparer.quote_schema(schema)}.{name}"
+    invalid = operations.get_bind().scalar(
+        sa.text(
+            "SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"
+        ),
+        {"name": name},
+    )
+    if invalid:
+        logger.warning("Dropping the index of a failed build", index=index_name)
+        operations.drop_index(
+            index_name, schema=schema, if_exists=True, postgresql_concurrently=True
+        )
+
+
+@renderers.dispatch_for(CreateIndexConcurrentlyOp)
+def render_create_index_concurrently(
+    autogen_context: AutogenContext, operation: CreateIndexConcurrentlyOp
+) -> str:
+    render = renderers.dispatch(ops.CreateIndexOp)
+    return render(autogen_context, operation).replace(
+        ".create_index(", ".create_index_concurrently(", 1
+    )
+
+
+@renderers.dispatch_for(DropIndexConcurrentlyOp)
+def render_drop_index_concurrently(
+    autogen_context: AutogenContext, operation: DropIndexConcurrentlyOp
+) -> str:
+    render = renderers.dispatch(ops.DropIndexOp)
+    return render(autogen_context, operation).replace(
+        ".drop_index(", ".drop_index_concurrently(", 1
+    )
+
+
+def lock_safe_directives(
+    context: MigrationContext, revision: Any, directives: list[ops.MigrationScript]
+) -> None:
+    """``process_revision_directives`` of autogenerate: the indexes of tables
+    that already exist are created and dropped concurrently"""
+    for script in directives:
+        for operations in (*script.upgrade_ops_list, *script.downgrade_ops_list):
+            # the indexes of tables created or dropped along are built or
+            # dropped with them, in the migration transaction
+            tables = {
+                operation.table_name
+                for operation in operations.ops
+                if isinstance(operation, (ops.CreateTableOp, ops.DropTableOp))
+            }
+            operations.ops = [
+                _concurrently(operation, tables) for operation in operations.ops
+            ]
+
+
+def _concurrently(operation: MigrateOperation, tables: set[str]) -> MigrateOperation:
+    if isinstance(operation, ops.ModifyTableOps):
+        operation.ops = [_concurrently(child, tables) for child in operation.ops]
+        return operation
+    if type(operation) is ops.CreateIndexOp and operation.table_name not in tables:
+        return CreateIndexConcurrentlyOp(
+            operation.index_name,
+            operation.table_name,
+            operation.columns,
+            schema=operation.schema,
+            unique=operation.unique,
+            **operation.kw,
+        )
+    if type(operation) is ops.DropIndexOp and operation.table_name not in tables:
+        return DropIndexConcurrentlyOp(
+            operation.index_name,
+            table_name=operation.table_name,
+            schema=operation.schema,
+            _reverse=operation._reverse,
+            **operation.kw,
+        )
+    return operation
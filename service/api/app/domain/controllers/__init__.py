@@ -1,4 +1,11 @@
 from .auth import AuthController
+from .health import HealthController
 from .users import UserController
+from .well_known import WellKnownController
 
-__all__ = ["UserController", "AuthController"]
+__all__ = [
+    "UserController",
+    "AuthController",
+    "HealthController",
+    "WellKnownController",
+]
@@ -0,0 +1,14 @@
+from litestar import get
+from litestar.controller import Controller
+
+
+class HealthController(Controller):
+    path = "/health"
+    tags = ["health"]
+    # never shed by the concurrency limits, nor behind authentication
+    opt = {"exclude_from_auth": True, "concurrency": "priority"}
+
+    @get("/", cache=False)
+    async def health(self) -> dict[str, str]:
+        """Liveness probe, doesn't touch Postgres, Redis or RabbitMQ"""
+        return {"status": "ok"}
@@ -1,39 +1,100 @@
-from typing import Annotated
+from collections.abc import Iterable
+from datetime import datetime
+from itertools import chain
+from typing import Annotated, Any, Optional
 
 from advanced_alchemy.filters import FilterTypes
 from advanced_alchemy.service import OffsetPagination
-from litestar import delete, get, patch, post, put
+from litestar import Request, Response, delete, get, patch, post, put
 from litestar.controller import Controller
 from litestar.di import Provide
+from litestar.exceptions import ValidationException
 from litestar.params import Body, Dependency, Parameter
 
-from app.database.models import User
-from app.domain.dependencies import current_user, provide_users_service
+from app.core import settings
+from app.domain.dependencies import (
+    current_user,
+    provide_user_fields,
+    provide_users_service,
+)
 from app.domain.guards import super_user_guard
 from app.domain.schemas import (
-    PydanticUser,
     PydanticUserCreate,
     PydanticUserUpdate,
-    UserOutputDTO,
+    StructUserOutput,
+    StructUsersLookup,
+    StructUsersLookupItem,
+    StructUsersLookupResult,
+    user_output_type,
 )
 from app.domain.services import UserService
+from app.lib.negotiation import MessagePackOperation, NegotiatedResponse
+from app.lib.serialization import to_struct
+from app.utils.conditional import (
+    ConditionalGetMiddleware,
+    etag_matches,
+    make_etag,
+    not_modified,
+)
+
+
+def user_etag(
+    user_id: int, updated_at: datetime, fields: Optional[tuple[str, ...]] = None
+) -> str:
+    return make_etag("user", user_id, updated_at, *(fields or ()))
+
+
+def users_page_etag(
+    page: OffsetPagination[Any],
+    versions: Iterable[tuple[int, datetime]],
+    fields: Optional[tuple[str, ...]] = None,
+) -> str:
+    """ETag of a page, changes with any of its users and with the total"""
+    return make_etag(
+        "users",
+        page.limit,
+        page.offset,
+        page.total,
+        *(fields or ()),
+        *chain.from_iterable(versions),
+    )
 
 
 class UserController(Controller):
-    dependencies = {"service": Provide(provide_users_service)}
+    dependencies = {
+        "service": Provide(provide_users_service),
+        "fields": Provide(provide_user_fields, sync_to_thread=False),
+    }
     quards = [super_user_guard]
     signature_namespace = {"UserService": UserService}
     path = "/users"
-    return_dto = UserOutputDTO
     tags = ["users"]
+    # 304 for the responses replayed from the response cache
+    middleware = [ConditionalGetMiddleware]
 
-    @get("/me", dependencies={"user": Provide(current_user)})
-    async def get_me(self, user: User) -> User:
-        return user
+    @get(
+        "/me",
+        dependencies={"user": Provide(current_user)},
+        opt={"query_budget": 2},
+        operation_class=MessagePackOperation,
+    )
+    async def get_me(
+        self, request: Request, user: StructUserOutput
+    ) -> Response[StructUserOutput]:
+        etag = user_etag(user.id, user.updated_at)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag, NegotiatedResponse)
+        return NegotiatedResponse(user, headers={"ETag": etag})
 
-    @get("/{user_id:int}", cache=True)
+    @get(
+        "/{user_id:int}",
+        cache=True,
+        opt={"query_budget": 3},
+        operation_class=MessagePackOperation,
+    )
     async def get_user(
         self,
+        request: Request,
         service: UserService,
         user_id: Annotated[
             int,
@@ -43,10 +104,66 @@ class UserController(Controller):
                 required=True,
             ),
         ],
-    ) -> User:
-        return await service.get(user_id=user_id)
+        fields: Optional[tuple[str, ...]],
+    ) -> Response[StructUserOutput]:
+        if if_none_match := request.headers.get("if-none-match"):
+            # the version alone tells whether the client is up to date
+            updated_at = await service.get_version(user_id=user_id)
+            if updated_at is not None:
+                etag = user_etag(user_id, updated_at, fields)
+                if etag_matches(if_none_match, etag):
+                    return not_modified(etag, NegotiatedResponse)
+
+        user, updated_at = await service.get_user(user_id=user_id, fields=fields)
+        return NegotiatedResponse(
+            user, headers={"ETag": user_etag(user_id, updated_at, fields)}
+        )
+
+    @post(
+        "/batch",
+        status_code=200,
+        opt={"query_budget": 2, "concurrency": "read"},
+        operation_class=MessagePackOperation,
+    )
+    async def lookup_users(
+        self,
+        service: UserService,
+        fields: Optional[tuple[str, ...]],
+        data: Annotated[
+            StructUsersLookup,
+            Body(
+                title="Users lookup",
+                description=(
+                    "Ids or emails of the users to get at once, up to "
+                    f"{settings.users.USERS_BATCH_MAX_SIZE}"
+                ),
+            ),
+        ],
+    ) -> StructUsersLookupResult:
+        if (data.ids is None) == (data.emails is None):
+            raise ValidationException(detail="Look users up by either ids or emails")
+        keys: list[int] | list[str] = data.ids if data.ids is not None else data.emails
+        if len(keys) > settings.users.USERS_BATCH_MAX_SIZE:
+            raise ValidationException(
+                detail=f"At most {settings.users.USERS_BATCH_MAX_SIZE} users at once"
+            )
 
-    @post("/")
+        if data.ids is not None:
+            users: dict[Any, StructUserOutput] = await service.get_many_by_id(data.ids)
+        else:
+            users = await service.get_many_by_email(data.emails)
+        output_type = user_output_type(fields)
+        items = []
+        for key in keys:
+            user = users.get(key)
+            if user is not None and fields:
+                user = output_type(*(getattr(user, f) for f in fields))
+            items.append(
+                StructUsersLookupItem(key=key, found=user is not None, user=user)
+            )
+        return StructUsersLookupResult(items=items)
+
+    @post("/", opt={"concurrency": "auth"}, operation_class=MessagePackOperation)
     async def create_user(
         self,
         service: UserService,
@@ -58,18 +175,38 @@ class UserController(Controller):
                 description="Data for creating new user in system",
             ),
         ],
-    ) -> User:
-        return await service.create(data=data)
+    ) -> StructUserOutput:
+        return to_struct(await service.create(data=data), StructUserOutput)
 
-    @get("/", return_dto=None, cache=False)
+    @get(
+        "/",
+        cache=False,
+        opt={"query_budget": 3},
+        operation_class=MessagePackOperation,
+    )
     async def get_users(
         self,
+        request: Request,
         service: UserService,
         filters: Annotated[list[FilterTypes], Dependency(skip_validation=True)],
-    ) -> OffsetPagination[PydanticUser]:
-        return await service.get_users(*filters)
+        fields: Optional[tuple[str, ...]],
+    ) -> Response[OffsetPagination[StructUserOutput]]:
+        if if_none_match := request.headers.get("if-none-match"):
+            current = await service.get_users_versions(*filters)
+            etag = users_page_etag(current, current.items, fields)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag, NegotiatedResponse)
+
+        page, versions = await service.get_users(*filters, fields=fields)
+        return NegotiatedResponse(
+            page, headers={"ETag": users_page_etag(page, versions, fields)}
+        )
 
-    @patch("/{user_id:int}")
+    @patch(
+        "/{user_id:int}",
+        opt={"query_budget": 5},
+        operation_class=MessagePackOperation,
+    )
     async def patch_user(
         self,
         service: UserService,
@@ -84,10 +221,11 @@ class UserController(Controller):
                 description="Data for partitialy updating user in system",
             ),
         ],
-    ) -> User:
-        return await service.update(user_id=user_id, data=data)
+    ) -> StructUserOutput:
+        user = await service.update(user_id=user_id, data=data)
+        return to_struct(user, StructUserOutput)
 
-    @put("/{user_id:int}")
+    @put("/{user_id:int}", operation_class=MessagePackOperation)
     async def put_user(
         self,
         service: UserService,
@@ -102,8 +240,9 @@ class UserController(Controller):
                 description="Data for completely updating user in system",
             ),
         ],
-    ) -> User:
-        return await service.update(user_id=user_id, data=data)
+    ) -> StructUserOutput:
+        user = await service.update(user_id=user_id, data=data)
+        return to_struct(user, StructUserOutput)
 
     @delete("/{user_id:int}")
     async def delete_user(
@@ -0,0 +1,37 @@
+from litestar import MediaType, Request, Response, get
+from litestar.controller import Controller
+from litestar.datastructures import CacheControlHeader
+
+from app.core import settings
+from app.lib.security.keys import get_key_ring
+from app.utils.conditional import etag_matches, make_etag, not_modified
+
+
+class WellKnownController(Controller):
+    path = "/.well-known"
+    tags = ["auth"]
+    # verifiers fetch the keys without a token, a shed request fails their logins
+    opt = {"exclude_from_auth": True, "concurrency": "priority"}
+
+    @get(
+        "/jwks.json",
+        cache=False,
+        cache_control=CacheControlHeader(
+            public=True,
+            max_age=settings.auth.JWKS_MAX_AGE,
+            stale_while_revalidate=settings.auth.JWKS_MAX_AGE,
+        ),
+    )
+    async def jwks(self, request: Request) -> Response[bytes]:
+        """Public keys verifying the access tokens, picked by the tokens' ``kid``.
+
+        Verifiers cache the set and fetch it again when a token names a key
+        they don't have, the keys change with a rotation only.
+        """
+        key_ring = get_key_ring()
+        etag = make_etag("jwks", *key_ring.keys)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+        return Response(
+            key_ring.jwks_json, media_type=MediaType.JSON, headers={"ETag": etag}
+        )
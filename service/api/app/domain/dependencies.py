@@ -1,16 +1,19 @@
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
 from litestar import Request
+from litestar.exceptions import ValidationException
+from litestar.params import Parameter
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.models.user import User
+from app.core.config import get_record_cache
+from app.domain.schemas import USER_FIELDS, StructUserOutput
 from app.domain.services import RefreshTokenService, UserService
 
 
 async def provide_users_service(
     db_session: AsyncSession,
 ) -> AsyncGenerator[UserService, None]:
-    yield UserService(session=db_session)
+    yield UserService(session=db_session, cache=get_record_cache())
 
 
 async def provide_refresh_token_service(
@@ -19,5 +22,31 @@ async def provide_refresh_token_service(
     yield RefreshTokenService(session=db_session)
 
 
-async def current_user(request: Request) -> User:
+async def current_user(request: Request) -> StructUserOutput:
     return request.user
+
+
+def provide_user_fields(
+    selected: Optional[str] = Parameter(
+        query="fields",
+        default=None,
+        required=False,
+        description=f"Comma-separated user fields to return: {', '.join(USER_FIELDS)}",
+    ),
+) -> Optional[tuple[str, ...]]:
+    """Sparse fieldset of the user routes, ``None`` for every field.
+
+    The fields come back in the order of ``USER_FIELDS``, so ``email,id`` and
+    ``id,email`` select (and cache) the same columns.
+    """
+    if not selected:
+        return None
+    requested = {f.strip() for f in selected.split(",") if f.strip()}
+    if unknown := requested.difference(USER_FIELDS):
+        raise ValidationException(
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+            extra={"allowed": list(USER_FIELDS)},
+        )
+    if not requested or len(requested) == len(USER_FIELDS):
+        return None
+    return tuple(f for f in USER_FIELDS if f in requested)
@@ -1,30 +1,63 @@
-from datetime import timedelta
-from typing import Any
+from dataclasses import asdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+from uuid import uuid4
 
 from litestar.connection import ASGIConnection
-from litestar.exceptions import PermissionDeniedException
+from litestar.exceptions import NotAuthorizedException, PermissionDeniedException
 from litestar.handlers.base import BaseRouteHandler
-from litestar.security.jwt import JWTAuth, Token
+from litestar.middleware import AuthenticationResult
+from litestar.security.jwt import JWTAuth, JWTAuthenticationMiddleware, Token
 
 from app.core import settings
-from app.core.config import alchemy_config
-from app.database.models import User
+from app.core.config import alchemy_config, get_token_revocations
 from app.domain.dependencies import provide_users_service
+from app.domain.schemas import StructUserOutput
 from app.domain.services import UserService
+from app.lib.security.keys import get_key_ring
+from app.lib.security.tokens import TokenVerifier
+from app.utils.sql import use_replica
+
+token_verifier = TokenVerifier(
+    key_ring=get_key_ring(), maxsize=settings.auth.TOKEN_CACHE_SIZE
+)
 
 
 async def current_user_from_token(
     token: Token, connection: ASGIConnection[Any, Any, Any, Any]
-) -> User | None:
+) -> StructUserOutput | None:
     service: UserService = await anext(
         provide_users_service(
             alchemy_config.provide_session(connection.app.state, connection.scope)
         )
     )
 
-    user: User = await service.get_one_or_none(id=int(token.sub))
+    # the record cache answers most requests, the database only its misses
+    with use_replica():
+        users = await service.get_many_by_id([int(token.sub)])
+
+    return users.get(int(token.sub))
+
+
+async def is_revoked(token: Token) -> bool:
+    """Whether ``token`` was revoked, tokens without ``jti`` can't be"""
+    return token.jti is not None and await get_token_revocations().is_revoked(token.jti)
+
 
-    return user
+class CachedJWTAuthenticationMiddleware(JWTAuthenticationMiddleware):
+    """Checks the signature of a token once, through ``token_verifier``, and
+    whether it was revoked on every request"""
+
+    async def authenticate_token(
+        self, encoded_token: str, connection: ASGIConnection[Any, Any, Any, Any]
+    ) -> AuthenticationResult:
+        token = token_verifier.verify(encoded_token)
+        if await is_revoked(token):
+            raise NotAuthorizedException("Token revoked")
+        user = await self.retrieve_user_handler(token, connection)
+        if not user:
+            raise NotAuthorizedException()
+        return AuthenticationResult(user=user, auth=token)
 
 
 async def super_user_guard(
@@ -35,12 +68,42 @@ async def super_user_guard(
     raise PermissionDeniedException(detail="Insufficient privileges")
 
 
-o2auth = JWTAuth[User](
+class KeyedJWTAuth(JWTAuth[StructUserOutput]):
+    """Signs the tokens with the key ring, stamping them with a ``kid``, and
+    gives each a ``jti``"""
+
+    def create_token(
+        self,
+        identifier: str,
+        token_expiration: Optional[timedelta] = None,
+        token_issuer: Optional[str] = None,
+        token_audience: Optional[str] = None,
+        token_unique_jwt_id: Optional[str] = None,
+        token_extras: Optional[dict[str, Any]] = None,
+    ) -> str:
+        token = Token(
+            sub=identifier,
+            exp=datetime.now(timezone.utc)
+            + (token_expiration or self.default_token_expiration),
+            iss=token_issuer,
+            aud=token_audience,
+            # the id revocations name the token by
+            jti=token_unique_jwt_id or uuid4().hex,
+            extras=token_extras or {},
+        )
+        return get_key_ring().sign(
+            {k: v for k, v in asdict(token).items() if v is not None}
+        )
+
+
+o2auth = KeyedJWTAuth(
     retrieve_user_handler=current_user_from_token,
     token_secret=settings.auth.JWT_PRIVATE_KEY_PATH.read_text(),
     algorithm=settings.auth.ALGORITHM,
     default_token_expiration=timedelta(
         minutes=settings.auth.ACCESS_TOKEN_EXPIRE_MINUTES
     ),
-    exclude=["/api/schema", "/api/auth/"],
+    # the auth routes opt out through ``exclude_from_auth``, except introspection
+    exclude=["/api/schema"],
+    authentication_middleware_class=CachedJWTAuthenticationMiddleware,
 )
@@ -11,6 +11,9 @@ logger = logging.getLogger(__name__)
 async def user_created(email: str, emails_broker: EmailsMessageBroker) -> bool:
     try:
         message = await emails_broker.publish(queue="emails", body=email)
+        if message is None:
+            logger.info("Email buffered until the broker is available")
+            return False
 
         logger.info(message)
         logger.info("Email successfully sended to broker")
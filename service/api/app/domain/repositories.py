@@ -1,11 +1,104 @@
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any, Optional, TypeVar
+
+import msgspec
+from advanced_alchemy.filters import FilterTypes
 from advanced_alchemy.repository import SQLAlchemyAsyncRepository
+from sqlalchemy import ARRAY, any_, bindparam, func, over, select
 
 from app.database.models import RefreshToken, User
 
+StructT = TypeVar("StructT", bound=msgspec.Struct)
+
 
 class UserRepository(SQLAlchemyAsyncRepository[User]):
     model_type = User
 
+    async def list_and_count_versioned_as(
+        self, struct_type: type[StructT], *filters: FilterTypes
+    ) -> tuple[list[StructT], list[tuple[int, datetime]], int]:
+        """``list_and_count`` selecting only the fields of ``struct_type``.
+
+        The columns are read as plain Core rows, so no ``User`` entity is built
+        and nothing enters the session identity map, and every row is turned
+        into ``struct_type`` positionally. Filters are applied exactly like
+        ``list_and_count`` does, the total comes from a window function.
+
+        The ``id`` and ``updated_at`` of every row (the page's version) come
+        along, whether ``struct_type`` has them or not.
+        """
+        columns = self._columns_of(struct_type)
+        versions = [
+            self.model_type.id.label("version_id"),
+            self.model_type.updated_at.label("version_updated_at"),
+        ]
+        rows, count = await self._list_and_count_columns(
+            [*columns, *versions], *filters
+        )
+        size = len(columns)
+        structs = [struct_type(*row[:size]) for row in rows]
+        return structs, [tuple(row[size:]) for row in rows], count
+
+    async def list_any_as(
+        self, struct_type: type[StructT], field: str, values: Sequence[Any]
+    ) -> list[StructT]:
+        """Rows whose ``field`` is one of ``values``, as ``struct_type``.
+
+        ``values`` go as one array parameter (``= ANY($1)``), the statement is
+        the same whatever their number and is prepared once per connection.
+        """
+        column = getattr(self.model_type, field)
+        values = bindparam("values", list(values), type_=ARRAY(column.type))
+        statement = select(*self._columns_of(struct_type)).where(column == any_(values))
+        rows = (await self._execute(statement)).all()
+        return [struct_type(*row) for row in rows]
+
+    async def list_versions(
+        self, *filters: FilterTypes
+    ) -> tuple[list[tuple[int, datetime]], int]:
+        """``id`` and ``updated_at`` of the rows ``list_and_count_versioned_as``
+        would return, enough to tell whether a page changed"""
+        return await self._list_and_count_columns(
+            [self.model_type.id, self.model_type.updated_at], *filters
+        )
+
+    async def get_version(self, item_id: int) -> Optional[datetime]:
+        """``updated_at`` of a row, ``None`` when it doesn't exist"""
+        statement = select(self.model_type.updated_at).where(
+            self.model_type.id == item_id
+        )
+        return (await self._execute(statement)).scalar_one_or_none()
+
+    async def get_versioned_as(
+        self, struct_type: type[StructT], item_id: int
+    ) -> Optional[tuple[StructT, datetime]]:
+        """Row ``item_id`` as ``struct_type`` with its ``updated_at``, selecting
+        only those columns; ``None`` when it doesn't exist"""
+        columns = self._columns_of(struct_type)
+        statement = select(
+            *columns, self.model_type.updated_at.label("version_updated_at")
+        ).where(self.model_type.id == item_id)
+        row = (await self._execute(statement)).one_or_none()
+        if row is None:
+            return None
+        return struct_type(*row[:-1]), row[-1]
+
+    def _columns_of(self, struct_type: type[msgspec.Struct]) -> list[Any]:
+        return [getattr(self.model_type, f) for f in struct_type.__struct_fields__]
+
+    async def _list_and_count_columns(
+        self, columns: list[Any], *filters: FilterTypes
+    ) -> tuple[list[tuple[Any, ...]], int]:
+        statement = select(over(func.count(self.model_type.id)), *columns)
+        statement = self._apply_filters(
+            *filters, statement=self._get_base_stmt(statement)
+        )
+        rows = (await self._execute(statement)).all()
+        if not rows:
+            return [], 0
+        return [row[1:] for row in rows], rows[0][0]
+
 
 class RefreshTokenRepository(SQLAlchemyAsyncRepository[RefreshToken]):
     model_type = RefreshToken
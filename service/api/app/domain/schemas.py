@@ -1,13 +1,18 @@
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Annotated, Optional
+from typing import Annotated, Any, Optional
 
 from litestar.contrib.sqlalchemy.dto import SQLAlchemyDTO
 from litestar.dto.config import DTOConfig
 from pydantic import EmailStr
 
 from app.database.models import User
-from app.lib.schemas import CamelizedBaseStructModel, PydanticBaseModel
+from app.lib.schemas import (
+    BaseStructModel,
+    CamelizedBaseStructModel,
+    PydanticBaseModel,
+)
+from app.lib.serialization import sparse_struct
 
 base_user_config = DTOConfig(exclude=("hashed_password", "refresh_token"))
 UserOutputDTO = SQLAlchemyDTO[Annotated[User, base_user_config]]
@@ -48,6 +53,75 @@ class StructUser(SctructBaseUser):
     id: int = None
 
 
+class StructUserOutput(BaseStructModel, gc=False):
+    """User as returned by the API, same keys as ``UserOutputDTO``"""
+
+    email: str
+    is_active: bool
+    is_superuser: bool
+    is_activated: bool
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+
+USER_FIELDS = StructUserOutput.__struct_fields__
+"""Fields a client may pick with ``?fields=``"""
+
+
+def user_output_type(fields: Optional[tuple[str, ...]] = None) -> type[Any]:
+    """``StructUserOutput`` narrowed to ``fields``, all of them by default"""
+    if not fields:
+        return StructUserOutput
+    return sparse_struct(StructUserOutput, fields)
+
+
+class StructUsersLookup(BaseStructModel):
+    """Users to look up at once, by ``ids`` or by ``emails``"""
+
+    ids: Optional[list[int]] = None
+    emails: Optional[list[str]] = None
+
+
+class StructUsersLookupItem(BaseStructModel, gc=False):
+    """Result of one of the looked up ids or emails, ``user`` is ``null`` when
+    it wasn't found"""
+
+    key: int | str
+    found: bool
+    user: Optional[StructUserOutput] = None
+
+
+class StructUsersLookupResult(BaseStructModel):
+    """Results in the order of the lookup, one per id or email asked for"""
+
+    items: list[StructUsersLookupItem]
+
+
+class StructTokensIntrospection(BaseStructModel):
+    """Access tokens to check at once, as sent in ``Authorization`` headers
+    (without the ``Bearer`` prefix)"""
+
+    tokens: list[str]
+
+
+class StructTokenInfo(BaseStructModel, gc=False):
+    """State of one token, ``active`` is ``false`` and the other fields
+    ``null`` for invalid or expired tokens and for deleted users"""
+
+    active: bool
+    sub: Optional[str] = None
+    exp: Optional[int] = None
+    is_active: Optional[bool] = None
+    is_superuser: Optional[bool] = None
+
+
+class StructTokensIntrospectionResult(BaseStructModel):
+    """Results in the order of the tokens, one per token"""
+
+    items: list[StructTokenInfo]
+
+
 class PydanticBaseUser(PydanticBaseModel):
     email: Optional[EmailStr] = None
     is_active: Optional[bool] = True
@@ -1,17 +1,19 @@
+from collections.abc import Iterable, Sequence
 from dataclasses import asdict, dataclass, is_dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, TypeAlias, TypeVar, Union
+from typing import Any, Dict, Optional, TypeAlias, TypeVar, Union
 
+import msgspec
 from advanced_alchemy.exceptions import (
     IntegrityError,
     NotFoundError,
 )
-from advanced_alchemy.filters import FilterTypes
+from advanced_alchemy.filters import FilterTypes, LimitOffset
 from advanced_alchemy.repository import SQLAlchemyAsyncRepository
 from advanced_alchemy.service import OffsetPagination, SQLAlchemyAsyncRepositoryService
-from email_validator import EmailNotValidError
 from litestar.exceptions import HTTPException, NotFoundException
 from pydantic import BaseModel, validate_email
+from pydantic_core import PydanticCustomError
 from sqlalchemy import Select, StatementLambdaElement, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.asyncio.scoping import async_scoped_session
@@ -20,7 +22,11 @@ from sqlalchemy.orm import selectinload
 from app.core import settings
 from app.database.models import RefreshToken, User
 from app.domain.repositories import RefreshTokenRepository, UserRepository
-from app.domain.schemas import PydanticUser, RefreshTokenCreate
+from app.domain.schemas import (
+    RefreshTokenCreate,
+    StructUserOutput,
+    user_output_type,
+)
 from app.lib.exceptions import EmailValidationException, IntegrityException
 from app.lib.security.crypt import generate_hashed_password, verify_password
 from app.lib.security.jwt import (
@@ -28,12 +34,24 @@ from app.lib.security.jwt import (
     encode_jwt_token,
     generate_refresh_token,
 )
+from app.lib.serialization import encode_json
+from app.utils.cache import RecordCache
+from app.utils.deadline import DeadlineExceededException, is_query_canceled
 
 DataclassT = TypeVar("DataclassT", bound=dataclass)
 PydanticModelT = TypeVar("PydanticModelT", bound=BaseModel)
 
+T = TypeVar("T")
+
 InputModelT: TypeAlias = Union[DataclassT, PydanticModelT, Dict[str, Any]]
 
+USER_KEY = "id:{}"
+"""Record cache key of a user (``StructUserOutput`` as JSON)"""
+EMAIL_KEY = "email:{}"
+"""Record cache key of the id of the user with an email"""
+
+_user_decoder = msgspec.json.Decoder(StructUserOutput)
+
 
 class UserService(SQLAlchemyAsyncRepositoryService[User]):
     repository_type: SQLAlchemyAsyncRepository[User] = UserRepository
@@ -45,8 +63,10 @@ class UserService(SQLAlchemyAsyncRepositoryService[User]):
         auto_expunge: bool = False,
         auto_refresh: bool = True,
         auto_commit: bool = True,
+        cache: Optional[RecordCache] = None,
         **repo_kwargs: Any,
     ) -> None:
+        self.cache = cache
         self.repository = self.repository_type(
             statement=statement,
             session=session,
@@ -72,10 +92,117 @@ class UserService(SQLAlchemyAsyncRepositoryService[User]):
             statement=select(User).options(selectinload(User.refresh_token)), **kwargs
         )
 
-    async def get_users(self, *filters: FilterTypes) -> OffsetPagination[PydanticUser]:
-        results, count = await self.list_and_count(*filters)
-        return self.to_schema(
-            data=results, total=count, schema_type=PydanticUser, filters=filters
+    async def get_version(self, *, user_id: int) -> Optional[datetime]:
+        """``updated_at`` of the user, without loading it"""
+        return await self.repository.get_version(user_id)
+
+    async def get_user(
+        self, *, user_id: int, fields: Optional[tuple[str, ...]] = None
+    ) -> tuple[Any, datetime]:
+        """The user with only ``fields`` (see ``user_output_type``) and its
+        ``updated_at``, only those columns are selected"""
+        versioned = await self.repository.get_versioned_as(
+            user_output_type(fields), user_id
+        )
+        if versioned is None:
+            raise NotFoundException(detail=f"No User found with {user_id=}")
+        return versioned
+
+    async def get_many_by_id(self, ids: Sequence[int]) -> dict[int, StructUserOutput]:
+        """Users of ``ids`` which exist, by id.
+
+        Cached users are read with one ``MGET``, the others with one query and
+        then cached.
+        """
+        ids = list(dict.fromkeys(ids))
+        users = await self._cached_users(ids)
+        if missing := [user_id for user_id in ids if user_id not in users]:
+            loaded = await self.repository.list_any_as(StructUserOutput, "id", missing)
+            await self._cache_users(loaded)
+            users.update((user.id, user) for user in loaded)
+        return users
+
+    async def get_many_by_email(
+        self, emails: Sequence[str]
+    ) -> dict[str, StructUserOutput]:
+        """Users of ``emails`` which exist, by email.
+
+        The cache maps emails to ids (one ``MGET``) and ids to users (another
+        one), the others are read with one query and then cached.
+        """
+        emails = list(dict.fromkeys(emails))
+        users: dict[str, StructUserOutput] = {}
+        if self.cache is not None:
+            values = await self.cache.get_many([EMAIL_KEY.format(e) for e in emails])
+            ids = {e: int(v) for e, v in zip(emails, values) if v is not None}
+            cached = await self._cached_users(list(ids.values()))
+            for email, user_id in ids.items():
+                user = cached.get(user_id)
+                # the email of a user who changed it still points at them
+                if user is not None and user.email == email:
+                    users[email] = user
+        if missing := [email for email in emails if email not in users]:
+            loaded = await self.repository.list_any_as(
+                StructUserOutput, "email", missing
+            )
+            await self._cache_users(loaded)
+            users.update((user.email, user) for user in loaded)
+        return users
+
+    async def _cached_users(self, ids: list[int]) -> dict[int, StructUserOutput]:
+        if self.cache is None:
+            return {}
+        values = await self.cache.get_many([USER_KEY.format(i) for i in ids])
+        return {
+            user_id: _user_decoder.decode(value)
+            for user_id, value in zip(ids, values)
+            if value is not None
+        }
+
+    async def _cache_users(self, users: Iterable[StructUserOutput]) -> None:
+        if self.cache is None:
+            return
+        entries: dict[str, bytes] = {}
+        for user in users:
+            entries[USER_KEY.format(user.id)] = encode_json(user)
+            entries[EMAIL_KEY.format(user.email)] = str(user.id).encode()
+        await self.cache.set_many(entries)
+
+    async def _forget(self, user_id: int) -> None:
+        """Drop the cached user, its email entry is checked when it is read"""
+        if self.cache is not None:
+            await self.cache.delete_many([USER_KEY.format(user_id)])
+
+    async def get_users(
+        self, *filters: FilterTypes, fields: Optional[tuple[str, ...]] = None
+    ) -> tuple[OffsetPagination[Any], list[tuple[int, datetime]]]:
+        """Page of users with only ``fields`` (see ``user_output_type``), along
+        with the ``(id, updated_at)`` of each of them"""
+        users, versions, count = await self.repository.list_and_count_versioned_as(
+            user_output_type(fields), *filters
+        )
+        return self._paginate(users, count, filters), versions
+
+    async def get_users_versions(
+        self, *filters: FilterTypes
+    ) -> OffsetPagination[tuple[int, datetime]]:
+        """The page ``get_users`` would return, as ``(id, updated_at)`` pairs"""
+        versions, count = await self.repository.list_versions(*filters)
+        return self._paginate(versions, count, filters)
+
+    @staticmethod
+    def _paginate(
+        items: list[T], count: int, filters: tuple[FilterTypes, ...]
+    ) -> OffsetPagination[T]:
+        limit_offset = next(
+            (f for f in filters if isinstance(f, LimitOffset)),
+            LimitOffset(limit=len(items), offset=0),
+        )
+        return OffsetPagination[T](
+            items=items,
+            limit=limit_offset.limit,
+            offset=limit_offset.offset,
+            total=count,
         )
 
     async def create(self, *, data: InputModelT) -> User:
@@ -96,7 +223,7 @@ class UserService(SQLAlchemyAsyncRepositoryService[User]):
 
             return await super().create(_schema)
 
-        except EmailNotValidError as ex:
+        except PydanticCustomError as ex:
             raise EmailValidationException(detail=f"{ex}")
         except IntegrityError:
             raise IntegrityException(
@@ -123,15 +250,25 @@ class UserService(SQLAlchemyAsyncRepositoryService[User]):
                 name, validated_email = validate_email(email)
                 _schema.update(email=validated_email)
 
-            return await super().update(data=_schema, item_id=user_id)
+            user = await super().update(data=_schema, item_id=user_id)
+            await self._forget(user_id)
+            return user
 
-        except EmailNotValidError as ex:
+        except PydanticCustomError as ex:
             raise EmailValidationException(detail=f"{ex}")
         except NotFoundError:
             raise NotFoundException(detail=f"No User found with {user_id=}")
         except Exception as ex:
+            if isinstance(ex, DeadlineExceededException) or is_query_canceled(ex):
+                # answered with a 504, by Litestar or the deadline exception handler
+                raise
             raise HTTPException(detail=f"{ex}")
 
+    async def delete(self, item_id: Any, **kwargs: Any) -> User:
+        user = await super().delete(item_id, **kwargs)
+        await self._forget(user.id)
+        return user
+
     async def authenticate(self, data: InputModelT) -> User:
         if is_dataclass(data):
             _schema: dict[str, Any] = asdict(data)
@@ -186,7 +323,7 @@ class RefreshTokenService(SQLAlchemyAsyncRepositoryService[RefreshToken]):
         return refresh_token
 
     async def delete(self, refresh_token: str) -> RefreshToken:
-        return await super().delete(id_attribute=refresh_token)
+        return await super().delete(refresh_token, id_attribute="refresh_token")
 
     async def refresh_access_token(
         self, refresh_token: str, access_token_header: str
@@ -199,7 +336,7 @@ class RefreshTokenService(SQLAlchemyAsyncRepositoryService[RefreshToken]):
         if datetime.now(timezone.utc) > refresh_token.created_at + timedelta(
             seconds=refresh_token.expires_in
         ):
-            await self.delete(refresh_token.id)
+            await self.delete(refresh_token.refresh_token)
             raise HTTPException(
                 detail="Refresh token expires, you must log in again", status_code=401
             )
@@ -1,7 +1,6 @@
 from typing import Any
 
 from advanced_alchemy.exceptions import IntegrityError
-from email_validator.exceptions_types import EmailNotValidError
 from litestar import status_codes
 from litestar.connection import Request
 from litestar.exceptions import (
@@ -90,5 +89,5 @@ class IntegrityException(HTTPException):
     status_code = status_codes.HTTP_409_CONFLICT
 
 
-class EmailValidationException(HTTPException, EmailNotValidError):
+class EmailValidationException(HTTPException, ValueError):
     status_code = status_codes.HTTP_400_BAD_REQUEST
@@ -0,0 +1,110 @@
+from dataclasses import dataclass
+from typing import Any, Optional, TypeVar
+
+from litestar import MediaType, Request, Response, status_codes
+from litestar.openapi.spec import Operation
+from litestar.serialization import default_serializer, encode_msgpack
+from litestar.types import Serializer
+
+__all__ = [
+    "MSGPACK",
+    "MSGPACK_MEDIA_TYPES",
+    "MessagePackOperation",
+    "NegotiatedRequest",
+    "NegotiatedResponse",
+    "response_media_type",
+]
+
+T = TypeVar("T")
+
+MSGPACK = "application/msgpack"
+MSGPACK_MEDIA_TYPES = frozenset({MSGPACK, MediaType.MESSAGEPACK.value})
+"""MessagePack media types, ``application/x-msgpack`` is still common"""
+
+_RESPONSE_MEDIA_TYPES = [MediaType.JSON.value, MSGPACK, MediaType.MESSAGEPACK.value]
+
+
+def response_media_type(request: Request[Any, Any, Any]) -> str:
+    """Media type of the response body, MessagePack when ``Accept`` prefers it.
+
+    JSON wins ties and ``*/*``, browsers and existing clients are unaffected.
+    """
+    accept = request.headers.get("accept")
+    if not accept or "msgpack" not in accept:
+        return MediaType.JSON.value
+    return request.accept.best_match(
+        _RESPONSE_MEDIA_TYPES, default=MediaType.JSON.value
+    )
+
+
+def _is_json(media_type: Optional[str]) -> bool:
+    # handlers returning responses leave the media type empty, JSON by default
+    return not media_type or media_type == MediaType.JSON
+
+
+class NegotiatedRequest(Request[Any, Any, Any]):
+    """Request decoding MessagePack bodies wherever JSON is expected.
+
+    Handlers and middlewares read the body with ``json()``, a body sent with a
+    MessagePack ``Content-Type`` is decoded into the same Python values.
+    """
+
+    async def json(self) -> Any:
+        if self.content_type[0] in MSGPACK_MEDIA_TYPES:
+            return await self.msgpack()
+        return await super().json()
+
+
+class NegotiatedResponse(Response[T]):
+    """Response encoded as JSON or MessagePack, as the ``Accept`` header asks.
+
+    The negotiated body varies with ``Accept``, so do the shared caches. The
+    ETag of a MessagePack body is weak: the representations are equivalent,
+    not byte for byte identical.
+    """
+
+    def render(
+        self, content: Any, media_type: str, enc_hook: Serializer = default_serializer
+    ) -> bytes:
+        if self.status_code == status_codes.HTTP_304_NOT_MODIFIED:
+            # the negotiated headers of the 200 it stands for, never a body
+            return b""
+        if media_type in MSGPACK_MEDIA_TYPES and not isinstance(content, bytes):
+            return encode_msgpack(content, enc_hook)
+        return super().render(content, media_type, enc_hook)
+
+    def to_asgi_response(  # type: ignore[override]
+        self, app: Any, request: Request[Any, Any, Any], **kwargs: Any
+    ) -> Any:
+        if _is_json(self.media_type or kwargs.get("media_type")):
+            self.headers["Vary"] = ", ".join(
+                filter(None, (self.headers.get("Vary"), "Accept"))
+            )
+            media_type = response_media_type(request)
+            if media_type in MSGPACK_MEDIA_TYPES:
+                self.media_type = media_type
+                etag = self.headers.get("ETag")
+                if etag and not etag.startswith("W/"):
+                    self.headers["ETag"] = f"W/{etag}"
+        return super().to_asgi_response(app, request, **kwargs)
+
+
+@dataclass
+class MessagePackOperation(Operation):
+    """Operation documenting MessagePack next to JSON for its bodies.
+
+    Set as ``operation_class`` of the handlers accepting or returning JSON,
+    the MessagePack entries share the JSON schemas.
+    """
+
+    def __post_init__(self) -> None:
+        if self.request_body is not None:
+            _add_msgpack(self.request_body.content)
+        for status, response in (self.responses or {}).items():
+            if status.startswith("2") and response.content:
+                _add_msgpack(response.content)
+
+
+def _add_msgpack(content: dict[str, Any]) -> None:
+    if MediaType.JSON.value in content:
+        content.setdefault(MSGPACK, content[MediaType.JSON.value])
@@ -29,4 +29,7 @@ class PydanticBaseModel(BaseModel):
         from_attributes=True,
         use_enum_values=True,
         arbitrary_types_allowed=True,
+        # validators are built on first use (or by the warmup), ``EmailStr``
+        # imports email_validator, ~40ms, as soon as its schema is built
+        defer_build=True,
     )
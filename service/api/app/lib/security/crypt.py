@@ -1,6 +1,16 @@
-from passlib.context import CryptContext
+from functools import cache
+from typing import TYPE_CHECKING
 
-hash_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+
+@cache
+def get_hash_context() -> "CryptContext":
+    """Password hashing context, passlib is imported on first use"""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def verify_password(user_password: str, hashed_password: str) -> bool:
@@ -10,7 +20,7 @@ def verify_password(user_password: str, hashed_password: str) -> bool:
     :param hashed_password: hashed password
     :return: ``True`` if the hashed term is the specified user term, else ``None``
     """
-    return hash_context.verify(user_password, hashed_password)
+    return get_hash_context().verify(user_password, hashed_password)
 
 
 def generate_hashed_password(*, password: str) -> str:
@@ -19,4 +29,4 @@ def generate_hashed_password(*, password: str) -> str:
     :param password: Password string which must be hashed
     :return: A hashed string
     """
-    return hash_context.hash(password)
+    return get_hash_context().hash(password)
@@ -1,6 +1,7 @@
 import secrets
 from datetime import datetime, timedelta
 from typing import Any, Union
+from uuid import uuid4
 
 import jwt
 from litestar.exceptions import NotAuthorizedException
@@ -8,6 +9,7 @@ from litestar.exceptions import NotAuthorizedException
 from app.core import settings
 from app.domain.schemas import AccessTokenPayload
 
+from .keys import get_key_ring
 from .utils import get_authorization_scheme_param
 
 API_KEY_HEADER = settings.auth.KEY_HEADER
@@ -15,8 +17,6 @@ API_KEY_HEADER = settings.auth.KEY_HEADER
 
 def encode_jwt_token(
     subject: Union[str, Any],
-    private_key: str = settings.auth.JWT_PRIVATE_KEY_PATH.read_text(),
-    algorithm: str = settings.auth.ALGORITHM,
     *,
     expires: timedelta | None = None,
 ) -> str:
@@ -29,23 +29,25 @@ def encode_jwt_token(
 
     payload = {
         "sub": subject,
+        "jti": uuid4().hex,
         "iat": datetime.utcnow(),  # noqa: DTZ003
         "exp": expire,
     }
 
-    return jwt.encode(payload, private_key, algorithm)
+    return get_key_ring().sign(payload)
 
 
-def decode_jwt_token(
-    token_header_value: str,
-    public_key: str = settings.auth.JWT_PUBLIC_KEY_PATH.read_text(),
-    algorithm: str = settings.auth.ALGORITHM,
-) -> Any:
+def decode_jwt_token(token_header_value: str) -> Any:
     token_type, token_value = get_authorization_scheme_param(token_header_value)
     if token_type.lower() != "bearer":
         raise NotAuthorizedException()
 
-    payload = jwt.decode(token_value, public_key, algorithms=[algorithm])
+    key_ring = get_key_ring()
+    public_key = key_ring.public_key(jwt.get_unverified_header(token_value).get("kid"))
+    if public_key is None:
+        raise NotAuthorizedException()
+
+    payload = jwt.decode(token_value, public_key, algorithms=[key_ring.algorithm])
 
     return AccessTokenPayload(**payload)
 
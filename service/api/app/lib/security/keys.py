@@ -0,0 +1,102 @@
+import base64
+import hashlib
+import json
+from collections.abc import Sequence
+from dataclasses import dataclass
+from functools import cache
+from typing import Any, Optional
+
+import jwt
+from litestar.exceptions import ImproperlyConfiguredException
+
+from app.core import settings
+
+_THUMBPRINT_MEMBERS = {
+    "RSA": ("e", "kty", "n"),
+    "EC": ("crv", "kty", "x", "y"),
+    "OKP": ("crv", "kty", "x"),
+}
+"""Required members of each key type, the ones a thumbprint hashes"""
+
+
+def thumbprint(jwk: dict[str, Any]) -> str:
+    """RFC 7638 thumbprint of a public JWK, used as its ``kid``"""
+    members = {name: jwk[name] for name in _THUMBPRINT_MEMBERS[jwk["kty"]]}
+    digest = hashlib.sha256(
+        json.dumps(members, separators=(",", ":"), sort_keys=True).encode()
+    ).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+@dataclass(frozen=True)
+class PublicKey:
+    kid: str
+    pem: str
+    jwk: dict[str, Any]
+
+
+class KeyRing:
+    """Key signing the tokens and the public keys verifying them.
+
+    Tokens carry the ``kid`` of the public key matching their signing key,
+    verifiers pick the key by ``kid`` here or in the published JWKS. One of
+    the public keys has to match the private key, the others stay valid: the
+    previous keys while tokens they signed may still be in use, the next key
+    ahead of a rotation so verifiers fetch it before the first token it signs.
+    """
+
+    def __init__(
+        self, *, private_key: str, public_keys: Sequence[str], algorithm: str
+    ) -> None:
+        self.algorithm = algorithm
+        self._algorithm = jwt.get_algorithm_by_name(algorithm)
+        # parsed once, loading a PEM private key takes tens of milliseconds
+        self._signing_key = self._algorithm.prepare_key(private_key)
+        keys = [self._load(pem) for pem in public_keys]
+        self.keys = {key.kid: key for key in keys}
+        self.signing_kid = thumbprint(
+            self._algorithm.to_jwk(self._signing_key.public_key(), as_dict=True)
+        )
+        if self.signing_kid not in self.keys:
+            raise ImproperlyConfiguredException(
+                "None of the JWT public keys matches the private key"
+            )
+        self.jwks = {"keys": [key.jwk for key in self.keys.values()]}
+        # served as is, the keys only change with a restart
+        self.jwks_json = json.dumps(self.jwks, separators=(",", ":")).encode()
+
+    def sign(self, claims: dict[str, Any]) -> str:
+        """Token of ``claims``, stamped with the signing key's ``kid``"""
+        return jwt.encode(
+            claims,
+            self._signing_key,
+            self.algorithm,
+            headers={"kid": self.signing_kid},
+        )
+
+    def public_key(self, kid: Optional[str]) -> Optional[str]:
+        """Public key of ``kid``, ``None`` for unknown keys.
+
+        Tokens issued before keys had ids carry none, the signing key signed
+        them.
+        """
+        key = self.keys.get(kid if kid is not None else self.signing_kid)
+        return key.pem if key is not None else None
+
+    def _load(self, pem: str) -> PublicKey:
+        jwk = self._algorithm.to_jwk(self._algorithm.prepare_key(pem), as_dict=True)
+        kid = thumbprint(jwk)
+        jwk.update(kid=kid, use="sig", alg=self.algorithm)
+        return PublicKey(kid=kid, pem=pem, jwk=jwk)
+
+
+@cache
+def get_key_ring() -> KeyRing:
+    """Key ring of the configured keys, read once"""
+    auth = settings.auth
+    paths = [auth.JWT_PUBLIC_KEY_PATH, *auth.JWT_ADDITIONAL_PUBLIC_KEY_PATHS]
+    return KeyRing(
+        private_key=auth.JWT_PRIVATE_KEY_PATH.read_text(),
+        public_keys=[path.read_text() for path in paths],
+        algorithm=auth.ALGORITHM,
+    )
@@ -0,0 +1,88 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
+
+from jose import JWTError, jwt
+from litestar.exceptions import NotAuthorizedException
+from litestar.security.jwt import Token
+
+from app.utils.metrics.collectors import TOKEN_VERIFICATIONS
+
+from .keys import KeyRing
+
+
+class TokenVerifier:
+    """Verifies access tokens, remembering the valid ones until they expire.
+
+    A client sends the same token with every request of its lifetime, the
+    RS256 signature is checked once per process instead of on each of them.
+    The most recently used ``maxsize`` tokens are kept.
+
+    The auth middleware and the introspection route share the verifier, a
+    token seen by either is cached for both. The key is picked in
+    ``key_ring`` by the token's ``kid``.
+
+    Invalid tokens are remembered too, for ``invalid_ttl`` seconds: replaying
+    a forged token costs a lookup, not another signature check.
+    """
+
+    def __init__(
+        self, *, key_ring: KeyRing, maxsize: int = 10_000, invalid_ttl: float = 60.0
+    ) -> None:
+        self.key_ring = key_ring
+        self.maxsize = maxsize
+        self.invalid_ttl = invalid_ttl
+        self._tokens: OrderedDict[str, Token] = OrderedDict()
+        # token -> ``time.monotonic()`` its rejection is forgotten at
+        self._invalid: OrderedDict[str, float] = OrderedDict()
+
+    def verify(self, encoded_token: str) -> Token:
+        """Decoded ``encoded_token``, ``NotAuthorizedException`` when invalid
+        or expired"""
+        token = self._tokens.get(encoded_token)
+        if token is not None:
+            if token.exp > datetime.now(timezone.utc):
+                self._tokens.move_to_end(encoded_token)
+                TOKEN_VERIFICATIONS.labels("cached").inc()
+                return token
+            del self._tokens[encoded_token]
+
+        rejected_until = self._invalid.get(encoded_token)
+        if rejected_until is not None:
+            if rejected_until > time.monotonic():
+                TOKEN_VERIFICATIONS.labels("invalid_cached").inc()
+                raise NotAuthorizedException("Invalid token")
+            del self._invalid[encoded_token]
+
+        try:
+            token = self._decode(encoded_token)
+        except NotAuthorizedException:
+            TOKEN_VERIFICATIONS.labels("invalid").inc()
+            self._invalid[encoded_token] = time.monotonic() + self.invalid_ttl
+            if len(self._invalid) > self.maxsize:
+                self._invalid.popitem(last=False)
+            raise
+        TOKEN_VERIFICATIONS.labels("verified").inc()
+        self._tokens[encoded_token] = token
+        if len(self._tokens) > self.maxsize:
+            self._tokens.popitem(last=False)
+        return token
+
+    def _decode(self, encoded_token: str) -> Token:
+        try:
+            kid = jwt.get_unverified_header(encoded_token).get("kid")
+        except JWTError as ex:
+            raise NotAuthorizedException("Invalid token") from ex
+        key = self.key_ring.public_key(kid)
+        if key is None:
+            raise NotAuthorizedException("Unknown signing key")
+        return Token.decode(
+            encoded_token=encoded_token, secret=key, algorithm=self.key_ring.algorithm
+        )
+
+    def verify_or_none(self, encoded_token: str) -> Optional[Token]:
+        try:
+            return self.verify(encoded_token)
+        except NotAuthorizedException:
+            return None
@@ -0,0 +1,68 @@
+from collections.abc import Iterable
+from functools import lru_cache
+from typing import Any, TypeVar
+
+import msgspec
+from sqlalchemy.engine import Row
+
+__all__ = ["encode_json", "sparse_struct", "to_struct", "to_structs"]
+
+StructT = TypeVar("StructT", bound=msgspec.Struct)
+
+_encoder = msgspec.json.Encoder()
+
+
+def _is_projection(row: Any, struct_type: type[msgspec.Struct]) -> bool:
+    """Core row selecting exactly the struct's fields, in the same order"""
+    return isinstance(row, Row) and row._fields == struct_type.__struct_fields__
+
+
+def to_struct(data: Any, struct_type: type[StructT]) -> StructT:
+    """Convert an ORM instance, a Core ``Row`` or a mapping into ``struct_type``.
+
+    Only the struct's fields are read, so unloaded or sensitive ORM attributes
+    (``hashed_password``, relationships) are never touched.
+    """
+    if _is_projection(data, struct_type):
+        return struct_type(*data)
+    return msgspec.convert(data, struct_type, from_attributes=True)
+
+
+def to_structs(rows: Iterable[Any], struct_type: type[StructT]) -> list[StructT]:
+    """Convert many rows at once, cheaper than one :func:`to_struct` per row.
+
+    Rows projected onto the struct's columns are built positionally, the
+    database already guarantees their types and that skips validation.
+    """
+    rows = rows if isinstance(rows, list) else list(rows)
+    if rows and _is_projection(rows[0], struct_type):
+        return [struct_type(*row) for row in rows]
+    return msgspec.convert(
+        rows,
+        list[struct_type],  # type: ignore[valid-type]
+        from_attributes=True,
+    )
+
+
+@lru_cache(maxsize=64)
+def sparse_struct(
+    struct_type: type[msgspec.Struct], fields: tuple[str, ...]
+) -> type[msgspec.Struct]:
+    """``struct_type`` with only ``fields``, for sparse fieldsets.
+
+    Fields keep the struct's order, types and encoded names. The type is built
+    once per field set, callers validate ``fields`` against the struct.
+    """
+    selected = [f for f in msgspec.structs.fields(struct_type) if f.name in fields]
+    return msgspec.defstruct(
+        f"{struct_type.__name__}[{','.join(f.name for f in selected)}]",
+        [(f.name, f.type) for f in selected],
+        rename={f.name: f.encode_name for f in selected},
+        module=struct_type.__module__,
+        gc=struct_type.__struct_config__.gc,
+    )
+
+
+def encode_json(data: Any) -> bytes:
+    """Encode structs (or anything msgspec supports) straight to JSON bytes"""
+    return _encoder.encode(data)
@@ -1,12 +1,27 @@
 from litestar import Litestar
+from litestar.stores.registry import StoreRegistry
 
-from app.core.config import cache_config
+from app.core.config import cache_config, openapi_config, provide_store
 from app.domain import listeners
 from app.domain.guards import o2auth
 from app.lib.dependencies import create_collection_dependencies
+from app.lib.negotiation import NegotiatedRequest, NegotiatedResponse
 
 from . import events
-from .plugins import rabbitmq_plugin, sqlalchemy_init_plugin, structlog_plugin
+from .plugins import (
+    compression_plugin,
+    concurrency_plugin,
+    deadline_plugin,
+    metrics_plugin,
+    profiling_plugin,
+    query_stats_plugin,
+    rabbitmq_plugin,
+    rate_limit_plugin,
+    read_replica_plugin,
+    revocation_plugin,
+    sqlalchemy_init_plugin,
+    structlog_plugin,
+)
 from .routes import route_handlers
 
 
@@ -14,13 +29,28 @@ def configure_app() -> Litestar:
     dependencies = create_collection_dependencies()
 
     return Litestar(
-        path="/api",
         dependencies=dependencies,
+        request_class=NegotiatedRequest,
+        response_class=NegotiatedResponse,
         response_cache_config=cache_config,
+        openapi_config=openapi_config,
+        stores=StoreRegistry(default_factory=provide_store),
         route_handlers=route_handlers,
-        plugins=[sqlalchemy_init_plugin, rabbitmq_plugin, structlog_plugin],
+        plugins=[
+            sqlalchemy_init_plugin,
+            query_stats_plugin,
+            read_replica_plugin,
+            rate_limit_plugin,
+            deadline_plugin,
+            concurrency_plugin,
+            compression_plugin,
+            rabbitmq_plugin,
+            revocation_plugin,
+            structlog_plugin,
+            profiling_plugin,
+            metrics_plugin,
+        ],
         on_app_init=[o2auth.on_app_init],
-        middleware=[o2auth.middleware],
         listeners=[listeners.user_created],
         lifespan=[events.lifespan],
     )
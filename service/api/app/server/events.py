@@ -1,28 +1,51 @@
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import TYPE_CHECKING, AsyncGenerator, Optional
 
-from aio_pika import Connection
+import structlog
 from litestar import Litestar
 
+from app.core import settings
+from app.core.config import broker_breaker
 from app.utils.logging.setup import setup_logging_configurator
 from app.utils.message_brokers.setup import setup_message_brokers
 
+from .warmup import warmup
+
+if TYPE_CHECKING:
+    from aio_pika import Connection
+
+logger = structlog.get_logger()
+
 
 @asynccontextmanager
 async def lifespan(app: Litestar) -> AsyncGenerator[None, None]:
     # try:
     broker_coroutine_connection = app.dependencies.get("rmq_session")
-    connection: Connection = await broker_coroutine_connection()
-
-    emails_broker, logs_broker = setup_message_brokers(connection)
-    await emails_broker.setup()
-    await logs_broker.setup()
+    connection: Optional["Connection"] = None
+    try:
+        connection = await broker_breaker.call(broker_coroutine_connection)
+    except Exception as ex:  # noqa: BLE001
+        # start anyway, the brokers buffer messages and connect once it's back
+        logger.warning("Message broker unavailable at startup", error=repr(ex))
+
+    emails_broker, logs_broker = setup_message_brokers(
+        connection,
+        connect=broker_coroutine_connection,
+        breaker=broker_breaker,
+        buffer_size=settings.rabbitmq.AMQP_BUFFER_SIZE,
+    )
+    if connection is not None:
+        await emails_broker.start()
+        await logs_broker.start()
 
     # configurator = setup_logging_configurator(logs_broker)
     # configurator.configure_loggers()
 
     app.dependencies.update({"emails_broker": emails_broker})
 
+    if settings.server.WARMUP_ENABLED:
+        app.state.warmup = await warmup(app)
+
     # except Exception as e:
     #     reconnection: Connection = await broker_coroutine_connection()
     #     app.dependencies.update({"rmq_session": reconnection})
@@ -30,7 +53,5 @@ async def lifespan(app: Litestar) -> AsyncGenerator[None, None]:
 
     yield
 
-    try:
-        await connection.close()
-    except Exception as e:
-        raise e
+    for broker in (emails_broker, logs_broker):
+        await broker.close()
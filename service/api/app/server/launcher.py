@@ -0,0 +1,263 @@
+"""Multi-process launcher::
+
+    python -m app.server.launcher
+
+Starts ``SERVER_WORKERS`` uvicorn workers (one per available CPU by default)
+on a shared socket and splits ``DB_CONNECTION_BUDGET`` and
+``REDIS_CONNECTION_BUDGET`` between them. uvloop and httptools are used when
+installed.
+
+A worker that served ``WORKER_MAX_REQUESTS`` requests or grew past
+``WORKER_MAX_MEMORY_MB`` drains its requests and exits, and the supervisor
+starts a replacement. ``SIGHUP`` replaces every worker one at a time, so the
+others keep serving during a rolling restart.
+"""
+
+import importlib.util
+import math
+import multiprocessing
+import os
+import random
+import resource
+import signal
+import threading
+import time
+from multiprocessing.context import SpawnProcess
+from multiprocessing.synchronize import Event as EventType
+from pathlib import Path
+from socket import socket
+from types import FrameType
+from typing import Optional
+
+import structlog
+import uvicorn
+from uvicorn._subprocess import get_subprocess
+
+from app.core import settings
+from app.core.base import ServerSettings
+
+logger = structlog.get_logger()
+
+CRASH_BACKOFF = 1.0
+"""Seconds to wait before replacing a worker which died right after start"""
+STARTUP_TIMEOUT = 60.0
+"""Seconds a rolling restart waits for a new worker before stopping the old one"""
+
+
+def available_cpus() -> int:
+    """CPUs this process may use, honouring affinity and the cgroup CPU quota"""
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+    except (OSError, ValueError):
+        return cpus
+    if quota == "max":
+        return cpus
+    return max(1, min(cpus, math.ceil(int(quota) / int(period))))
+
+
+def resident_memory() -> int:
+    """Current resident set size of this process, in bytes"""
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+    except (OSError, IndexError, ValueError):
+        # peak instead of current, still fine to decide on a restart
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def worker_environment(server: ServerSettings, workers: int) -> dict[str, str]:
+    """Pool sizes of one worker, as settings overrides for its environment.
+
+    Half of a worker's Postgres share (rounded up) stays open in the pool,
+    the rest is overflow opened under load.
+    """
+    environment = {}
+    if server.DB_CONNECTION_BUDGET:
+        per_worker = server.DB_CONNECTION_BUDGET // workers
+        if per_worker < 1:
+            raise SystemExit(
+                f"DB_CONNECTION_BUDGET={server.DB_CONNECTION_BUDGET} "
+                f"can't give a connection to each of the {workers} workers"
+            )
+        pool_size = math.ceil(per_worker / 2)
+        environment["POOL_SIZE"] = str(pool_size)
+        environment["POOL_MAX_OVERFLOW"] = str(per_worker - pool_size)
+
+    if server.REDIS_CONNECTION_BUDGET:
+        per_worker = server.REDIS_CONNECTION_BUDGET // workers
+        if per_worker < 1:
+            raise SystemExit(
+                f"REDIS_CONNECTION_BUDGET={server.REDIS_CONNECTION_BUDGET} "
+                f"can't give a connection to each of the {workers} workers"
+            )
+        environment["REDIS_MAX_CONNECTIONS"] = str(per_worker)
+    return environment
+
+
+class WorkerServer(uvicorn.Server):
+    """``uvicorn.Server`` which also exits once it uses more than ``max_memory``.
+
+    ``ready`` is set once the application started and the worker accepts
+    connections.
+    """
+
+    def __init__(
+        self,
+        config: uvicorn.Config,
+        max_memory: int = 0,
+        ready: Optional[EventType] = None,
+    ) -> None:
+        super().__init__(config)
+        self.max_memory = max_memory
+        self.ready = ready
+
+    async def startup(self, sockets: Optional[list[socket]] = None) -> None:
+        await super().startup(sockets)
+        if self.ready is not None and self.started:
+            self.ready.set()
+
+    async def on_tick(self, counter: int) -> bool:
+        # ticks are 0.1s apart, checking once a second is plenty
+        if self.max_memory and counter % 10 == 0 and not self.should_exit:
+            rss = resident_memory()
+            if rss > self.max_memory:
+                logger.warning(
+                    "Worker memory limit reached, restarting",
+                    pid=os.getpid(),
+                    rss_mb=rss // 2**20,
+                    limit_mb=self.max_memory // 2**20,
+                )
+                self.should_exit = True
+        return await super().on_tick(counter)
+
+
+class Supervisor:
+    """Keeps ``workers`` processes serving, replacing the ones which exit"""
+
+    def __init__(self, server: ServerSettings, workers: int) -> None:
+        self.server = server
+        self.workers = workers
+        self.processes: list[SpawnProcess] = []
+        self.started_at: dict[int, float] = {}
+        self.ready: dict[int, EventType] = {}
+        self.should_exit = threading.Event()
+        self.should_restart = threading.Event()
+        self.socket: Optional[socket] = None
+
+    def config(self) -> uvicorn.Config:
+        server, max_requests = self.server, None
+        if server.WORKER_MAX_REQUESTS:
+            jitter = random.randint(0, server.WORKER_MAX_REQUESTS_JITTER)  # noqa: S311
+            max_requests = server.WORKER_MAX_REQUESTS + jitter
+        return uvicorn.Config(
+            "app.main:create_app",
+            factory=True,
+            host=server.SERVER_HOST,
+            port=server.SERVER_PORT,
+            loop="auto",
+            http="auto",
+            limit_max_requests=max_requests,
+            timeout_graceful_shutdown=server.WORKER_GRACEFUL_TIMEOUT,
+        )
+
+    def spawn(self) -> SpawnProcess:
+        config = self.config()
+        worker = WorkerServer(
+            config,
+            max_memory=self.server.WORKER_MAX_MEMORY_MB * 2**20,
+            ready=multiprocessing.get_context("spawn").Event(),
+        )
+        process = get_subprocess(
+            config=config, target=worker.run, sockets=[self.socket]
+        )
+        process.start()
+        self.started_at[process.pid] = time.monotonic()
+        self.ready[process.pid] = worker.ready
+        return process
+
+    def stop(self, process: SpawnProcess) -> None:
+        process.terminate()
+        process.join(self.server.WORKER_GRACEFUL_TIMEOUT + 5)
+        if process.is_alive():
+            logger.warning("Worker didn't stop in time, killing it", pid=process.pid)
+            process.kill()
+            process.join()
+        self.started_at.pop(process.pid, None)
+        self.ready.pop(process.pid, None)
+
+    def replace_exited(self) -> None:
+        for index, process in enumerate(self.processes):
+            if process.is_alive() or self.should_exit.is_set():
+                continue
+            uptime = time.monotonic() - self.started_at.pop(process.pid, 0.0)
+            self.ready.pop(process.pid, None)
+            logger.info(
+                "Worker exited, starting a new one",
+                pid=process.pid,
+                exitcode=process.exitcode,
+                uptime_s=round(uptime, 1),
+            )
+            if process.exitcode and uptime < CRASH_BACKOFF * 5:
+                time.sleep(CRASH_BACKOFF)
+            self.processes[index] = self.spawn()
+
+    def rolling_restart(self) -> None:
+        logger.info("Rolling restart", workers=len(self.processes))
+        for index, process in enumerate(list(self.processes)):
+            if self.should_exit.is_set():
+                return
+            replacement = self.spawn()
+            self.processes[index] = replacement
+            # the old worker keeps serving until the new one accepts connections
+            if not self.ready[replacement.pid].wait(STARTUP_TIMEOUT):
+                logger.warning("Worker not ready in time", pid=replacement.pid)
+            self.stop(process)
+
+    def handle_exit(self, sig: int, frame: Optional[FrameType]) -> None:
+        self.should_exit.set()
+
+    def handle_restart(self, sig: int, frame: Optional[FrameType]) -> None:
+        self.should_restart.set()
+
+    def run(self) -> None:
+        self.socket = self.config().bind_socket()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self.handle_exit)
+        signal.signal(signal.SIGHUP, self.handle_restart)
+
+        self.processes = [self.spawn() for _ in range(self.workers)]
+        while not self.should_exit.wait(0.5):
+            if self.should_restart.is_set():
+                self.should_restart.clear()
+                self.rolling_restart()
+            self.replace_exited()
+
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            self.stop(process)
+        self.socket.close()
+
+
+def main() -> None:
+    server = settings.server
+    workers = server.SERVER_WORKERS or available_cpus()
+    environment = worker_environment(server, workers)
+    os.environ.update(environment)
+
+    logger.info(
+        "Starting workers",
+        workers=workers,
+        uvloop=importlib.util.find_spec("uvloop") is not None,
+        httptools=importlib.util.find_spec("httptools") is not None,
+        **{key.lower(): value for key, value in environment.items()},
+    )
+    Supervisor(server, workers).run()
+
+
+if __name__ == "__main__":
+    main()
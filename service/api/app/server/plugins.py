@@ -1,9 +1,39 @@
 from litestar.plugins.sqlalchemy import SQLAlchemyInitPlugin
 from litestar.plugins.structlog import StructlogPlugin
 
-from app.core.config import alchemy_config, log_config, rabbitmq_config
+from app.core.config import (
+    alchemy_config,
+    compression_config,
+    concurrency_config,
+    deadline_config,
+    log_config,
+    metrics_config,
+    profiling_config,
+    query_stats_config,
+    rabbitmq_config,
+    rate_limit_config,
+    replica_config,
+    revocation_config,
+)
+from app.utils.compression import CompressionPlugin
+from app.utils.concurrency import ConcurrencyLimitPlugin
+from app.utils.deadline import DeadlinePlugin
 from app.utils.message_brokers.plugin import RabbitMQPlugin
+from app.utils.metrics import MetricsPlugin
+from app.utils.profiling import ProfilingPlugin
+from app.utils.ratelimit import RateLimitPlugin
+from app.utils.revocation import RevocationPlugin
+from app.utils.sql import QueryStatsPlugin, ReadReplicaPlugin
 
 sqlalchemy_init_plugin = SQLAlchemyInitPlugin(config=alchemy_config)
+query_stats_plugin = QueryStatsPlugin(config=query_stats_config)
+read_replica_plugin = ReadReplicaPlugin(config=replica_config)
+rate_limit_plugin = RateLimitPlugin(config=rate_limit_config)
+deadline_plugin = DeadlinePlugin(config=deadline_config)
+concurrency_plugin = ConcurrencyLimitPlugin(config=concurrency_config)
+compression_plugin = CompressionPlugin(config=compression_config)
 structlog_plugin = StructlogPlugin(config=log_config)
+profiling_plugin = ProfilingPlugin(config=profiling_config)
 rabbitmq_plugin = RabbitMQPlugin(config=rabbitmq_config)
+metrics_plugin = MetricsPlugin(config=metrics_config)
+revocation_plugin = RevocationPlugin(config=revocation_config)
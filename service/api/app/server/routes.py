@@ -1,5 +1,19 @@
+from litestar import Router
 from litestar.types import ControllerRouterHandler
 
-from app.domain.controllers import AuthController, UserController
+from app.core.config import API_PATH
+from app.domain.controllers import (
+    AuthController,
+    HealthController,
+    UserController,
+    WellKnownController,
+)
 
-route_handlers: list[ControllerRouterHandler] = [UserController, AuthController]
+route_handlers: list[ControllerRouterHandler] = [
+    Router(
+        path=API_PATH,
+        route_handlers=[UserController, AuthController, HealthController],
+    ),
+    # verifiers look the keys up at the root, RFC 8615
+    WellKnownController,
+]
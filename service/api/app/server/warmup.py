@@ -0,0 +1,173 @@
+"""Startup warmup, run by ``events.lifespan`` before the app reports ready.
+
+Pays the one-off costs of the hot paths (pool connections, prepared
+statements, the Redis connection, codecs, bcrypt, JWT keys) at startup
+instead of on the first requests after a deploy.
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timezone
+from typing import Optional
+
+import structlog
+from advanced_alchemy.service import OffsetPagination
+from litestar import Litestar
+from litestar.security.jwt import Token
+from litestar.serialization import encode_json, get_serializer
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import alchemy_config, get_cache_store, replica_router
+from app.database.models import User
+from app.domain.guards import o2auth, token_verifier
+from app.domain.schemas import (
+    PydanticUserCreate,
+    PydanticUserCredentials,
+    PydanticUserUpdate,
+    StructUserOutput,
+)
+from app.domain.services import RefreshTokenService, UserService
+from app.lib.security.crypt import get_hash_context
+from app.lib.security.jwt import decode_jwt_token, encode_jwt_token
+from app.lib.serialization import encode_json as encode_struct_json
+from app.lib.serialization import to_struct
+from app.utils.sql import ReadRoute, current_read_route
+
+logger = structlog.get_logger()
+
+WarmupStep = Callable[[Litestar], Awaitable[None]]
+
+
+def _engines() -> list[AsyncEngine]:
+    return [alchemy_config.get_engine(), *replica_router.replicas]
+
+
+async def open_db_connections(app: Litestar) -> None:
+    """Fill the persistent part of every pool (``POOL_SIZE`` connections)"""
+
+    async def fill(engine: AsyncEngine) -> None:
+        connections = [engine.connect() for _ in range(engine.pool.size())]
+        await asyncio.gather(*(connection.start() for connection in connections))
+        await asyncio.gather(*(connection.close() for connection in connections))
+
+    await asyncio.gather(*(fill(engine) for engine in _engines()))
+
+
+async def prepare_statements(app: Litestar) -> None:
+    """Run the hot lookups once on every pooled connection.
+
+    That compiles them into SQLAlchemy's cache and has asyncpg prepare them on
+    each connection: user by id (auth), user output by id (``GET /users/{id}``),
+    users by ids (batch lookups), user by email (login) and the refresh token
+    lookup.
+    """
+
+    async def lookups(engine: AsyncEngine) -> None:
+        route = None
+        if engine is not alchemy_config.get_engine():
+            route = ReadRoute(replica=True, engine=engine.sync_engine)
+        token = current_read_route.set(route)
+        try:
+            async with alchemy_config.get_session() as session:
+                users = UserService(session=session)
+                await users.get_one_or_none(id=0)
+                await users.repository.get_versioned_as(StructUserOutput, 0)
+                await users.repository.list_any_as(StructUserOutput, "id", [])
+                await users.get_user_with_refresh_token(email="")
+                await RefreshTokenService(session=session).get_one_or_none(
+                    refresh_token=""
+                )
+        finally:
+            current_read_route.reset(token)
+
+    await asyncio.gather(
+        *(lookups(engine) for engine in _engines() for _ in range(engine.pool.size()))
+    )
+
+
+async def touch_redis(app: Litestar) -> None:
+    await get_cache_store()._redis.ping()
+
+
+async def build_serialization_plans(app: Litestar) -> None:
+    """Build the request models' validators, validate a login once and let
+    msgspec build the user response encoders.
+
+    Pydantic models build their validators on first use, the first email
+    validation imports email_validator and the IDNA tables, about 150ms.
+    """
+    for schema in (PydanticUserCreate, PydanticUserUpdate):
+        schema.model_rebuild()
+    # throwaway credentials, only validated, never checked against a user
+    PydanticUserCredentials(username="warmup@example.com", password="warmup")  # noqa: S106
+    now = datetime.now(timezone.utc)
+    user = to_struct(
+        User(
+            id=0,
+            email="warmup@example.com",
+            is_active=True,
+            is_superuser=False,
+            is_activated=True,
+            created_at=now,
+            updated_at=now,
+        ),
+        StructUserOutput,
+    )
+    page = OffsetPagination[StructUserOutput](items=[user], limit=1, offset=0, total=1)
+    serializer = get_serializer()
+    for data in (user, page):
+        encode_json(data, serializer)
+        encode_struct_json(data)
+
+
+async def load_password_hasher(app: Litestar) -> None:
+    """Load the bcrypt backend, passlib self-tests it on first use"""
+    get_hash_context().handler("bcrypt").get_backend()
+
+
+async def load_jwt_keys(app: Litestar) -> None:
+    """Sign and verify a token once, loading the keys and crypto backends"""
+    token = o2auth.create_token(identifier="0")
+    key_ring = token_verifier.key_ring
+    Token.decode(
+        encoded_token=token,
+        secret=key_ring.public_key(key_ring.signing_kid),
+        algorithm=key_ring.algorithm,
+    )
+    decode_jwt_token(f"Bearer {encode_jwt_token('0')}")
+
+
+STEPS: dict[str, WarmupStep] = {
+    "db_connections": open_db_connections,
+    "db_statements": prepare_statements,
+    "redis": touch_redis,
+    "serialization": build_serialization_plans,
+    "password_hasher": load_password_hasher,
+    "jwt": load_jwt_keys,
+}
+
+
+async def warmup(
+    app: Litestar, steps: Optional[dict[str, WarmupStep]] = None
+) -> dict[str, float]:
+    """Run ``steps`` in order and return their duration in milliseconds.
+
+    A failing step is logged and skipped, the app still starts.
+    """
+    durations: dict[str, float] = {}
+    started = time.perf_counter()
+    for name, step in (steps or STEPS).items():
+        step_started = time.perf_counter()
+        try:
+            await step(app)
+        except Exception:  # noqa: BLE001
+            logger.warning("Warmup step failed", step=name, exc_info=True)
+        durations[name] = round((time.perf_counter() - step_started) * 1000, 3)
+
+    logger.info(
+        "Warmup finished",
+        duration_ms=round((time.perf_counter() - started) * 1000, 3),
+        **{f"{name}_ms": duration for name, duration in durations.items()},
+    )
+    return durations
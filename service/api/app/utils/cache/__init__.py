@@ -0,0 +1,4 @@
+from .records import RecordCache
+from .store import ResponseCacheStore, cache_response_filter
+
+__all__ = ["RecordCache", "ResponseCacheStore", "cache_response_filter"]
@@ -0,0 +1,91 @@
+from collections.abc import Mapping, Sequence
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+import structlog
+from redis.asyncio import Redis
+
+from app.utils.circuitbreaker import CircuitBreaker
+from app.utils.deadline.context import DeadlineExceededException
+from app.utils.metrics.collectors import RECORD_CACHE_LOOKUPS, RECORD_CACHE_WRITES
+
+from .store import REDIS_UNAVAILABLE
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+
+class RecordCache:
+    """Redis cache of small records, read and written in batches.
+
+    ``get_many`` is a single ``MGET`` and ``set_many`` a single pipeline of
+    ``SET ... EX``, whatever the number of keys. Values are opaque bytes, the
+    callers encode them and pick the keys.
+
+    Redis calls go through ``breaker``: while Redis fails or is slow lookups
+    miss and writes are dropped, the records are read from the database.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        namespace: str,
+        ttl: int,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
+        self._redis = redis
+        self.namespace = namespace
+        self.ttl = ttl
+        self.breaker = breaker
+
+    async def get_many(self, keys: Sequence[str]) -> list[Optional[bytes]]:
+        """Values of ``keys`` in the same order, ``None`` for the misses"""
+        if not keys:
+            return []
+        try:
+            values = await self._call(self._redis.mget, self._make_keys(keys))
+        except REDIS_UNAVAILABLE:
+            RECORD_CACHE_LOOKUPS.labels(self.namespace, "unavailable").inc(len(keys))
+            return [None] * len(keys)
+        hits = sum(value is not None for value in values)
+        RECORD_CACHE_LOOKUPS.labels(self.namespace, "hit").inc(hits)
+        RECORD_CACHE_LOOKUPS.labels(self.namespace, "miss").inc(len(keys) - hits)
+        return values
+
+    async def set_many(self, entries: Mapping[str, bytes]) -> None:
+        """Store ``entries`` for ``ttl`` seconds, a failed write is only logged"""
+        if not entries:
+            return
+        pipeline = self._redis.pipeline(transaction=False)
+        for key, value in entries.items():
+            pipeline.set(self._make_key(key), value, ex=self.ttl)
+        try:
+            await self._call(pipeline.execute)
+        except (*REDIS_UNAVAILABLE, DeadlineExceededException) as ex:
+            RECORD_CACHE_WRITES.labels(self.namespace, "skipped").inc(len(entries))
+            logger.warning("Record cache write skipped", error=repr(ex))
+        else:
+            RECORD_CACHE_WRITES.labels(self.namespace, "stored").inc(len(entries))
+
+    async def delete_many(self, keys: Sequence[str]) -> None:
+        """Drop ``keys``, when Redis is unavailable they expire after ``ttl``"""
+        if not keys:
+            return
+        try:
+            await self._call(self._redis.delete, *self._make_keys(keys))
+        except (*REDIS_UNAVAILABLE, DeadlineExceededException) as ex:
+            logger.warning("Record cache invalidation failed", error=repr(ex))
+
+    async def _call(
+        self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any
+    ) -> T:
+        if self.breaker is None:
+            return await func(*args, **kwargs)
+        return await self.breaker.call(func, *args, **kwargs)
+
+    def _make_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _make_keys(self, keys: Sequence[str]) -> list[str]:
+        return [self._make_key(key) for key in keys]
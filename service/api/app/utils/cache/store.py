@@ -0,0 +1,308 @@
+import asyncio
+import math
+import random
+import struct
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+import structlog
+from litestar.config.response_cache import default_do_cache_predicate
+from litestar.connection import Request
+from litestar.stores.redis import RedisStore
+from litestar.types import Empty, EmptyType, HTTPScope
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.utils.circuitbreaker import CircuitBreaker, CircuitOpenError
+from app.utils.deadline.context import DeadlineExceededException
+from app.utils.metrics.collectors import (
+    RESPONSE_CACHE_LOOKUPS,
+    RESPONSE_CACHE_STAMPEDE,
+)
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+ENTRY_HEADER = struct.Struct("!4sdd")
+"""Prefix of the stored entries: marker, recompute time (s), expiry (unix time)"""
+ENTRY_MARKER = b"xf\x00\x01"
+
+REDIS_UNAVAILABLE = (CircuitOpenError, RedisError, OSError, asyncio.TimeoutError)
+
+UNLOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass
+class Flight:
+    """Recomputation of one key in this worker, awaited by the concurrent misses"""
+
+    future: "asyncio.Future[Optional[bytes]]"
+    started: float = field(default_factory=time.monotonic)
+    lock_token: Optional[str] = None
+    """Set when this worker holds the Redis recompute lock of the key"""
+
+
+class ResponseCacheStore(RedisStore):
+    """Redis store used by the response cache, reporting hits and misses.
+
+    Protects the cached routes from stampedes when an entry expires or Redis
+    was flushed:
+
+    - concurrent misses of a key in a worker wait for the first one to fill it
+      (single-flight), up to ``wait_timeout`` seconds;
+    - entries are recomputed before they expire, with a probability growing as
+      the expiry nears and with the time they took to compute (XFetch, scaled
+      by ``beta``, 0 disables it);
+    - with ``lock_ttl`` a short Redis lock has one worker of the fleet
+      recompute a missing key, the others poll for its value.
+
+    Misses which won't be cached have to release their flight, see
+    :func:`cache_response_filter`.
+
+    Redis calls go through ``breaker``: while Redis fails or is slow the cache
+    is skipped (lookups miss, writes are dropped) and the in-process
+    single-flight still spares the database the concurrent misses.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        namespace: str | None | EmptyType = Empty,
+        handle_client_shutdown: bool = False,
+        *,
+        beta: float = 1.0,
+        lock_ttl: Optional[float] = None,
+        wait_timeout: float = 5.0,
+        poll_interval: float = 0.025,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
+        super().__init__(
+            redis=redis,
+            namespace=namespace,
+            handle_client_shutdown=handle_client_shutdown,
+        )
+        self.beta = beta
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.breaker = breaker
+        self._flights: dict[str, Flight] = {}
+        self._unlock_script = self._redis.register_script(UNLOCK)
+        self._unlock_tasks: set["asyncio.Task[Any]"] = set()
+
+    def with_namespace(self, namespace: str) -> "ResponseCacheStore":
+        return type(self)(
+            redis=self._redis,
+            namespace=f"{self.namespace}_{namespace}" if self.namespace else namespace,
+            handle_client_shutdown=self.handle_client_shutdown,
+            beta=self.beta,
+            lock_ttl=self.lock_ttl,
+            wait_timeout=self.wait_timeout,
+            poll_interval=self.poll_interval,
+            breaker=self.breaker,
+        )
+
+    async def get(
+        self, key: str, renew_for: int | timedelta | None = None
+    ) -> bytes | None:
+        try:
+            entry = await self._call(super().get, key, renew_for=renew_for)
+        except REDIS_UNAVAILABLE:
+            RESPONSE_CACHE_LOOKUPS.labels("unavailable").inc()
+            entry, redis_available = None, False
+        else:
+            redis_available = True
+        if entry is not None:
+            RESPONSE_CACHE_LOOKUPS.labels("hit").inc()
+            value, delta, expiry = self._unpack(entry)
+            if self._recompute_early(key, delta, expiry):
+                RESPONSE_CACHE_STAMPEDE.labels("early_recompute").inc()
+                # the others keep getting the still valid entry meanwhile
+                self._flights[key] = Flight(self._future())
+                return None
+            return value
+
+        if redis_available:
+            RESPONSE_CACHE_LOOKUPS.labels("miss").inc()
+        flight = self._flight(key)
+        if flight is not None:
+            return await self._wait(flight)
+
+        self._flights[key] = flight = Flight(self._future())
+        if self.lock_ttl and redis_available:
+            value = await self._lock_or_wait(key, flight)
+            if value is not None:
+                self._resolve(key, value)
+                return value
+        return None
+
+    async def set(
+        self, key: str, value: str | bytes, expires_in: int | timedelta | None = None
+    ) -> None:
+        if isinstance(value, str):
+            value = value.encode()
+        flight = self._flights.get(key)
+        delta = time.monotonic() - flight.started if flight else 0.0
+        if isinstance(expires_in, timedelta):
+            expiry = time.time() + expires_in.total_seconds()
+        else:
+            expiry = time.time() + expires_in if expires_in else math.inf
+        # waiters are served from memory, they don't need the write to finish
+        self._resolve(key, value)
+        try:
+            await self._call(
+                super().set,
+                key,
+                ENTRY_HEADER.pack(ENTRY_MARKER, delta, expiry) + value,
+                expires_in,
+            )
+        except (*REDIS_UNAVAILABLE, DeadlineExceededException):
+            # the response is already being sent, a failed write only skips it
+            RESPONSE_CACHE_STAMPEDE.labels("write_skipped").inc()
+        finally:
+            # other workers stop polling once the lock is gone, write first
+            if flight is not None:
+                self._unlock(key, flight)
+
+    def release(self, key: str) -> None:
+        """End the flight of a miss which won't be cached, its waiters compute
+        their own response"""
+        flight = self._resolve(key, None)
+        if flight is not None:
+            self._unlock(key, flight)
+
+    async def _call(
+        self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any
+    ) -> T:
+        if self.breaker is None:
+            return await func(*args, **kwargs)
+        return await self.breaker.call(func, *args, **kwargs)
+
+    @staticmethod
+    def _future() -> "asyncio.Future[Optional[bytes]]":
+        return asyncio.get_running_loop().create_future()
+
+    @staticmethod
+    def _unpack(entry: bytes) -> tuple[bytes, float, float]:
+        if entry[: len(ENTRY_MARKER)] != ENTRY_MARKER:
+            # written before the header was added, never recomputed early
+            return entry, 0.0, math.inf
+        _, delta, expiry = ENTRY_HEADER.unpack_from(entry)
+        return entry[ENTRY_HEADER.size :], delta, expiry
+
+    def _recompute_early(self, key: str, delta: float, expiry: float) -> bool:
+        """XFetch: ``now - delta * beta * ln(rand()) >= expiry``"""
+        if not self.beta or not delta or self._flight(key) is not None:
+            return False
+        gap = -delta * self.beta * math.log(1.0 - random.random())  # noqa: S311
+        return time.time() + gap >= expiry
+
+    def _flight(self, key: str) -> Optional[Flight]:
+        """Flight of ``key``, dropping one abandoned by a request which never
+        finished"""
+        flight = self._flights.get(key)
+        if flight is not None and time.monotonic() - flight.started > self.wait_timeout:
+            self._resolve(key, None)
+            return None
+        return flight
+
+    def _resolve(self, key: str, value: Optional[bytes]) -> Optional[Flight]:
+        flight = self._flights.pop(key, None)
+        if flight is not None and not flight.future.done():
+            flight.future.set_result(value)
+        return flight
+
+    def _unlock(self, key: str, flight: Flight) -> None:
+        if flight.lock_token is None:
+            return
+        # in the background, the response doesn't wait for it
+        task = asyncio.get_running_loop().create_task(
+            self._call(
+                self._unlock_script,
+                keys=[self._lock_key(key)],
+                args=[flight.lock_token],
+            )
+        )
+        self._unlock_tasks.add(task)
+        task.add_done_callback(self._unlock_done)
+
+    def _unlock_done(self, task: "asyncio.Task[Any]") -> None:
+        self._unlock_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            # the lock expires on its own after lock_ttl
+            logger.warning("Cache lock release failed", error=repr(task.exception()))
+
+    async def _wait(self, flight: Flight) -> Optional[bytes]:
+        timeout = self.wait_timeout - (time.monotonic() - flight.started)
+        try:
+            value = await asyncio.wait_for(asyncio.shield(flight.future), timeout)
+        except asyncio.TimeoutError:
+            value = None
+        RESPONSE_CACHE_STAMPEDE.labels(
+            "coalesced" if value is not None else "coalesce_failed"
+        ).inc()
+        return value
+
+    def _lock_key(self, key: str) -> str:
+        return self._make_key(f"lock:{key}")
+
+    async def _lock_or_wait(self, key: str, flight: Flight) -> Optional[bytes]:
+        """Take the recompute lock of ``key``, or wait for the worker holding it.
+
+        Returns the value written by that worker, or ``None`` when this worker
+        has to compute it: it got the lock, or the holder released it (or the
+        lock expired) without writing a value.
+        """
+        assert self.lock_ttl is not None  # noqa: S101
+        token = uuid.uuid4().hex
+        lock_key = self._lock_key(key)
+        ttl = int(self.lock_ttl * 1000)
+        try:
+            if await self._call(self._redis.set, lock_key, token, nx=True, px=ttl):
+                flight.lock_token = token
+                return None
+        except REDIS_UNAVAILABLE:
+            return None
+
+        deadline = time.monotonic() + self.lock_ttl
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            pipeline = self._redis.pipeline(transaction=False)
+            pipeline.get(self._make_key(key)).exists(lock_key)
+            try:
+                entry, locked = await self._call(pipeline.execute)
+            except REDIS_UNAVAILABLE:
+                break
+            if entry is not None:
+                RESPONSE_CACHE_STAMPEDE.labels("lock_wait").inc()
+                return self._unpack(entry)[0]
+            if not locked:
+                break
+        RESPONSE_CACHE_STAMPEDE.labels("lock_timeout").inc()
+        return None
+
+
+def cache_response_filter(scope: HTTPScope, status_code: int) -> bool:
+    """Default Litestar filter (2xx, 301 and 308), which also releases
+    the flight of responses that won't be cached.
+
+    Without it, requests waiting for e.g. a 404 would wait until their timeout.
+    """
+    do_cache = default_do_cache_predicate(scope, status_code)
+    if not do_cache:
+        app = scope["app"]
+        config = app.response_cache_config
+        store = config.get_store_from_app(app)
+        if isinstance(store, ResponseCacheStore):
+            key_builder = scope["route_handler"].cache_key_builder or config.key_builder
+            store.release(key_builder(Request(scope)))
+    return do_cache
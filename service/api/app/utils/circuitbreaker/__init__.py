@@ -0,0 +1,3 @@
+from .breaker import CircuitBreaker, CircuitOpenError, CircuitState
+
+__all__ = ["CircuitBreaker", "CircuitOpenError", "CircuitState"]
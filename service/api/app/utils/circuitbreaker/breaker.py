@@ -0,0 +1,145 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from enum import IntEnum
+from typing import Any, Optional, TypeVar
+
+import structlog
+
+from app.utils.deadline.context import DeadlineExceededException, clamp_timeout
+from app.utils.metrics.collectors import (
+    CIRCUIT_BREAKER_REJECTIONS,
+    CIRCUIT_BREAKER_STATE,
+    CIRCUIT_BREAKER_TRANSITIONS,
+)
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+
+class CircuitState(IntEnum):
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(f"Circuit {name!r} is open")
+        self.name = name
+
+
+class CircuitBreaker:
+    """Fails calls to an unhealthy dependency fast instead of waiting on it.
+
+    ``failure_threshold`` consecutive failures (one of ``exceptions``, or no
+    answer within ``timeout`` seconds) open the circuit: calls raise
+    :class:`CircuitOpenError` right away. After ``recovery_time`` seconds the
+    circuit is half-open and lets ``probes`` calls through, closing again when
+    they succeed and reopening when one fails.
+
+    The state is per worker and exported as the ``circuit_breaker_state``
+    gauge.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        failure_threshold: int = 5,
+        recovery_time: float = 10.0,
+        timeout: Optional[float] = None,
+        probes: int = 1,
+        exceptions: tuple[type[BaseException], ...] = (Exception,),
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.timeout = timeout
+        self.probes = probes
+        self.exceptions = (*exceptions, asyncio.TimeoutError)
+        self.failures = 0
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._probing = 0
+        CIRCUIT_BREAKER_STATE.labels(name).set(CircuitState.CLOSED)
+
+    @property
+    def state(self) -> CircuitState:
+        if (
+            self._state is CircuitState.OPEN
+            and time.monotonic() - self._opened_at >= self.recovery_time
+        ):
+            self._transition(CircuitState.HALF_OPEN)
+        return self._state
+
+    @property
+    def available(self) -> bool:
+        """Whether a call would be attempted now"""
+        state = self.state
+        return state is CircuitState.CLOSED or (
+            state is CircuitState.HALF_OPEN and self._probing < self.probes
+        )
+
+    async def call(
+        self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any
+    ) -> T:
+        """Await ``func(*args, **kwargs)`` within ``timeout`` (or the request
+        deadline, if sooner), unless the circuit is open"""
+        if not self.available:
+            CIRCUIT_BREAKER_REJECTIONS.labels(self.name).inc()
+            raise CircuitOpenError(self.name)
+
+        # within a request, the call may take at most the time left
+        timeout, limited = clamp_timeout(self.timeout)
+        probe = self._state is CircuitState.HALF_OPEN
+        if probe:
+            self._probing += 1
+        try:
+            # unlike wait_for, no task per call on the hot path
+            async with asyncio.timeout(timeout):
+                result = await func(*args, **kwargs)
+        except TimeoutError as ex:
+            if limited:
+                # the request ran out of time, not a failure of the service
+                raise DeadlineExceededException() from ex
+            self.record_failure()
+            raise
+        except self.exceptions:
+            self.record_failure()
+            raise
+        else:
+            self.record_success()
+            return result
+        finally:
+            if probe:
+                self._probing -= 1
+
+    def record_success(self) -> None:
+        self.failures = 0
+        if self._state is not CircuitState.CLOSED:
+            self._transition(CircuitState.CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._state is CircuitState.HALF_OPEN or (
+            self._state is CircuitState.CLOSED
+            and self.failures >= self.failure_threshold
+        ):
+            self._opened_at = time.monotonic()
+            self._transition(CircuitState.OPEN)
+
+    def _transition(self, state: CircuitState) -> None:
+        self._state = state
+        CIRCUIT_BREAKER_STATE.labels(self.name).set(state)
+        CIRCUIT_BREAKER_TRANSITIONS.labels(self.name, state.name.lower()).inc()
+        log = logger.warning if state is CircuitState.OPEN else logger.info
+        log(
+            "Circuit breaker state changed",
+            breaker=self.name,
+            state=state.name.lower(),
+            failures=self.failures,
+        )
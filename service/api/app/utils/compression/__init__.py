@@ -0,0 +1,14 @@
+from .config import NegotiatedCompressionConfig, parse_accept_encoding
+from .facade import NegotiatedCompression, ZstdCompression
+from .middleware import NegotiatedCompressionMiddleware
+from .plugin import CompressionPlugin, ConfiguredCompressionMiddleware
+
+__all__ = [
+    "CompressionPlugin",
+    "ConfiguredCompressionMiddleware",
+    "NegotiatedCompression",
+    "NegotiatedCompressionConfig",
+    "NegotiatedCompressionMiddleware",
+    "ZstdCompression",
+    "parse_accept_encoding",
+]
@@ -0,0 +1,94 @@
+from dataclasses import dataclass, field
+from importlib.util import find_spec
+from typing import Any, Optional
+
+from litestar.config.compression import CompressionConfig
+from litestar.config.response_cache import default_cache_key_builder
+from litestar.connection import Request
+from litestar.exceptions import ImproperlyConfiguredException
+from litestar.middleware.compression import CompressionMiddleware
+from litestar.middleware.compression.facade import CompressionFacade
+
+from .facade import ZSTD, NegotiatedCompression
+from .middleware import NegotiatedCompressionMiddleware
+
+LIBRARIES = {"br": "brotli", ZSTD: "zstandard"}
+"""Optional libraries of the encodings gzip's standard library module lacks"""
+
+IDENTITY = "identity"
+
+
+def parse_accept_encoding(accept_encoding: str) -> dict[str, float]:
+    """``Accept-Encoding`` as ``{coding: qvalue}``, malformed weights count as 0"""
+    preferences: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        if not (coding := coding.strip().lower()):
+            continue
+        quality = 1.0
+        name, _, value = params.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        preferences[coding] = quality
+    return preferences
+
+
+@dataclass
+class NegotiatedCompressionConfig(CompressionConfig):
+    """``CompressionConfig`` negotiating between gzip, brotli and zstd"""
+
+    backend: str = "gzip"
+    encodings: tuple[str, ...] = (ZSTD, "br", "gzip")
+    """Encodings in order of preference, those whose library isn't installed
+    are left out"""
+    gzip_compress_level: int = 6
+    brotli_quality: int = 4
+    zstd_level: int = 3
+    """Range ``[1-22]``, see ``zstandard.ZstdCompressor``"""
+    middleware_class: type[CompressionMiddleware] = NegotiatedCompressionMiddleware
+    compression_facade: type[CompressionFacade] = NegotiatedCompression
+    available: tuple[str, ...] = field(init=False, default=())
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+        if not 0 <= self.brotli_quality <= 11:
+            raise ImproperlyConfiguredException(
+                "brotli_quality must be a value between 0 and 11"
+            )
+        if not 1 <= self.zstd_level <= 22:
+            raise ImproperlyConfiguredException(
+                "zstd_level must be a value between 1 and 22"
+            )
+        self.available = tuple(
+            encoding
+            for encoding in self.encodings
+            if encoding not in LIBRARIES or find_spec(LIBRARIES[encoding])
+        )
+
+    def negotiate(self, accept_encoding: str) -> Optional[str]:
+        """The available encoding the client weighs highest, ties go to the
+        order of ``encodings``; ``None`` sends the body as it is"""
+        if not accept_encoding:
+            return None
+        preferences = parse_accept_encoding(accept_encoding)
+        default = preferences.get("*", 0.0)
+        best: Optional[str] = None
+        best_quality = 0.0
+        for encoding in self.available:
+            quality = preferences.get(encoding, default)
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def encoding_key(self, request: Request[Any, Any, Any]) -> str:
+        """Encoding negotiated for ``request``, ``identity`` when it's sent as is"""
+        encoding = self.negotiate(request.headers.get("accept-encoding", ""))
+        return encoding or IDENTITY
+
+    def key_builder(self, request: Request[Any, Any, Any]) -> str:
+        """Response cache key with the negotiated encoding, so each encoding
+        caches its own compressed entry"""
+        return f"{default_cache_key_builder(request)}:{self.encoding_key(request)}"
@@ -0,0 +1,73 @@
+from io import BytesIO
+from typing import TYPE_CHECKING
+
+from litestar.enums import CompressionEncoding
+from litestar.middleware.compression.facade import CompressionFacade
+
+if TYPE_CHECKING:
+    from .config import NegotiatedCompressionConfig
+
+ZSTD = "zstd"
+
+
+class ZstdCompression(CompressionFacade):
+    __slots__ = ("compressor", "buffer", "compression_encoding")
+
+    encoding = ZSTD
+
+    def __init__(
+        self,
+        buffer: BytesIO,
+        compression_encoding: str,
+        config: "NegotiatedCompressionConfig",
+    ) -> None:
+        # optional dependency, only negotiated when it is installed
+        import zstandard
+
+        self.buffer = buffer
+        self.compression_encoding = compression_encoding
+        self.compressor = zstandard.ZstdCompressor(
+            level=config.zstd_level
+        ).compressobj()
+
+    def write(self, body: bytes) -> None:
+        import zstandard
+
+        self.buffer.write(self.compressor.compress(body))
+        self.buffer.write(self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK))
+
+    def close(self) -> None:
+        self.buffer.write(self.compressor.flush())
+
+
+class NegotiatedCompression(CompressionFacade):
+    """Facade of the encoding the middleware negotiated, brotli or zstd.
+
+    Litestar builds gzip's facade itself and this one for any other encoding.
+    """
+
+    __slots__ = ("facade",)
+
+    encoding = CompressionEncoding.BROTLI
+
+    def __init__(
+        self,
+        buffer: BytesIO,
+        compression_encoding: str,
+        config: "NegotiatedCompressionConfig",
+    ) -> None:
+        self.facade: CompressionFacade
+        if compression_encoding == ZSTD:
+            self.facade = ZstdCompression(buffer, compression_encoding, config)
+        else:
+            from litestar.middleware.compression.brotli_facade import (
+                BrotliCompression,
+            )
+
+            self.facade = BrotliCompression(buffer, compression_encoding, config)
+
+    def write(self, body: bytes) -> None:
+        self.facade.write(body)
+
+    def close(self) -> None:
+        self.facade.close()
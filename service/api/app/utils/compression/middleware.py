@@ -0,0 +1,92 @@
+from typing import TYPE_CHECKING
+
+from litestar.datastructures import Headers, MutableScopeHeaders
+from litestar.middleware.compression import CompressionMiddleware
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+from litestar.utils.empty import value_or_default
+from litestar.utils.scope.state import ScopeState
+
+from app.utils.metrics.collectors import (
+    RESPONSE_COMPRESSED_BYTES,
+    RESPONSE_COMPRESSION_SAVED_BYTES,
+)
+
+if TYPE_CHECKING:
+    from .config import NegotiatedCompressionConfig
+
+UNCOMPRESSED_SIZE = "uncompressed_size"
+"""Key of the response start message keeping the body size before compression,
+stored with the cached messages so replays report what they saved"""
+
+
+class NegotiatedCompressionMiddleware(CompressionMiddleware):
+    """Compresses with the encoding the client prefers among the installed ones.
+
+    Litestar runs the compression inside the response cache, which stores the
+    compressed messages. With the encoding in the cache key (see
+    :meth:`NegotiatedCompressionConfig.key_builder`) every encoding gets its own
+    entry and a hit is sent as stored, without compressing it again.
+    """
+
+    config: "NegotiatedCompressionConfig"
+
+    def __init__(self, app: ASGIApp, config: "NegotiatedCompressionConfig") -> None:
+        super().__init__(app=app, config=config)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        encoding = self.config.negotiate(
+            Headers.from_scope(scope).get("accept-encoding", "")
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        raw_size = 0
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                self.account(scope, message, encoding, raw_size)
+            await send(message)
+
+        compress = self.create_compression_send_wrapper(
+            send=send_wrapper, compression_encoding=encoding, scope=scope
+        )
+
+        async def count_wrapper(message: Message) -> None:
+            nonlocal raw_size
+            if message["type"] == "http.response.body":
+                raw_size += len(message.get("body", b""))
+            await compress(message)
+
+        await self.app(scope, receive, count_wrapper)
+
+    @staticmethod
+    def account(scope: Scope, message: Message, encoding: str, raw_size: int) -> None:
+        """Record the bytes a compressed response saved.
+
+        ``raw_size`` is the body the handler produced, for a cache hit it is the
+        stored (compressed) body and the size before compression comes with the
+        stored message instead.
+        """
+        headers = MutableScopeHeaders.from_message(message)
+        if headers.get("content-encoding") != encoding:
+            return
+        # the bytes differ from the uncompressed representation, RFC 9110 8.8.3
+        if (etag := headers.get("etag")) and not etag.startswith("W/"):
+            headers["etag"] = f"W/{etag}"
+        if not (content_length := headers.get("content-length")):
+            # streamed, the total size isn't known when the response starts
+            return
+
+        cached = value_or_default(ScopeState.from_scope(scope).is_cached, False)
+        if cached:
+            raw_size = message.pop(UNCOMPRESSED_SIZE, 0)
+        else:
+            message[UNCOMPRESSED_SIZE] = raw_size
+        size = int(content_length)
+        label = "true" if cached else "false"
+        RESPONSE_COMPRESSED_BYTES.labels(encoding, label).inc(size)
+        if raw_size > size:
+            RESPONSE_COMPRESSION_SAVED_BYTES.labels(encoding, label).inc(
+                raw_size - size
+            )
@@ -0,0 +1,33 @@
+from typing import Any, Optional
+
+import litestar.middleware.compression as litestar_compression
+from litestar.config.app import AppConfig
+from litestar.config.compression import CompressionConfig
+from litestar.middleware.compression import CompressionMiddleware
+from litestar.plugins import InitPluginProtocol
+from litestar.types import ASGIApp
+
+
+class ConfiguredCompressionMiddleware(CompressionMiddleware):
+    """Builds the ``middleware_class`` of the compression config.
+
+    Litestar 2 wraps every route in ``CompressionMiddleware`` whatever the
+    config says, looking the class up on ``litestar.middleware.compression``
+    when the route stack is built. This class stands in for it there.
+    """
+
+    def __new__(cls, app: ASGIApp, config: CompressionConfig) -> Any:
+        return config.middleware_class(app=app, config=config)
+
+
+class CompressionPlugin(InitPluginProtocol):
+    def __init__(self, config: Optional[CompressionConfig]) -> None:
+        self._config = config
+
+    def on_app_init(self, app_config: AppConfig) -> AppConfig:
+        if self._config is None:
+            return app_config
+
+        app_config.compression_config = self._config
+        litestar_compression.CompressionMiddleware = ConfiguredCompressionMiddleware
+        return app_config
@@ -0,0 +1,9 @@
+from .limiter import GradientLimiter
+from .plugin import ConcurrencyConfig, ConcurrencyLimit, ConcurrencyLimitPlugin
+
+__all__ = [
+    "ConcurrencyConfig",
+    "ConcurrencyLimit",
+    "ConcurrencyLimitPlugin",
+    "GradientLimiter",
+]
@@ -0,0 +1,94 @@
+import math
+import time
+from typing import Optional
+
+from app.utils.metrics.collectors import CONCURRENCY_IN_FLIGHT, CONCURRENCY_LIMIT
+
+
+class GradientLimiter:
+    """Limit of in-flight requests adapting to their latency (gradient2).
+
+    The latency of recent requests is compared to a baseline averaged over
+    ``long_window`` seconds: while they match the limit grows by about its
+    square root, requests queuing somewhere (pool, CPU, bcrypt threads) make
+    the latency rise and the limit shrink by up to half. Overloaded responses
+    (``dropped``) back off at once.
+
+    The baseline window is in seconds rather than samples, at a few thousand
+    requests per second it would otherwise absorb the queuing within a second.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        initial_limit: int = 20,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        tolerance: float = 2.0,
+        smoothing: float = 0.2,
+        backoff: float = 0.9,
+        short_window: int = 10,
+        long_window: float = 60.0,
+    ) -> None:
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.backoff = backoff
+        self.in_flight = 0
+        self._short_decay = 2 / (short_window + 1)
+        self.long_window = long_window
+        self._updated = self._adapted = time.monotonic()
+        self._short_rtt: Optional[float] = None
+        self._long_rtt: Optional[float] = None
+        self.limit = 0.0
+        self._set_limit(initial_limit)
+
+    def acquire(self) -> bool:
+        """Take a slot, ``False`` when the limit is reached"""
+        if self.in_flight >= int(self.limit):
+            return False
+        self.in_flight += 1
+        CONCURRENCY_IN_FLIGHT.labels(self.name).inc()
+        return True
+
+    def release(self, rtt: float, *, dropped: bool = False) -> None:
+        """Free a slot, adapting the limit to the request's latency"""
+        in_flight = self.in_flight
+        self.in_flight -= 1
+        CONCURRENCY_IN_FLIGHT.labels(self.name).dec()
+        if dropped:
+            self._set_limit(self.limit * self.backoff)
+            return
+        if self._short_rtt is None or self._long_rtt is None:
+            self._short_rtt = self._long_rtt = rtt
+            return
+
+        now = time.monotonic()
+        long_decay = 1 - math.exp((self._updated - now) / self.long_window)
+        self._updated = now
+        self._short_rtt += (rtt - self._short_rtt) * self._short_decay
+        self._long_rtt += (self._short_rtt - self._long_rtt) * long_decay
+        # the baseline follows a lasting improvement without waiting for the EWMA
+        if self._long_rtt > 2 * self._short_rtt:
+            self._long_rtt *= 0.95
+        # adapt once per round trip, the latency needs that long to reflect it
+        if now - self._adapted < self._short_rtt:
+            return
+        # the limit is not what holds the requests back, nothing to learn
+        if in_flight < self.limit / 2:
+            return
+        self._adapted = now
+
+        gradient = self.tolerance * self._long_rtt / self._short_rtt
+        gradient = max(0.5, min(1.0, gradient))
+        limit = self.limit * gradient + math.sqrt(self.limit)
+        self._set_limit(self.limit * (1 - self.smoothing) + limit * self.smoothing)
+
+    def _set_limit(self, limit: float) -> None:
+        limit = max(self.min_limit, min(self.max_limit, limit))
+        if int(limit) != int(self.limit):
+            CONCURRENCY_LIMIT.labels(self.name).set(int(limit))
+        self.limit = limit
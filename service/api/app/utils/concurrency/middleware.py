@@ -0,0 +1,82 @@
+import time
+from typing import TYPE_CHECKING, Optional
+
+from litestar import status_codes
+from litestar.exceptions import ServiceUnavailableException
+from litestar.middleware import AbstractMiddleware
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.metrics.collectors import CONCURRENCY_SHED
+
+from .limiter import GradientLimiter
+
+if TYPE_CHECKING:
+    from .plugin import ConcurrencyConfig
+
+OVERLOADED = {
+    status_codes.HTTP_503_SERVICE_UNAVAILABLE,
+    status_codes.HTTP_504_GATEWAY_TIMEOUT,
+}
+"""Statuses telling the limiter the request didn't get the capacity it needed"""
+
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class ConcurrencyLimitMiddleware(AbstractMiddleware):
+    """Sheds requests over the adaptive in-flight limit of their route class.
+
+    Routes pick a class with ``opt={"concurrency": name}``, otherwise reads and
+    writes get the configured defaults. Classes without a limit (e.g. health
+    and metrics routes) are never shed. Over the limit the request is answered
+    with 503 at once, instead of queuing until the client gives up.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        config: "ConcurrencyConfig",
+        limiters: dict[str, GradientLimiter],
+    ) -> None:
+        super().__init__(app=app, scopes={"http"})
+        self.config = config
+        self.limiters = limiters
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route_class = self.route_class(scope)
+        limiter = self.limiters.get(route_class)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not limiter.acquire():
+            CONCURRENCY_SHED.labels(route_class).inc()
+            raise ServiceUnavailableException(
+                detail="Server busy, retry later",
+                headers={"Retry-After": str(self.config.retry_after)},
+            )
+
+        status: Optional[int] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as ex:
+            status = getattr(ex, "status_code", None)
+            raise
+        finally:
+            rtt = time.perf_counter() - started
+            limiter.release(rtt, dropped=status in OVERLOADED)
+
+    def route_class(self, scope: Scope) -> str:
+        route_class = scope["route_handler"].opt.get("concurrency")
+        if route_class is not None:
+            return route_class
+        if scope["method"] in READ_METHODS:
+            return self.config.read_class
+        return self.config.write_class
@@ -0,0 +1,65 @@
+from dataclasses import dataclass, field
+from typing import Mapping
+
+from litestar.config.app import AppConfig
+from litestar.middleware.base import DefineMiddleware
+from litestar.plugins import InitPluginProtocol
+
+from .limiter import GradientLimiter
+from .middleware import ConcurrencyLimitMiddleware
+
+
+@dataclass(kw_only=True, frozen=True)
+class ConcurrencyLimit:
+    initial_limit: int = 20
+    """In-flight requests allowed per worker before any latency was observed"""
+    min_limit: int = 1
+    max_limit: int = 200
+    tolerance: float = 2.0
+    """Latency growth over the baseline tolerated before the limit shrinks"""
+
+
+@dataclass(kw_only=True, frozen=True)
+class ConcurrencyConfig:
+    limits: Mapping[str, ConcurrencyLimit] = field(default_factory=dict)
+    """Limits by route class, routes pick one with ``opt={"concurrency": name}``"""
+    read_class: str = "read"
+    """Class of the GET, HEAD and OPTIONS routes which don't name one"""
+    write_class: str = "write"
+    """Class of the other routes which don't name one"""
+    retry_after: int = 1
+    """``Retry-After`` seconds of the shed requests"""
+    enabled: bool = True
+
+
+class ConcurrencyLimitPlugin(InitPluginProtocol):
+    def __init__(self, config: ConcurrencyConfig) -> None:
+        self._config = config
+        self._limiters = {
+            name: GradientLimiter(
+                name,
+                initial_limit=limit.initial_limit,
+                min_limit=limit.min_limit,
+                max_limit=limit.max_limit,
+                tolerance=limit.tolerance,
+            )
+            for name, limit in config.limits.items()
+        }
+
+    @property
+    def limiters(self) -> Mapping[str, GradientLimiter]:
+        return self._limiters
+
+    def on_app_init(self, app_config: AppConfig) -> AppConfig:
+        if not self._config.enabled or not self._limiters:
+            return app_config
+
+        app_config.middleware.insert(
+            0,
+            DefineMiddleware(
+                ConcurrencyLimitMiddleware,
+                config=self._config,
+                limiters=self._limiters,
+            ),
+        )
+        return app_config
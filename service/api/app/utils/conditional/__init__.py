@@ -0,0 +1,4 @@
+from .etag import etag_matches, make_etag, not_modified
+from .middleware import ConditionalGetMiddleware
+
+__all__ = ["ConditionalGetMiddleware", "etag_matches", "make_etag", "not_modified"]
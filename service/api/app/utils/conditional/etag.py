@@ -0,0 +1,52 @@
+import hashlib
+from typing import Any, Optional
+
+from litestar import Response, status_codes
+
+NOT_MODIFIED_HEADERS = {
+    "cache-control",
+    "content-location",
+    "date",
+    "etag",
+    "expires",
+    "vary",
+}
+"""Headers a 304 repeats from the 200 it stands for (RFC 9110, 15.4.5)"""
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag of a representation identified by ``parts``, e.g. the id
+    and ``updated_at`` of a row"""
+    digest = hashlib.blake2b(
+        "\x1f".join(map(str, parts)).encode(), digest_size=12
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether ``If-None-Match`` names ``etag`` (weak comparison, as the
+    header requires)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified(
+    etag: str, response_class: type[Response[Any]] = Response
+) -> Response[None]:
+    """Bodiless 304 for a client which holds the representation of ``etag``.
+
+    ``response_class`` is the class of the 200 it stands for, the headers it
+    adds (such as ``Vary``) have to be repeated.
+    """
+    return response_class(
+        content=None,
+        status_code=status_codes.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag},
+    )
@@ -0,0 +1,55 @@
+from litestar import status_codes
+from litestar.datastructures import Headers, MutableScopeHeaders
+from litestar.middleware import AbstractMiddleware
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+
+from .etag import NOT_MODIFIED_HEADERS, etag_matches
+
+
+class ConditionalGetMiddleware(AbstractMiddleware):
+    """Turns a 2xx GET response into 304 when ``If-None-Match`` names its ETag.
+
+    Handlers compare the ETag themselves from a cheap version lookup, before
+    loading anything. This covers the responses they don't produce, those
+    replayed from the response cache: the stored body is dropped, the client
+    already has it.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        super().__init__(app=app, scopes={"http"})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if_none_match = Headers.from_scope(scope).get("if-none-match")
+        if scope["method"] != "GET" or not if_none_match:
+            await self.app(scope, receive, send)
+            return
+
+        not_modified = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal not_modified
+            if message["type"] == "http.response.start":
+                headers = MutableScopeHeaders.from_message(message)
+                etag = headers.get("etag")
+                if (
+                    200 <= message["status"] < 300
+                    and etag
+                    and etag_matches(if_none_match, etag)
+                ):
+                    not_modified = True
+                    message = {
+                        **message,
+                        "status": status_codes.HTTP_304_NOT_MODIFIED,
+                        "headers": [
+                            (name, value)
+                            for name, value in message.get("headers", ())
+                            if name.decode("latin-1").lower() in NOT_MODIFIED_HEADERS
+                        ],
+                    }
+            elif not_modified:
+                if message.get("more_body", False):
+                    return
+                message = {**message, "body": b""}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
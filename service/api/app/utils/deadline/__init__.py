@@ -0,0 +1,24 @@
+from .context import (
+    DeadlineExceededException,
+    clamp_timeout,
+    current_deadline,
+    remaining,
+)
+from .plugin import DeadlineConfig, DeadlinePlugin
+from .sql import (
+    DeadlineAsyncAdaptedQueuePool,
+    InstrumentedDeadlineQueuePool,
+    is_query_canceled,
+)
+
+__all__ = [
+    "DeadlineAsyncAdaptedQueuePool",
+    "DeadlineConfig",
+    "DeadlineExceededException",
+    "DeadlinePlugin",
+    "InstrumentedDeadlineQueuePool",
+    "clamp_timeout",
+    "current_deadline",
+    "is_query_canceled",
+    "remaining",
+]
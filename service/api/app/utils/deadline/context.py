@@ -0,0 +1,41 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from litestar import status_codes
+from litestar.exceptions import HTTPException
+
+current_deadline: ContextVar[Optional[float]] = ContextVar(
+    "current_deadline", default=None
+)
+"""``time.monotonic()`` by which the current request has to be answered"""
+
+
+class DeadlineExceededException(HTTPException):
+    """The request deadline passed before it could be answered."""
+
+    status_code = status_codes.HTTP_504_GATEWAY_TIMEOUT
+    detail = "Request deadline exceeded"
+
+
+def remaining() -> Optional[float]:
+    """Seconds left until the current deadline, ``None`` without one"""
+    deadline = current_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def clamp_timeout(timeout: Optional[float]) -> tuple[Optional[float], bool]:
+    """``timeout`` shortened to the time left, and whether the deadline is the
+    limit.
+
+    Raises :class:`DeadlineExceededException` when the deadline already
+    passed, there's no point in starting the call.
+    """
+    left = remaining()
+    if left is None or (timeout is not None and timeout <= left):
+        return timeout, False
+    if left <= 0:
+        raise DeadlineExceededException()
+    return left, True
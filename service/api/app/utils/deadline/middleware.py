@@ -0,0 +1,87 @@
+import asyncio
+import math
+import time
+from typing import TYPE_CHECKING, Optional
+
+import structlog
+from litestar.datastructures import Headers
+from litestar.middleware import AbstractMiddleware
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.metrics.collectors import REQUEST_DEADLINE_EXCEEDED
+from app.utils.routing import get_route_path
+
+from .context import DeadlineExceededException, current_deadline
+
+if TYPE_CHECKING:
+    from .plugin import DeadlineConfig
+
+logger = structlog.get_logger()
+
+
+class DeadlineMiddleware(AbstractMiddleware):
+    """Gives every request a deadline and answers 504 once it passes.
+
+    The timeout is the route's ``opt={"request_timeout": seconds}`` or the
+    configured default, shortened by the ``header`` a client may send. The
+    deadline is kept in :data:`current_deadline` for the pool checkout, the
+    statement timeout and the Redis and RabbitMQ calls, and the handler is
+    cancelled when it passes.
+    """
+
+    def __init__(self, app: ASGIApp, config: "DeadlineConfig") -> None:
+        super().__init__(app=app, scopes={"http"})
+        self.config = config
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        timeout = self.timeout(scope)
+        if timeout is None:
+            await self.app(scope, receive, send)
+            return
+
+        started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+                if message["status"] == DeadlineExceededException.status_code:
+                    REQUEST_DEADLINE_EXCEEDED.labels(get_route_path(scope)).inc()
+            await send(message)
+
+        token = current_deadline.set(time.monotonic() + timeout)
+        try:
+            async with asyncio.timeout(timeout) as deadline:
+                await self.app(scope, receive, send_wrapper)
+        except TimeoutError:
+            if not deadline.expired():
+                raise
+            logger.warning(
+                "Request deadline exceeded",
+                path=get_route_path(scope),
+                timeout=timeout,
+                response_started=started,
+            )
+            if started:
+                # too late for a 504, the client sees a truncated response
+                return
+            REQUEST_DEADLINE_EXCEEDED.labels(get_route_path(scope)).inc()
+            raise DeadlineExceededException() from None
+        finally:
+            current_deadline.reset(token)
+
+    def timeout(self, scope: Scope) -> Optional[float]:
+        timeout = scope["route_handler"].opt.get(
+            "request_timeout", self.config.default_timeout
+        )
+        requested = Headers.from_scope(scope).get(self.config.header)
+        if requested:
+            try:
+                seconds = float(requested)
+            except ValueError:
+                seconds = 0.0
+            # clients may only shorten the deadline of a route
+            finite = 0 < seconds < math.inf
+            if finite and (not timeout or seconds < timeout):
+                timeout = seconds
+        return timeout or None
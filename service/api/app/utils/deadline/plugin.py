@@ -0,0 +1,44 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from advanced_alchemy.exceptions import RepositoryError
+from litestar.config.app import AppConfig
+from litestar.middleware.base import DefineMiddleware
+from litestar.plugins import InitPluginProtocol
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from .middleware import DeadlineMiddleware
+from .sql import query_canceled_handler, set_statement_timeout
+
+
+@dataclass(kw_only=True, frozen=True)
+class DeadlineConfig:
+    default_timeout: Optional[float] = 10.0
+    """Seconds a request may take unless its route sets ``request_timeout``"""
+    header: str = "X-Request-Timeout"
+    """Request header with the seconds a client waits at most"""
+    statement_timeout: bool = True
+    """Set the time left as ``statement_timeout`` of every transaction"""
+    enabled: bool = True
+
+
+class DeadlinePlugin(InitPluginProtocol):
+    def __init__(self, config: DeadlineConfig) -> None:
+        self._config = config
+
+    def on_app_init(self, app_config: AppConfig) -> AppConfig:
+        if not self._config.enabled:
+            return app_config
+
+        app_config.middleware.insert(
+            0, DefineMiddleware(DeadlineMiddleware, config=self._config)
+        )
+        if self._config.statement_timeout and not event.contains(
+            Session, "after_begin", set_statement_timeout
+        ):
+            event.listen(Session, "after_begin", set_statement_timeout)
+        for error in (RepositoryError, DBAPIError):
+            app_config.exception_handlers.setdefault(error, query_canceled_handler)
+        return app_config
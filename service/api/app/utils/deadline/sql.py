@@ -0,0 +1,80 @@
+import math
+from typing import Any, Optional
+
+from litestar import Request, Response
+from litestar.exceptions import HTTPException
+from litestar.middleware.exceptions._debug_response import create_debug_response
+from litestar.middleware.exceptions.middleware import create_exception_response
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, SessionTransaction
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+from sqlalchemy.util.queue import AsyncAdaptedQueue, Empty
+
+from app.utils.metrics import InstrumentedAsyncAdaptedQueuePool
+
+from .context import DeadlineExceededException, clamp_timeout, remaining
+
+QUERY_CANCELED = "57014"
+"""SQLSTATE of a statement stopped by ``statement_timeout`` or a cancel request"""
+
+
+class DeadlineAsyncAdaptedQueue(AsyncAdaptedQueue[ConnectionPoolEntry]):
+    """Pool queue whose blocking ``get`` waits at most until the request
+    deadline, ``pool_timeout`` is the bound outside of requests"""
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        if not block:
+            return super().get(block, timeout)
+        timeout, limited = clamp_timeout(timeout)
+        try:
+            return super().get(block, timeout)
+        except Empty:
+            if limited:
+                raise DeadlineExceededException() from None
+            raise
+
+
+class DeadlineAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    _queue_class = DeadlineAsyncAdaptedQueue
+
+
+class InstrumentedDeadlineQueuePool(InstrumentedAsyncAdaptedQueuePool):
+    _queue_class = DeadlineAsyncAdaptedQueue
+
+
+def set_statement_timeout(
+    session: Session, transaction: SessionTransaction, connection: Connection
+) -> None:
+    """``after_begin`` listener limiting the transaction's statements to the
+    time left (``SET LOCAL``, reset when the transaction ends)"""
+    left = remaining()
+    if left is None or connection.dialect.name != "postgresql":
+        return
+    if left <= 0:
+        raise DeadlineExceededException()
+    connection.exec_driver_sql(
+        f"SET LOCAL statement_timeout = {math.ceil(left * 1000)}",
+        execution_options={"query_stats": False},
+    )
+
+
+def is_query_canceled(error: Optional[BaseException]) -> bool:
+    """Whether ``error`` was caused by Postgres canceling a statement"""
+    while error is not None:
+        dbapi_error = getattr(error, "orig", None)
+        if getattr(dbapi_error, "sqlstate", None) == QUERY_CANCELED:
+            return True
+        error = error.__cause__
+    return False
+
+
+def query_canceled_handler(
+    request: Request[Any, Any, Any], error: Exception
+) -> Response[Any]:
+    """Answers 504 for statements stopped by their ``statement_timeout``, other
+    database errors get Litestar's default response"""
+    if is_query_canceled(error):
+        error = DeadlineExceededException()
+    if not isinstance(error, HTTPException) and request.app.debug:
+        return create_debug_response(request, error)
+    return create_exception_response(request, error)
@@ -1,10 +1,11 @@
 import logging
-from typing import Any, Optional
-
-from aiormq.types import ConfirmationFrameType
+from typing import TYPE_CHECKING, Any, Optional
 
 from app.utils.message_brokers.brokers import LogsMessageBroker
 
+if TYPE_CHECKING:
+    from aiormq.abc import ConfirmationFrameType
+
 
 class BaseLoggingHandler(logging.Handler):
     def __init__(
@@ -23,7 +24,7 @@ class BaseLoggingHandler(logging.Handler):
 
     async def send_log(
         self, queue: str, formatted_record: str
-    ) -> Optional[ConfirmationFrameType]:
+    ) -> Optional["ConfirmationFrameType"]:
         return await self.broker_instance.publish(queue=queue, body=formatted_record)
 
     def emit(self, record: logging.LogRecord) -> Any:
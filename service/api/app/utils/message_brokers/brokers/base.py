@@ -1,23 +1,144 @@
 from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Awaitable, Callable
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import TYPE_CHECKING, Any, ClassVar, Optional, TypeVar
 
-from aio_pika import Channel, Connection, Exchange
-from aiormq.abc import ConfirmationFrameType
+import structlog
+
+from app.utils.circuitbreaker import CircuitBreaker, CircuitOpenError
+from app.utils.metrics.collectors import (
+    BROKER_BUFFERED_MESSAGES,
+    BROKER_DROPPED_MESSAGES,
+    track_publish,
+)
+
+if TYPE_CHECKING:
+    from aio_pika import Channel, Connection, Exchange, Message
+    from aiormq.abc import ConfirmationFrameType
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
 
 
 @dataclass
 class BaseMessageBroker(ABC):
-    connection: Connection
+    """Publisher of one exchange.
+
+    Publishes go through ``breaker``: when RabbitMQ is down or slow they fail
+    fast and the messages are held in a buffer of ``buffer_size`` (the oldest
+    are dropped once it is full). The first publish which succeeds again,
+    e.g. the half-open probe, sends the buffered messages after its own.
+    Without a connection, or after it closed, ``connect`` opens a new one.
+    """
+
+    connection: Optional["Connection"]
     queues: list[str] = field(default_factory=list)
+    connect: Optional[Callable[[], Awaitable["Connection"]]] = None
+    breaker: Optional[CircuitBreaker] = None
+    buffer_size: int = 1000
 
-    _channel: Channel = field(default=None, init=False)
-    _exchange: Exchange = field(default=None, init=False)
+    exchange_name: ClassVar[str]
+
+    _channel: "Channel" = field(default=None, init=False)
+    _exchange: "Exchange" = field(default=None, init=False)
+    _buffer: deque[tuple["Message", str]] = field(default_factory=deque, init=False)
+    _flushing: bool = field(default=False, init=False)
 
     @abstractmethod
     async def setup(self) -> None:
         raise NotImplementedError
 
     @abstractmethod
-    async def publish(self, queue: str, body: str) -> Optional[ConfirmationFrameType]:
+    async def publish(self, queue: str, body: str) -> Optional["ConfirmationFrameType"]:
         raise NotImplementedError
+
+    async def start(self) -> bool:
+        """Declare the exchange and queues, ``False`` if the broker is
+        unavailable (publishing retries later)"""
+        try:
+            await self._call(self._ensure_ready)
+        except Exception as ex:  # noqa: BLE001
+            logger.warning(
+                "Message broker unavailable, buffering messages",
+                exchange=self.exchange_name,
+                error=repr(ex),
+            )
+            return False
+        return True
+
+    async def _call(
+        self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any
+    ) -> T:
+        if self.breaker is None:
+            return await func(*args, **kwargs)
+        return await self.breaker.call(func, *args, **kwargs)
+
+    async def _ensure_ready(self) -> None:
+        if self.connection is None or self.connection.is_closed:
+            if self.connect is None:
+                raise ConnectionError("No broker connection")
+            self.connection = await self.connect()
+            self._channel = self._exchange = None
+        elif self._channel is not None and self._channel.is_closed:
+            self._channel = self._exchange = None
+        if self._exchange is None:
+            await self.setup()
+
+    async def _send(
+        self, message: "Message", routing_key: str
+    ) -> Optional["ConfirmationFrameType"]:
+        await self._ensure_ready()
+        with track_publish(exchange=self.exchange_name, queue=routing_key):
+            return await self._exchange.publish(
+                message=message, routing_key=routing_key
+            )
+
+    async def _publish(
+        self, message: "Message", routing_key: str
+    ) -> Optional["ConfirmationFrameType"]:
+        try:
+            confirmation = await self._call(self._send, message, routing_key)
+        except Exception as ex:  # noqa: BLE001
+            self._hold(message, routing_key, ex)
+            return None
+        if self._buffer and not self._flushing:
+            await self._flush()
+        return confirmation
+
+    def _hold(self, message: "Message", routing_key: str, error: Exception) -> None:
+        if len(self._buffer) >= self.buffer_size:
+            BROKER_DROPPED_MESSAGES.labels(self.exchange_name).inc()
+            if not self._buffer:
+                return
+            self._buffer.popleft()
+        self._buffer.append((message, routing_key))
+        BROKER_BUFFERED_MESSAGES.labels(self.exchange_name).set(len(self._buffer))
+        if not isinstance(error, CircuitOpenError):
+            logger.warning(
+                "Message broker publish failed, message buffered",
+                exchange=self.exchange_name,
+                queue=routing_key,
+                buffered=len(self._buffer),
+                error=repr(error),
+            )
+
+    async def _flush(self) -> None:
+        """Send the buffered messages oldest first, until one fails"""
+        self._flushing = True
+        try:
+            while self._buffer:
+                message, routing_key = self._buffer[0]
+                try:
+                    await self._call(self._send, message, routing_key)
+                except Exception:  # noqa: BLE001
+                    break
+                self._buffer.popleft()
+        finally:
+            self._flushing = False
+            BROKER_BUFFERED_MESSAGES.labels(self.exchange_name).set(len(self._buffer))
+
+    async def close(self) -> None:
+        if self.connection is not None and not self.connection.is_closed:
+            await self.connection.close()
@@ -1,22 +1,26 @@
 from dataclasses import dataclass
-from typing import Optional, Self
-
-from aio_pika import ExchangeType, Message
-from aiormq.abc import ConfirmationFrameType
+from typing import TYPE_CHECKING, Optional, Self
 
 from app.utils.message_brokers.exceptions import QueueNotFoundException
 
 from .base import BaseMessageBroker
 
+if TYPE_CHECKING:
+    from aiormq.abc import ConfirmationFrameType
+
 
 @dataclass
 class EmailsMessageBroker(BaseMessageBroker):
+    exchange_name = "emails"
+
     async def setup(self) -> Self:
+        from aio_pika import ExchangeType
+
         if not self._channel:
             self._channel = await self.connection.channel()
         if not self._exchange:
             self._exchange = await self._channel.declare_exchange(
-                name="emails", type=ExchangeType.DIRECT
+                name=self.exchange_name, type=ExchangeType.DIRECT
             )
 
         for queue_name in self.queues:
@@ -25,10 +29,12 @@ class EmailsMessageBroker(BaseMessageBroker):
 
         return self
 
-    async def publish(self, queue: str, body: str) -> Optional[ConfirmationFrameType]:
+    async def publish(self, queue: str, body: str) -> Optional["ConfirmationFrameType"]:
+        from aio_pika import Message
+
         if queue not in self.queues:
             raise QueueNotFoundException("Queue not found")
 
         message = Message(body=bytes(body.encode()))
 
-        return await self._exchange.publish(message=message, routing_key=queue)
+        return await self._publish(message=message, routing_key=queue)
@@ -1,11 +1,15 @@
 from dataclasses import dataclass
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from aio_pika import Connection
-from aio_pika.connection import connect
 from litestar.config.app import AppConfig
 from litestar.plugins import InitPluginProtocol
 
+if TYPE_CHECKING:
+    from aio_pika import Connection
+else:
+    # Litestar resolves the hints of dependencies, aio_pika is imported lazily
+    Connection = Any
+
 
 @dataclass(kw_only=True, frozen=True)
 class RabbitMQConfig:
@@ -21,6 +25,9 @@ class RabbitMQConfig:
         self,
     ) -> Connection:
         if not self.connection:
+            # aio_pika (with aiormq and pamqp) loads in the lifespan, not on import
+            from aio_pika.connection import connect
+
             return await connect(
                 host=self.host,
                 port=self.port,
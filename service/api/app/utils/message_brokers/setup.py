@@ -1,13 +1,23 @@
-from aio_pika import Connection
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING, Optional
+
+from app.utils.circuitbreaker import CircuitBreaker
 
 from .brokers import EmailsMessageBroker, LogsMessageBroker
 
+if TYPE_CHECKING:
+    from aio_pika import Connection
+
 
 def setup_message_brokers(
-    connection: Connection,
+    connection: Optional["Connection"],
+    connect: Optional[Callable[[], Awaitable["Connection"]]] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    buffer_size: int = 1000,
 ) -> tuple[EmailsMessageBroker, LogsMessageBroker]:
+    options = {"connect": connect, "breaker": breaker, "buffer_size": buffer_size}
     return (
-        EmailsMessageBroker(connection=connection, queues=["emails"]),
+        EmailsMessageBroker(connection=connection, queues=["emails"], **options),
         LogsMessageBroker(
             connection=connection,
             queues=[
@@ -17,5 +27,6 @@ def setup_message_brokers(
                 "sqlalchemy.pool",
                 "aiormq.connection",
             ],
+            **options,
         ),
     )
@@ -0,0 +1,63 @@
+from dataclasses import dataclass, field
+from typing import Any
+
+from aio_pika import Message
+
+
+@dataclass
+class FakeExchange:
+    name: str
+    published: list[tuple[str, Message]] = field(default_factory=list)
+
+    async def publish(self, message: Message, routing_key: str, **_: Any) -> None:
+        self.published.append((routing_key, message))
+
+
+@dataclass
+class FakeQueue:
+    name: str
+    bindings: list[tuple[str, str]] = field(default_factory=list)
+
+    async def bind(self, exchange: FakeExchange, routing_key: str, **_: Any) -> None:
+        self.bindings.append((exchange.name, routing_key))
+
+
+@dataclass
+class FakeChannel:
+    exchanges: dict[str, FakeExchange] = field(default_factory=dict)
+    queues: dict[str, FakeQueue] = field(default_factory=dict)
+
+    async def declare_exchange(self, name: str, **_: Any) -> FakeExchange:
+        return self.exchanges.setdefault(name, FakeExchange(name=name))
+
+    async def declare_queue(self, name: str, **_: Any) -> FakeQueue:
+        return self.queues.setdefault(name, FakeQueue(name=name))
+
+
+@dataclass
+class FakeConnection:
+    """In-process stand-in for an ``aio_pika`` connection.
+
+    Publishing only records the message, tests and benchmarks run the API
+    without a broker. Pass it as ``RabbitMQConfig(connection=FakeConnection())``.
+    """
+
+    channels: list[FakeChannel] = field(default_factory=list)
+    is_closed: bool = False
+
+    async def channel(self) -> FakeChannel:
+        channel = FakeChannel()
+        self.channels.append(channel)
+        return channel
+
+    async def close(self) -> None:
+        self.is_closed = True
+
+    @property
+    def published(self) -> list[tuple[str, Message]]:
+        return [
+            message
+            for channel in self.channels
+            for exchange in channel.exchanges.values()
+            for message in exchange.published
+        ]
@@ -0,0 +1,8 @@
+from .plugin import MetricsConfig, MetricsPlugin
+from .pool import InstrumentedAsyncAdaptedQueuePool
+
+__all__ = [
+    "MetricsConfig",
+    "MetricsPlugin",
+    "InstrumentedAsyncAdaptedQueuePool",
+]
@@ -0,0 +1,179 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import Counter, Gauge, Histogram
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    name="db_pool_checkout_wait_seconds",
+    documentation="Time spent waiting for a connection from the SQLAlchemy pool",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    name="db_pool_checked_out_connections",
+    documentation="Connections currently checked out from the SQLAlchemy pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    name="db_pool_overflow_connections",
+    documentation="Overflow connections currently opened above the pool size",
+    multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge(
+    name="db_pool_size_connections",
+    documentation="Configured persistent size of the SQLAlchemy pool",
+    multiprocess_mode="livesum",
+)
+
+RESPONSE_CACHE_LOOKUPS = Counter(
+    name="response_cache_lookups_total",
+    documentation="Response cache lookups, by result (hit or miss)",
+    labelnames=["result"],
+)
+RESPONSE_CACHE_STAMPEDE = Counter(
+    name="response_cache_stampede_total",
+    documentation=(
+        "Response cache misses and recomputes handled by the stampede protection, "
+        "by outcome"
+    ),
+    labelnames=["outcome"],
+)
+
+RECORD_CACHE_LOOKUPS = Counter(
+    name="record_cache_lookups_total",
+    documentation="Keys looked up in a record cache, by cache and result",
+    labelnames=["cache", "result"],
+)
+RECORD_CACHE_WRITES = Counter(
+    name="record_cache_writes_total",
+    documentation="Keys written to a record cache, by cache and outcome",
+    labelnames=["cache", "outcome"],
+)
+
+TOKEN_VERIFICATIONS = Counter(
+    name="token_verifications_total",
+    documentation=(
+        "Access tokens verified, by result: cached, verified, invalid or "
+        "invalid_cached"
+    ),
+    labelnames=["result"],
+)
+TOKEN_REVOCATION_CHECKS = Counter(
+    name="token_revocation_checks_total",
+    documentation=(
+        "Revocation checks of access tokens, by result: negative (Bloom filter "
+        "only), revoked, false_positive, unsynced or unavailable"
+    ),
+    labelnames=["result"],
+)
+REVOKED_TOKENS = Gauge(
+    name="revoked_tokens",
+    documentation="Revoked tokens in the Bloom filter of the worker",
+    multiprocess_mode="max",
+)
+
+RESPONSE_COMPRESSED_BYTES = Counter(
+    name="response_compressed_bytes_total",
+    documentation=(
+        "Compressed response bytes sent, by encoding and whether they were "
+        "replayed from the response cache"
+    ),
+    labelnames=["encoding", "cached"],
+)
+RESPONSE_COMPRESSION_SAVED_BYTES = Counter(
+    name="response_compression_saved_bytes_total",
+    documentation=(
+        "Response bytes saved by compression, by encoding and whether they were "
+        "replayed from the response cache"
+    ),
+    labelnames=["encoding", "cached"],
+)
+
+RATE_LIMIT_REJECTIONS = Counter(
+    name="rate_limit_rejections_total",
+    documentation="Requests rejected by the rate limiter, by policy and subject",
+    labelnames=["policy", "subject"],
+)
+RATE_LIMIT_BACKEND_FAILURES = Counter(
+    name="rate_limit_backend_failures_total",
+    documentation="Rate limiter Redis calls which failed, using local counters",
+    labelnames=["error"],
+)
+
+REQUEST_DEADLINE_EXCEEDED = Counter(
+    name="request_deadline_exceeded_total",
+    documentation="Requests answered with 504 because their deadline passed",
+    labelnames=["path"],
+)
+
+CONCURRENCY_LIMIT = Gauge(
+    name="concurrency_limit",
+    documentation="Adaptive in-flight request limit, by route class",
+    labelnames=["route_class"],
+    multiprocess_mode="livesum",
+)
+CONCURRENCY_IN_FLIGHT = Gauge(
+    name="concurrency_in_flight",
+    documentation="Requests holding a concurrency slot, by route class",
+    labelnames=["route_class"],
+    multiprocess_mode="livesum",
+)
+CONCURRENCY_SHED = Counter(
+    name="concurrency_shed_total",
+    documentation="Requests rejected with 503 over the concurrency limit",
+    labelnames=["route_class"],
+)
+
+CIRCUIT_BREAKER_STATE = Gauge(
+    name="circuit_breaker_state",
+    documentation="Circuit breaker state: 0 closed, 1 half-open, 2 open",
+    labelnames=["breaker"],
+    multiprocess_mode="livemax",
+)
+CIRCUIT_BREAKER_TRANSITIONS = Counter(
+    name="circuit_breaker_transitions_total",
+    documentation="Circuit breaker state changes, by the state entered",
+    labelnames=["breaker", "state"],
+)
+CIRCUIT_BREAKER_REJECTIONS = Counter(
+    name="circuit_breaker_rejections_total",
+    documentation="Calls failed fast because their circuit breaker was open",
+    labelnames=["breaker"],
+)
+
+BROKER_PUBLISH_LATENCY = Histogram(
+    name="broker_publish_duration_seconds",
+    documentation="Time until the broker confirmed a published message",
+    labelnames=["exchange", "queue"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+BROKER_CONFIRM_FAILURES = Counter(
+    name="broker_confirm_failures_total",
+    documentation="Published messages which were not confirmed by the broker",
+    labelnames=["exchange", "queue", "reason"],
+)
+BROKER_BUFFERED_MESSAGES = Gauge(
+    name="broker_buffered_messages",
+    documentation="Messages held while the broker is unavailable",
+    labelnames=["exchange"],
+    multiprocess_mode="livesum",
+)
+BROKER_DROPPED_MESSAGES = Counter(
+    name="broker_dropped_messages_total",
+    documentation="Messages dropped while the broker was unavailable, buffer full",
+    labelnames=["exchange"],
+)
+
+
+@contextmanager
+def track_publish(exchange: str, queue: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as ex:
+        BROKER_CONFIRM_FAILURES.labels(exchange, queue, type(ex).__name__).inc()
+        raise
+    finally:
+        BROKER_PUBLISH_LATENCY.labels(exchange, queue).observe(
+            time.perf_counter() - started
+        )
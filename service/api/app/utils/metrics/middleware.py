@@ -0,0 +1,79 @@
+import time
+from typing import Any
+
+from litestar import Request
+from litestar.contrib.prometheus import PrometheusMiddleware
+from litestar.enums import ScopeType
+from litestar.status_codes import HTTP_500_INTERNAL_SERVER_ERROR
+from litestar.types import Receive, Scope, Send
+
+from app.utils.routing import get_route_path
+
+
+class MetricsMiddleware(PrometheusMiddleware):
+    """Prometheus middleware which labels requests by route template.
+
+    The stock middleware uses the raw request path, so every ``/users/{id}``
+    becomes its own time series, and it reports requests which ended with an
+    exception (e.g. a 401 from the auth middleware) as ``200`` with zero duration.
+    """
+
+    def _get_default_labels(
+        self, request: Request[Any, Any, Any]
+    ) -> dict[str, str | int | float]:
+        return {
+            "method": request.method
+            if request.scope["type"] == ScopeType.HTTP
+            else request.scope["type"],
+            "path": get_route_path(request.scope),
+            "status_code": 200,
+            "app_name": self._config.app_name,
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request = Request[Any, Any, Any](scope, receive)
+
+        if (
+            self._config.excluded_http_methods
+            and request.method in self._config.excluded_http_methods
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        labels = {
+            **self._get_default_labels(request),
+            **self._get_extra_labels(request),
+        }
+        request_span = {
+            "start_time": time.perf_counter(),
+            "duration": 0,
+            "status_code": 200,
+        }
+        in_progress = self.requests_in_progress(labels).labels(*labels.values())
+
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, self._get_wrapped_send(send, request_span))
+        except Exception as ex:
+            request_span["status_code"] = getattr(
+                ex, "status_code", HTTP_500_INTERNAL_SERVER_ERROR
+            )
+            request_span["duration"] = time.perf_counter() - request_span["start_time"]
+            raise
+        finally:
+            in_progress.dec()
+
+            extra: dict[str, Any] = {}
+            if self._config.exemplars:
+                extra["exemplar"] = self._config.exemplars(request)
+
+            labels["status_code"] = request_span["status_code"]
+            label_values = [*labels.values()]
+
+            if request_span["status_code"] >= HTTP_500_INTERNAL_SERVER_ERROR:
+                self.requests_error_count(labels).labels(*label_values).inc(**extra)
+
+            self.request_count(labels).labels(*label_values).inc(**extra)
+            self.request_time(labels).labels(*label_values).observe(
+                request_span["duration"], **extra
+            )
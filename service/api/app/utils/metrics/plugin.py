@@ -0,0 +1,63 @@
+import os
+from dataclasses import dataclass, field
+
+from litestar.config.app import AppConfig
+from litestar.contrib.prometheus import PrometheusConfig, PrometheusController
+from litestar.plugins import InitPluginProtocol
+from prometheus_client import multiprocess
+
+from .middleware import MetricsMiddleware
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1, 2.5, 5, 10)
+"""Seconds, the request latencies of the API fall between 5ms and 10s"""
+
+
+@dataclass(kw_only=True, frozen=True)
+class MetricsConfig:
+    app_name: str = "users-service"
+    prefix: str = "http"
+    path: str = "/metrics"
+    buckets: list[float] = field(default_factory=lambda: list(LATENCY_BUCKETS))
+
+    @property
+    def multiprocess_dir(self) -> str | None:
+        return os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+    def create_prometheus_config(self) -> PrometheusConfig:
+        return PrometheusConfig(
+            app_name=self.app_name,
+            prefix=self.prefix,
+            buckets=self.buckets,
+            exclude=self.path,
+            exclude_unhandled_paths=True,
+            middleware_class=MetricsMiddleware,
+        )
+
+    def create_controller(self) -> type[PrometheusController]:
+        return type(
+            "MetricsController",
+            (PrometheusController,),
+            {
+                "path": self.path,
+                # scrapes are answered even while requests are being shed
+                "opt": {"exclude_from_auth": True, "concurrency": "priority"},
+            },
+        )
+
+
+class MetricsPlugin(InitPluginProtocol):
+    def __init__(self, config: MetricsConfig) -> None:
+        self._config = config
+
+    def on_app_init(self, app_config: AppConfig) -> AppConfig:
+        app_config.middleware.insert(
+            0, self._config.create_prometheus_config().middleware
+        )
+        app_config.route_handlers.append(self._config.create_controller())
+        app_config.on_shutdown.append(self._mark_process_dead)
+        return app_config
+
+    def _mark_process_dead(self) -> None:
+        """Drop live gauges of this worker, so ``livesum`` stays correct after exit"""
+        if self._config.multiprocess_dir:
+            multiprocess.mark_process_dead(os.getpid())
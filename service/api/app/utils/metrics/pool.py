@@ -0,0 +1,34 @@
+import time
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+
+from .collectors import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_CHECKOUT_WAIT,
+    DB_POOL_OVERFLOW,
+    DB_POOL_SIZE,
+)
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """``AsyncAdaptedQueuePool`` which reports checkout wait and usage to Prometheus"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        DB_POOL_SIZE.set(self.size())
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+            self._report_usage()
+
+    def _do_return_conn(self, record: ConnectionPoolEntry) -> None:
+        super()._do_return_conn(record)
+        self._report_usage()
+
+    def _report_usage(self) -> None:
+        DB_POOL_CHECKED_OUT.set(self.checkedout())
+        DB_POOL_OVERFLOW.set(max(self.overflow(), 0))
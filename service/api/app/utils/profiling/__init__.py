@@ -0,0 +1,3 @@
+from .plugin import ProfilingConfig, ProfilingPlugin
+
+__all__ = ["ProfilingConfig", "ProfilingPlugin"]
@@ -0,0 +1,79 @@
+import json
+from typing import TYPE_CHECKING, Any, Literal
+
+import anyio
+from litestar import Controller, Response, get
+from litestar.connection import ASGIConnection
+from litestar.exceptions import NotFoundException, PermissionDeniedException
+from litestar.handlers.base import BaseRouteHandler
+from litestar.params import Parameter
+
+from .export import to_collapsed, to_speedscope
+from .sampler import StackSampler
+
+if TYPE_CHECKING:
+    from .plugin import ProfilingConfig
+
+ExportFormat = Literal["collapsed", "speedscope"]
+
+
+def create_profiling_controller(
+    config: "ProfilingConfig", sampler: StackSampler
+) -> type[Controller]:
+    async def admin_guard(
+        connection: ASGIConnection[Any, Any, Any, Any], _: BaseRouteHandler
+    ) -> None:
+        if not config.is_admin(connection):
+            raise PermissionDeniedException(detail="Insufficient privileges")
+
+    class ProfilingController(Controller):
+        path = config.path
+        guards = [admin_guard]
+        tags = ["profiling"]
+        include_in_schema = False
+
+        @get("/flamegraph")
+        async def get_flamegraph(
+            self,
+            export_format: ExportFormat = Parameter(
+                query="format", default="collapsed"
+            ),
+            route: str | None = Parameter(query="route", default=None, required=False),
+            reset: bool = Parameter(query="reset", default=False, required=False),
+        ) -> Response:
+            """Profile aggregated by the continuous sampler since start or last reset"""
+            profiles = sampler.reset() if reset else dict(sampler.routes)
+            selected = [p for name, p in profiles.items() if route in (None, name)]
+            return _export(selected, export_format, name="continuous")
+
+        @get("/requests/{profile_id:str}")
+        async def get_request_profile(self, profile_id: str) -> Response:
+            """Deep profile of a single request, by its ``X-Profile-Id``"""
+            if not profile_id.isalnum():
+                raise NotFoundException(detail="Profile not found")
+            path = anyio.Path(config.request_profile_path(profile_id))
+            if not await path.exists():
+                raise NotFoundException(detail="Profile not found")
+            return Response(
+                content=await path.read_bytes(),
+                media_type="application/octet-stream",
+                headers={"Content-Disposition": f'attachment; filename="{path.name}"'},
+            )
+
+    return ProfilingController
+
+
+def _export(profiles: list, export_format: ExportFormat, name: str) -> Response:
+    if export_format == "speedscope":
+        return Response(
+            content=json.dumps(to_speedscope(profiles, name=name)),
+            media_type="application/json",
+            headers={
+                "Content-Disposition": f'attachment; filename="{name}.speedscope.json"'
+            },
+        )
+    return Response(
+        content=to_collapsed(profiles),
+        media_type="text/plain",
+        headers={"Content-Disposition": f'attachment; filename="{name}.collapsed"'},
+    )
@@ -0,0 +1,74 @@
+from types import CodeType
+from typing import Any, Iterable
+
+from .sampler import TRUNCATED_STACK, StackProfile
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+def frame_name(code: CodeType) -> str:
+    return f"{code.co_qualname} ({code.co_filename}:{code.co_firstlineno})"
+
+
+def to_collapsed(profiles: Iterable[StackProfile]) -> str:
+    """Render profiles in Brendan Gregg's collapsed-stack format.
+
+    Every line is ``route;frame;frame;... count``, ready for ``flamegraph.pl``
+    or speedscope's import.
+    """
+    lines: list[str] = []
+    for profile in profiles:
+        for stack, count in profile.stacks.items():
+            frames = (
+                ["<truncated>"]
+                if stack == TRUNCATED_STACK
+                else [frame_name(code).replace(";", ":") for code in stack]
+            )
+            lines.append(f"{';'.join([profile.name, *frames])} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def to_speedscope(profiles: Iterable[StackProfile], name: str) -> dict[str, Any]:
+    """Render profiles as a speedscope file, one sampled profile per route"""
+    frames: list[dict[str, Any]] = [{"name": "<truncated>"}]
+    frame_index: dict[CodeType, int] = {}
+
+    def index_of(code: CodeType) -> int:
+        if code not in frame_index:
+            frame_index[code] = len(frames)
+            frames.append(
+                {
+                    "name": code.co_qualname,
+                    "file": code.co_filename,
+                    "line": code.co_firstlineno,
+                }
+            )
+        return frame_index[code]
+
+    rendered: list[dict[str, Any]] = []
+    for profile in profiles:
+        samples, weights = [], []
+        for stack, count in profile.stacks.items():
+            samples.append(
+                [0] if stack == TRUNCATED_STACK else [index_of(c) for c in stack]
+            )
+            weights.append(count)
+        rendered.append(
+            {
+                "type": "sampled",
+                "name": profile.name,
+                "unit": "none",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }
+        )
+
+    return {
+        "$schema": SPEEDSCOPE_SCHEMA,
+        "name": name,
+        "exporter": "users-service-profiler",
+        "shared": {"frames": frames},
+        "profiles": rendered,
+    }
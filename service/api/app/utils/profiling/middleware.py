@@ -0,0 +1,78 @@
+import json
+import sys
+import uuid
+from typing import TYPE_CHECKING
+
+import anyio
+from litestar.connection import ASGIConnection
+from litestar.datastructures import MutableScopeHeaders
+from litestar.middleware import AbstractMiddleware
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.routing import get_route_path
+
+from .export import to_collapsed, to_speedscope
+from .sampler import RequestProfile, StackSampler
+
+if TYPE_CHECKING:
+    from .plugin import ProfilingConfig
+
+
+class ProfilingMiddleware(AbstractMiddleware):
+    """Registers the request frame with the sampler and runs deep profiles"""
+
+    def __init__(
+        self, app: ASGIApp, config: "ProfilingConfig", sampler: StackSampler
+    ) -> None:
+        super().__init__(app=app, scopes={"http"})
+        self.config = config
+        self.sampler = sampler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        frame = sys._getframe()
+        route = get_route_path(scope)
+
+        if not self._wants_deep_profile(scope):
+            self.sampler.track(frame, route)
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self.sampler.untrack(frame)
+            return
+
+        profile_id = uuid.uuid4().hex
+        profile = RequestProfile(name=route, max_stacks=self.config.max_stacks)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # the response cache keeps a reference to the original message
+                message = {**message, "headers": list(message.get("headers", ()))}
+                MutableScopeHeaders.from_message(message)["X-Profile-Id"] = profile_id
+            await send(message)
+
+        self.sampler.track(frame, route, profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.sampler.untrack(frame)
+            await self._save(profile_id, profile)
+
+    def _wants_deep_profile(self, scope: Scope) -> bool:
+        connection = ASGIConnection(scope)
+        if connection.headers.get(self.config.header, "").lower() not in (
+            "1",
+            "true",
+        ):
+            return False
+        return self.config.is_admin(connection)
+
+    async def _save(self, profile_id: str, profile: RequestProfile) -> None:
+        path = self.config.request_profile_path(profile_id)
+        if self.config.output_format == "collapsed":
+            content = to_collapsed([profile])
+        else:
+            content = json.dumps(to_speedscope([profile], name=profile.name))
+
+        await anyio.Path(path.parent).mkdir(parents=True, exist_ok=True)
+        await anyio.Path(path).write_text(content)
+        await anyio.to_thread.run_sync(self.config.prune_request_profiles)
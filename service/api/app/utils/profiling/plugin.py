@@ -0,0 +1,92 @@
+from contextlib import suppress
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Literal
+
+from litestar.config.app import AppConfig
+from litestar.connection import ASGIConnection
+from litestar.middleware.base import DefineMiddleware
+from litestar.plugins import InitPluginProtocol
+
+from .controller import create_profiling_controller
+from .middleware import ProfilingMiddleware
+from .sampler import StackSampler
+
+
+def is_superuser(connection: ASGIConnection[Any, Any, Any, Any]) -> bool:
+    return bool(getattr(connection.scope.get("user"), "is_superuser", False))
+
+
+@dataclass(kw_only=True, frozen=True)
+class ProfilingConfig:
+    enabled: bool = False
+    interval: float = 0.01
+    """Seconds between samples of the continuous sampler"""
+    deep_interval: float = 0.001
+    """Seconds between samples while a deep (per-request) profile is running"""
+    max_overhead: float = 0.02
+    """Upper bound of the CPU time share spent sampling"""
+    deep_max_overhead: float = 0.25
+    """Upper bound of the CPU time share while a deep profile is running"""
+    max_depth: int = 128
+    max_stacks: int = 10_000
+    """Distinct stacks kept per route, the rest are counted as truncated"""
+
+    header: str = "X-Profile"
+    output_dir: Path = Path("/tmp/profiles")  # noqa: S108
+    output_format: Literal["speedscope", "collapsed"] = "speedscope"
+    max_request_profiles: int = 100
+    """Deep profiles kept in ``output_dir``, the oldest are removed on save"""
+    path: str = "/profiling"
+    is_admin: Callable[[ASGIConnection[Any, Any, Any, Any]], bool] = is_superuser
+
+    def request_profile_path(self, profile_id: str) -> Path:
+        suffix = (
+            "speedscope.json" if self.output_format == "speedscope" else "collapsed"
+        )
+        return self.output_dir / f"{profile_id}.{suffix}"
+
+    def prune_request_profiles(self) -> None:
+        """Remove the oldest deep profiles over ``max_request_profiles``"""
+        profiles: list[tuple[float, Path]] = []
+        for pattern in ("*.speedscope.json", "*.collapsed"):
+            for path in self.output_dir.glob(pattern):
+                # another worker may have removed it meanwhile
+                with suppress(FileNotFoundError):
+                    profiles.append((path.stat().st_mtime, path))
+        profiles.sort()
+        for _, path in profiles[: max(len(profiles) - self.max_request_profiles, 0)]:
+            path.unlink(missing_ok=True)
+
+
+class ProfilingPlugin(InitPluginProtocol):
+    def __init__(self, config: ProfilingConfig) -> None:
+        self._config = config
+        self._sampler = StackSampler(
+            interval=config.interval,
+            deep_interval=config.deep_interval,
+            max_overhead=config.max_overhead,
+            deep_max_overhead=config.deep_max_overhead,
+            max_depth=config.max_depth,
+            max_stacks=config.max_stacks,
+        )
+
+    @property
+    def sampler(self) -> StackSampler:
+        return self._sampler
+
+    def on_app_init(self, app_config: AppConfig) -> AppConfig:
+        if not self._config.enabled:
+            return app_config
+
+        app_config.middleware.append(
+            DefineMiddleware(
+                ProfilingMiddleware, config=self._config, sampler=self._sampler
+            )
+        )
+        app_config.route_handlers.append(
+            create_profiling_controller(self._config, self._sampler)
+        )
+        app_config.on_startup.append(self._sampler.start)
+        app_config.on_shutdown.append(self._sampler.stop)
+        return app_config
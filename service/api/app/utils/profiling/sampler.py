@@ -0,0 +1,158 @@
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from types import CodeType, FrameType
+from typing import Optional
+
+Stack = tuple[CodeType, ...]
+
+IDLE_ROUTE = "<idle>"
+TRUNCATED_STACK: Stack = ()
+
+
+@dataclass
+class StackProfile:
+    """Sampled stacks (root first) with the number of times they were seen"""
+
+    name: str
+    max_stacks: int
+    stacks: Counter[Stack] = field(default_factory=Counter)
+    samples: int = 0
+
+    def add(self, stack: Stack) -> None:
+        self.samples += 1
+        if stack in self.stacks or len(self.stacks) < self.max_stacks:
+            self.stacks[stack] += 1
+        else:
+            self.stacks[TRUNCATED_STACK] += 1
+
+
+@dataclass
+class RequestProfile(StackProfile):
+    """Profile of a single request, filled while the request is on the event loop"""
+
+    started_at: float = field(default_factory=time.time)
+
+
+class StackSampler:
+    """Statistical sampler of the event loop thread.
+
+    A daemon thread periodically grabs the stack of the loop thread through
+    ``sys._current_frames()``. Requests are attributed by frame: the profiling
+    middleware registers its own frame with :meth:`track`, and any sampled stack
+    passing through that frame belongs to the request.
+
+    Sampling is bounded by CPU share, not only by interval: when a sample gets
+    expensive (deep stacks, many threads) the interval grows, so the sampler
+    never spends more than ``max_overhead`` (``deep_max_overhead`` while a
+    per-request profile runs) of a core.
+
+    The sampler thread only runs when the loop thread hands over the GIL, which
+    happens every ``sys.getswitchinterval()`` (5ms). Deep profiles lower the
+    switch interval to ``deep_interval`` while they run, otherwise they'd get a
+    handful of samples per request.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        deep_interval: float,
+        max_overhead: float,
+        deep_max_overhead: float,
+        max_depth: int,
+        max_stacks: int,
+    ) -> None:
+        self.interval = interval
+        self.deep_interval = deep_interval
+        self.max_overhead = max_overhead
+        self.deep_max_overhead = deep_max_overhead
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+
+        self.routes: dict[str, StackProfile] = {}
+        self.started_at: float = time.time()
+        self._tracked: dict[FrameType, tuple[str, Optional[RequestProfile]]] = {}
+        self._deep_profiles = 0
+        self._switch_interval = sys.getswitchinterval()
+        self._target_thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._target_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def reset(self) -> dict[str, StackProfile]:
+        with self._lock:
+            routes, self.routes = self.routes, {}
+            self.started_at = time.time()
+        return routes
+
+    def track(
+        self, frame: FrameType, route: str, profile: Optional[RequestProfile] = None
+    ) -> None:
+        self._tracked[frame] = (route, profile)
+        if profile is not None:
+            if not self._deep_profiles:
+                self._switch_interval = sys.getswitchinterval()
+                sys.setswitchinterval(self.deep_interval)
+            self._deep_profiles += 1
+
+    def untrack(self, frame: FrameType) -> None:
+        _, profile = self._tracked.pop(frame, (None, None))
+        if profile is not None:
+            self._deep_profiles -= 1
+            if not self._deep_profiles:
+                sys.setswitchinterval(self._switch_interval)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            # CPU time of this thread: waiting for the GIL isn't overhead
+            started = time.thread_time()
+            frame = sys._current_frames().get(self._target_thread_id)
+            if frame is not None:
+                self._sample(frame)
+            cost = time.thread_time() - started
+
+            if self._deep_profiles:
+                wait = max(self.deep_interval, cost / self.deep_max_overhead)
+            else:
+                wait = max(self.interval, cost / self.max_overhead)
+            self._stop.wait(wait)
+
+    def _sample(self, frame: FrameType) -> None:
+        codes: list[CodeType] = []
+        route, profile = IDLE_ROUTE, None
+
+        current: Optional[FrameType] = frame
+        while current is not None:
+            if current in self._tracked:
+                route, profile = self._tracked[current]
+            if len(codes) < self.max_depth:
+                codes.append(current.f_code)
+            current = current.f_back
+
+        stack: Stack = tuple(reversed(codes))
+        with self._lock:
+            if route not in self.routes:
+                self.routes[route] = StackProfile(
+                    name=route, max_stacks=self.max_stacks
+                )
+            self.routes[route].add(stack)
+        if profile is not None:
+            profile.add(stack)
@@ -0,0 +1,11 @@
+from .limiter import LocalSlidingWindow, RateLimitResult, SlidingWindowLimiter
+from .plugin import RateLimitConfig, RateLimitPlugin, RateLimitPolicy
+
+__all__ = [
+    "RateLimitConfig",
+    "RateLimitPlugin",
+    "RateLimitPolicy",
+    "RateLimitResult",
+    "SlidingWindowLimiter",
+    "LocalSlidingWindow",
+]
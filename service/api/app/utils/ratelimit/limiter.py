@@ -0,0 +1,204 @@
+import asyncio
+import math
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+import structlog
+from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
+from redis.exceptions import RedisError
+
+from app.utils.circuitbreaker import CircuitBreaker, CircuitOpenError
+from app.utils.metrics.collectors import RATE_LIMIT_BACKEND_FAILURES
+
+logger = structlog.get_logger()
+
+SLIDING_WINDOW = """
+-- KEYS: one sorted set of request timestamps (ms) per limited subject
+-- ARGV: window (ms), request id, then the limit of every key
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local window = tonumber(ARGV[1])
+local allowed, index, limit, remaining, reset = 1, 0, 0, -1, 0
+
+for i, key in ipairs(KEYS) do
+    local key_limit = tonumber(ARGV[i + 2])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    local count = redis.call('ZCARD', key)
+    local key_allowed, key_remaining, key_reset = 1, key_limit - count - 1, window
+    if count >= key_limit then
+        -- a slot frees up once the oldest requests above the limit expire
+        local index = count - key_limit
+        local entry = redis.call('ZRANGE', key, index, index, 'WITHSCORES')
+        key_allowed, key_remaining = 0, 0
+        key_reset = tonumber(entry[2]) + window - now
+    elseif count > 0 then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        key_reset = tonumber(oldest[2]) + window - now
+    end
+
+    -- report the most restrictive key: rejecting, then fewest remaining
+    if remaining < 0 or key_allowed < allowed or (key_allowed == allowed
+        and (key_remaining < remaining
+        or (key_remaining == remaining and key_reset > reset))) then
+        index, limit, remaining, reset = i - 1, key_limit, key_remaining, key_reset
+    end
+    if key_allowed == 0 then
+        allowed = 0
+    end
+end
+
+if allowed == 1 then
+    for _, key in ipairs(KEYS) do
+        redis.call('ZADD', key, now, ARGV[2])
+        redis.call('PEXPIRE', key, window)
+    end
+end
+return {allowed, index, limit, remaining, reset}
+"""
+"""Atomic sliding window log over several keys, a request is only counted
+(in every key) when no key is over its limit"""
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    allowed: bool
+    index: int
+    """Position of the most restrictive key"""
+    limit: int
+    """Limit of the most restrictive key"""
+    remaining: int
+    reset: float
+    """Seconds until that key has a free slot again"""
+
+    @property
+    def retry_after(self) -> int:
+        return max(math.ceil(self.reset), 1)
+
+
+class LocalSlidingWindow:
+    """In-process sliding window log, used while Redis is unreachable.
+
+    Every worker counts on its own, so the effective limit is the configured
+    one times the number of workers. At most ``max_keys`` subjects are kept,
+    the least recently seen are dropped first.
+    """
+
+    def __init__(self, max_keys: int = 10_000) -> None:
+        self.max_keys = max_keys
+        self._hits: OrderedDict[str, deque[float]] = OrderedDict()
+
+    def hit(
+        self, keys: Sequence[str], limits: Sequence[int], window: float
+    ) -> RateLimitResult:
+        now = time.monotonic()
+        result: Optional[RateLimitResult] = None
+        for index, (key, limit) in enumerate(zip(keys, limits)):
+            hits = self._hits.get(key)
+            if hits is None:
+                hits = self._hits[key] = deque()
+            self._hits.move_to_end(key)
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+
+            count = len(hits)
+            if count >= limit:
+                key_result = RateLimitResult(
+                    allowed=False,
+                    index=index,
+                    limit=limit,
+                    remaining=0,
+                    reset=hits[count - limit] + window - now,
+                )
+            else:
+                key_result = RateLimitResult(
+                    allowed=True,
+                    index=index,
+                    limit=limit,
+                    remaining=limit - count - 1,
+                    reset=hits[0] + window - now if hits else window,
+                )
+            if result is None or _more_restrictive(key_result, result):
+                result = key_result
+
+        assert result is not None  # noqa: S101
+        if result.allowed:
+            for key in keys:
+                self._hits[key].append(now)
+        while len(self._hits) > self.max_keys:
+            self._hits.popitem(last=False)
+        return result
+
+
+def _more_restrictive(a: RateLimitResult, b: RateLimitResult) -> bool:
+    return (not a.allowed, -a.remaining, a.reset) > (
+        not b.allowed,
+        -b.remaining,
+        b.reset,
+    )
+
+
+class SlidingWindowLimiter:
+    """Sliding window rate limiter shared by all workers through Redis.
+
+    When Redis fails or doesn't answer within ``timeout`` its circuit breaker
+    opens and the limiter counts in a :class:`LocalSlidingWindow`, so an
+    outage neither blocks nor disables the limits. After ``retry_interval``
+    seconds one request probes Redis again.
+    """
+
+    def __init__(
+        self,
+        redis: Callable[[], Redis],
+        *,
+        prefix: str = "ratelimit",
+        timeout: float = 0.25,
+        retry_interval: float = 5.0,
+    ) -> None:
+        self.redis = redis
+        """Called on first use, the client is created lazily"""
+        self.prefix = prefix
+        self.breaker = CircuitBreaker(
+            f"{prefix}_redis",
+            failure_threshold=1,
+            recovery_time=retry_interval,
+            timeout=timeout,
+            exceptions=(RedisError, OSError),
+        )
+        self.local = LocalSlidingWindow()
+        self._script: Optional[AsyncScript] = None
+
+    async def hit(
+        self, keys: Sequence[str], limits: Sequence[int], window: float
+    ) -> RateLimitResult:
+        """Count a request against every key, unless one of them is exhausted"""
+        keys = [f"{self.prefix}:{key}" for key in keys]
+        if self._script is None:
+            self._script = self.redis().register_script(SLIDING_WINDOW)
+        try:
+            allowed, index, limit, remaining, reset = await self.breaker.call(
+                self._script,
+                keys=keys,
+                args=[int(window * 1000), uuid.uuid4().hex, *limits],
+            )
+        except CircuitOpenError:
+            return self.local.hit(keys, limits, window)
+        except (RedisError, OSError, asyncio.TimeoutError) as ex:
+            RATE_LIMIT_BACKEND_FAILURES.labels(type(ex).__name__).inc()
+            logger.warning(
+                "Rate limiter falling back to local counters",
+                error=repr(ex),
+                retry_in=self.breaker.recovery_time,
+            )
+            return self.local.hit(keys, limits, window)
+
+        return RateLimitResult(
+            allowed=bool(allowed),
+            index=int(index),
+            limit=int(limit),
+            remaining=int(remaining),
+            reset=int(reset) / 1000,
+        )
@@ -0,0 +1,134 @@
+import hashlib
+from typing import TYPE_CHECKING, Any, Optional
+
+import structlog
+from litestar.connection import Request
+from litestar.datastructures import MutableScopeHeaders
+from litestar.enums import RequestEncodingType
+from litestar.exceptions import TooManyRequestsException
+from litestar.middleware import AbstractMiddleware
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.metrics.collectors import RATE_LIMIT_REJECTIONS
+from app.utils.routing import get_route_path
+
+from .limiter import RateLimitResult, SlidingWindowLimiter
+
+if TYPE_CHECKING:
+    from .plugin import RateLimitConfig, RateLimitPolicy
+
+logger = structlog.get_logger()
+
+MSGPACK_CONTENT_TYPES = {"application/msgpack", RequestEncodingType.MESSAGEPACK}
+
+
+class RateLimitMiddleware(AbstractMiddleware):
+    """Rate limits the routes naming a policy with ``opt={"rate_limit": name}``.
+
+    Requests are counted per client IP and, when the policy has a
+    ``username_field``, per submitted username. Over the limit the request is
+    answered with 429 before its handler runs, so no password is hashed and
+    nothing is queried.
+    """
+
+    def __init__(
+        self, app: ASGIApp, config: "RateLimitConfig", limiter: SlidingWindowLimiter
+    ) -> None:
+        super().__init__(app=app, scopes={"http"})
+        self.config = config
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        name = scope["route_handler"].opt.get("rate_limit")
+        policy = self.config.policies.get(name) if name else None
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request[Any, Any, Any](scope, receive)
+        subjects = {"ip": self.client_ip(request)}
+        if policy.username_field:
+            username = await self.username(request, policy.username_field)
+            if username:
+                subjects["username"] = username
+
+        keys = [f"{name}:{subject}:{value}" for subject, value in subjects.items()]
+        limits = [
+            policy.per_ip if subject == "ip" else policy.per_username
+            for subject in subjects
+        ]
+        result = await self.limiter.hit(keys, limits, policy.window)
+        headers = self.headers(result, policy)
+        if not result.allowed:
+            subject = list(subjects)[result.index]
+            RATE_LIMIT_REJECTIONS.labels(name, subject).inc()
+            logger.info(
+                "Rate limited",
+                path=get_route_path(scope),
+                policy=name,
+                subject=subject,
+                retry_after=result.retry_after,
+            )
+            raise TooManyRequestsException(
+                detail="Too many requests, retry later",
+                headers={"Retry-After": str(result.retry_after), **headers},
+            )
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", ()))}
+                response_headers = MutableScopeHeaders.from_message(message)
+                for header, value in headers.items():
+                    response_headers.add(header, value)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def client_ip(self, request: Request[Any, Any, Any]) -> str:
+        header = self.config.ip_header
+        forwarded = request.headers.get(header) if header else None
+        if forwarded:
+            # every proxy appends the address it got the request from, the
+            # entries left of the trusted ones are the client's to forge
+            entries = forwarded.split(",")
+            index = max(len(entries) - self.config.trusted_proxies, 0)
+            return entries[index].strip()
+        return request.client.host if request.client else "unknown"
+
+    @staticmethod
+    async def username(request: Request[Any, Any, Any], field: str) -> Optional[str]:
+        """Username submitted in the form, JSON or MessagePack body, hashed to
+        bound key size.
+
+        The parsed body is cached on the connection, the handler doesn't read
+        or parse it again.
+        """
+        content_type, _ = request.content_type
+        try:
+            if content_type in (
+                RequestEncodingType.URL_ENCODED,
+                RequestEncodingType.MULTI_PART,
+            ):
+                value = (await request.form()).get(field)
+            elif content_type in MSGPACK_CONTENT_TYPES:
+                data = await request.msgpack()
+                value = data.get(field) if isinstance(data, dict) else None
+            else:
+                data = await request.json()
+                value = data.get(field) if isinstance(data, dict) else None
+        except Exception:  # noqa: BLE001
+            # malformed bodies are the handler's to reject, the IP limit applies
+            return None
+        if not isinstance(value, str) or not value.strip():
+            return None
+        return hashlib.sha256(value.strip().lower().encode()).hexdigest()[:32]
+
+    @staticmethod
+    def headers(result: RateLimitResult, policy: "RateLimitPolicy") -> dict[str, str]:
+        """``RateLimit-*`` fields of the IETF httpapi ratelimit-headers draft"""
+        return {
+            "RateLimit-Limit": str(result.limit),
+            "RateLimit-Remaining": str(max(result.remaining, 0)),
+            "RateLimit-Reset": str(result.retry_after),
+            "RateLimit-Policy": f"{result.limit};w={int(policy.window)}",
+        }
@@ -0,0 +1,68 @@
+from dataclasses import dataclass, field
+from typing import Callable, Mapping, Optional
+
+from litestar.config.app import AppConfig
+from litestar.middleware.base import DefineMiddleware
+from litestar.plugins import InitPluginProtocol
+from redis.asyncio import Redis
+
+from .limiter import SlidingWindowLimiter
+from .middleware import RateLimitMiddleware
+
+
+@dataclass(kw_only=True, frozen=True)
+class RateLimitPolicy:
+    per_ip: int
+    """Requests allowed per client IP within ``window``"""
+    per_username: int = 0
+    """Requests allowed per submitted username within ``window``"""
+    window: float = 60.0
+    """Seconds of the sliding window"""
+    username_field: Optional[str] = None
+    """Form or JSON field holding the username, ``None`` limits by IP only"""
+
+
+@dataclass(kw_only=True, frozen=True)
+class RateLimitConfig:
+    redis: Callable[[], Redis]
+    """Client of the shared counters, called on first use"""
+    policies: Mapping[str, RateLimitPolicy] = field(default_factory=dict)
+    """Policies by name, route handlers pick one with ``opt={"rate_limit": name}``"""
+    enabled: bool = True
+    ip_header: Optional[str] = None
+    """Header the trusted proxies append the client address to, e.g.
+    ``X-Forwarded-For``"""
+    trusted_proxies: int = 1
+    """Proxies in front of the app appending to ``ip_header``"""
+    prefix: str = "ratelimit"
+    timeout: float = 0.25
+    """Seconds to wait for Redis before counting locally"""
+    retry_interval: float = 5.0
+    """Seconds to keep counting locally after Redis failed, before probing it"""
+
+
+class RateLimitPlugin(InitPluginProtocol):
+    def __init__(self, config: RateLimitConfig) -> None:
+        self._config = config
+        self._limiter = SlidingWindowLimiter(
+            config.redis,
+            prefix=config.prefix,
+            timeout=config.timeout,
+            retry_interval=config.retry_interval,
+        )
+
+    @property
+    def limiter(self) -> SlidingWindowLimiter:
+        return self._limiter
+
+    def on_app_init(self, app_config: AppConfig) -> AppConfig:
+        if not self._config.enabled or not self._config.policies:
+            return app_config
+
+        app_config.middleware.insert(
+            0,
+            DefineMiddleware(
+                RateLimitMiddleware, config=self._config, limiter=self._limiter
+            ),
+        )
+        return app_config
@@ -0,0 +1,10 @@
+from .bloom import BloomFilter
+from .plugin import RevocationConfig, RevocationPlugin
+from .revocations import TokenRevocations
+
+__all__ = [
+    "BloomFilter",
+    "RevocationConfig",
+    "RevocationPlugin",
+    "TokenRevocations",
+]
@@ -0,0 +1,47 @@
+import hashlib
+import math
+from typing import Union
+
+
+class BloomFilter:
+    """Set membership in a few bits per item, with false positives only.
+
+    Sized for ``capacity`` items at ``error_rate`` false positives, past that
+    the rate rises: rebuild it rather than adding forever. Items can't be
+    removed.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        bits = -capacity * math.log(error_rate) / math.log(2) ** 2
+        self.size = max(8, math.ceil(bits))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, item: Union[str, bytes]) -> None:
+        first, second = self._hash(item)
+        for i in range(self.hashes):
+            position = (first + i * second) % self.size
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: Union[str, bytes]) -> bool:
+        # most lookups are negatives, settled by the first unset bit
+        first, second = self._hash(item)
+        for i in range(self.hashes):
+            position = (first + i * second) % self.size
+            if not self._bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @staticmethod
+    def _hash(item: Union[str, bytes]) -> tuple[int, int]:
+        # double hashing (Kirsch-Mitzenmacher), one digest for all the hashes
+        if isinstance(item, str):
+            item = item.encode()
+        digest = hashlib.blake2b(item, digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return first, second
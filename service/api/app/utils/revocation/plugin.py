@@ -0,0 +1,35 @@
+from dataclasses import dataclass
+from typing import Callable
+
+from litestar.config.app import AppConfig
+from litestar.plugins import InitPluginProtocol
+
+from .revocations import TokenRevocations
+
+
+@dataclass(kw_only=True, frozen=True)
+class RevocationConfig:
+    revocations: Callable[[], TokenRevocations]
+    """Revocations of the app, called on startup"""
+    enabled: bool = True
+
+
+class RevocationPlugin(InitPluginProtocol):
+    """Keeps the worker's filter of revoked tokens in sync while the app runs"""
+
+    def __init__(self, config: RevocationConfig) -> None:
+        self._config = config
+
+    def on_app_init(self, app_config: AppConfig) -> AppConfig:
+        if not self._config.enabled:
+            return app_config
+
+        app_config.on_startup.append(self.start)
+        app_config.on_shutdown.append(self.stop)
+        return app_config
+
+    async def start(self) -> None:
+        await self._config.revocations().start()
+
+    async def stop(self) -> None:
+        await self._config.revocations().stop()
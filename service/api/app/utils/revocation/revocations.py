@@ -0,0 +1,161 @@
+import asyncio
+import math
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+import structlog
+from litestar.exceptions import ServiceUnavailableException
+from redis.asyncio import Redis
+
+from app.utils.cache.store import REDIS_UNAVAILABLE
+from app.utils.circuitbreaker import CircuitBreaker
+from app.utils.deadline.context import DeadlineExceededException
+from app.utils.metrics.collectors import REVOKED_TOKENS, TOKEN_REVOCATION_CHECKS
+
+from .bloom import BloomFilter
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+
+class TokenRevocations:
+    """Revoked access tokens, by ``jti``, until they would have expired.
+
+    Revocations are Redis keys expiring with their token and are published on
+    ``channel``. Each worker keeps a Bloom filter of them, filled by a scan of
+    the keys and kept current by the channel: a token the filter doesn't know
+    isn't revoked, the check costs a few microseconds and no round trip. Only
+    a possible positive asks Redis, to tell revocations from false positives.
+
+    Until the filter is synced (at startup, after the channel dropped) every
+    check asks Redis. When Redis can't answer a possible positive the token
+    counts as revoked, otherwise as valid: revocation shortens the token
+    lifetime, it doesn't gate every request on Redis.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        namespace: str = "revoked_tokens",
+        capacity: int = 100_000,
+        error_rate: float = 0.001,
+        rebuild_interval: float = 300.0,
+        retry_interval: float = 5.0,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
+        self._redis = redis
+        self.namespace = namespace
+        self.channel = f"{namespace}:revoked"
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+        self.retry_interval = retry_interval
+        self.breaker = breaker
+        self.synced = False
+        self._filter = BloomFilter(capacity, error_rate)
+        self._task: Optional[asyncio.Task[None]] = None
+
+    async def revoke(self, jti: str, expires_at: datetime) -> None:
+        """Revoke the token ``jti`` until ``expires_at``, for every worker"""
+        ttl = math.ceil((expires_at - datetime.now(timezone.utc)).total_seconds())
+        if ttl <= 0:
+            return
+        self._filter.add(jti)
+        pipeline = self._redis.pipeline(transaction=False)
+        pipeline.set(self._make_key(jti), 1, ex=ttl)
+        pipeline.publish(self.channel, jti)
+        try:
+            await self._call(pipeline.execute)
+        except (*REDIS_UNAVAILABLE, DeadlineExceededException) as ex:
+            logger.warning("Token revocation failed", error=repr(ex))
+            raise ServiceUnavailableException(
+                detail="Couldn't revoke the token, retry later"
+            ) from ex
+
+    async def is_revoked(self, jti: str) -> bool:
+        """Whether the token ``jti`` was revoked, Redis is asked only when the
+        filter can't tell"""
+        if self.synced and jti not in self._filter:
+            TOKEN_REVOCATION_CHECKS.labels("negative").inc()
+            return False
+        try:
+            revoked = bool(await self._call(self._redis.exists, self._make_key(jti)))
+        except (*REDIS_UNAVAILABLE, DeadlineExceededException):
+            TOKEN_REVOCATION_CHECKS.labels("unavailable").inc()
+            return self.synced
+        if revoked:
+            TOKEN_REVOCATION_CHECKS.labels("revoked").inc()
+        elif self.synced:
+            TOKEN_REVOCATION_CHECKS.labels("false_positive").inc()
+        else:
+            TOKEN_REVOCATION_CHECKS.labels("unsynced").inc()
+        return revoked
+
+    async def rebuild(self) -> None:
+        """Replace the filter by one of the revocations in Redis, dropping the
+        expired ones"""
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        prefix = len(self._make_key(""))
+        async for key in self._redis.scan_iter(match=self._make_key("*"), count=1000):
+            bloom.add(key[prefix:])
+        if bloom.count > self.capacity:
+            logger.warning(
+                "Revoked tokens over the filter capacity",
+                count=bloom.count,
+                capacity=self.capacity,
+            )
+        self._filter = bloom
+        REVOKED_TOKENS.set(bloom.count)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._sync())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.synced = False
+
+    async def _sync(self) -> None:
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    # subscribed before the scan, no revocation falls in between
+                    await pubsub.subscribe(self.channel)
+                    await self._follow(pubsub)
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:  # noqa: BLE001
+                if self.synced:
+                    logger.warning("Token revocations out of sync", error=repr(ex))
+                self.synced = False
+                await asyncio.sleep(self.retry_interval)
+
+    async def _follow(self, pubsub: Any) -> None:
+        rebuilt = 0.0
+        while True:
+            if time.monotonic() - rebuilt >= self.rebuild_interval:
+                # revocations published meanwhile wait in the subscription
+                await self.rebuild()
+                rebuilt = time.monotonic()
+                self.synced = True
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=self.retry_interval
+            )
+            if message is not None and message["type"] == "message":
+                self._filter.add(message["data"])
+                REVOKED_TOKENS.set(self._filter.count)
+
+    async def _call(
+        self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any
+    ) -> T:
+        if self.breaker is None:
+            return await func(*args, **kwargs)
+        return await self.breaker.call(func, *args, **kwargs)
+
+    def _make_key(self, jti: str) -> str:
+        return f"{self.namespace}:{jti}"
@@ -0,0 +1,18 @@
+from litestar.handlers import BaseRouteHandler
+from litestar.types import Scope
+
+_route_paths: dict[BaseRouteHandler, str] = {}
+
+
+def get_route_path(scope: Scope) -> str:
+    """Return the route template (e.g. ``/api/users/{user_id:int}``) of a request.
+
+    Used as a low-cardinality label, the raw path would create one series per id.
+    """
+    route_handler = scope["route_handler"]
+    if route_handler not in _route_paths:
+        routes = scope["app"].asgi_router.route_mapping.get(
+            route_handler.name or str(route_handler)
+        )
+        _route_paths[route_handler] = routes[0].path if routes else scope["path"]
+    return _route_paths[route_handler]
@@ -0,0 +1,36 @@
+from .engine import LazySQLAlchemyAsyncConfig
+from .plugin import (
+    QueryStatsConfig,
+    QueryStatsPlugin,
+    ReadReplicaConfig,
+    ReadReplicaPlugin,
+)
+from .replicas import (
+    ROUTER_INFO_KEY,
+    ReadRoute,
+    ReplicaRouter,
+    RoutingSession,
+    current_read_route,
+    use_replica,
+)
+from .stats import QueryStats, current_query_stats, instrument_engine
+from .testing import QueryBudgetExceededError, query_budget
+
+__all__ = [
+    "LazySQLAlchemyAsyncConfig",
+    "QueryStatsConfig",
+    "QueryStatsPlugin",
+    "QueryStats",
+    "current_query_stats",
+    "instrument_engine",
+    "QueryBudgetExceededError",
+    "query_budget",
+    "ReadReplicaConfig",
+    "ReadReplicaPlugin",
+    "ReadRoute",
+    "ReplicaRouter",
+    "RoutingSession",
+    "ROUTER_INFO_KEY",
+    "current_read_route",
+    "use_replica",
+]
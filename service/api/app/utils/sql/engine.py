@@ -0,0 +1,16 @@
+from litestar.plugins.sqlalchemy import SQLAlchemyAsyncConfig
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class LazySQLAlchemyAsyncConfig(SQLAlchemyAsyncConfig):
+    """``SQLAlchemyAsyncConfig`` creating its engine from ``connection_string``
+    on first use, then keeping it.
+
+    The base class creates a new engine (and pool) on every ``get_engine`` call
+    when it isn't given an ``engine_instance``.
+    """
+
+    def get_engine(self) -> AsyncEngine:
+        if self.engine_instance is None:
+            self.engine_instance = super().get_engine()
+        return self.engine_instance
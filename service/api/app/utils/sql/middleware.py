@@ -0,0 +1,155 @@
+import time
+from typing import TYPE_CHECKING, Any, Optional
+
+import structlog
+from litestar.connection import ASGIConnection
+from litestar.datastructures import Cookie, MutableScopeHeaders
+from litestar.middleware import AbstractMiddleware
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.routing import get_route_path
+
+from .replicas import ReadRoute, current_read_route
+from .stats import QueryStats, current_query_stats
+from .testing import QueryBudgetExceededError
+
+if TYPE_CHECKING:
+    from .plugin import QueryStatsConfig, ReadReplicaConfig
+
+logger = structlog.get_logger()
+
+
+class QueryStatsMiddleware(AbstractMiddleware):
+    """Collects the queries of a request into ``Server-Timing`` and the logs.
+
+    Route handlers declare their budget with ``opt={"query_budget": n}``. Going
+    over it is logged, and fails the request when ``enforce_budgets`` is on
+    (tests), so N+1 regressions can't slip through.
+    """
+
+    def __init__(self, app: ASGIApp, config: "QueryStatsConfig") -> None:
+        super().__init__(app=app, scopes={"http"})
+        self.config = config
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        stats = QueryStats(parent=current_query_stats.get())
+        token = current_query_stats.set(stats)
+
+        checked = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal checked
+            if message["type"] == "http.response.start":
+                if not checked:
+                    checked = True
+                    self.check_budget(scope, stats)
+                if self.config.server_timing:
+                    # the response cache keeps a reference to the original message
+                    message = {**message, "headers": list(message.get("headers", ()))}
+                    MutableScopeHeaders.from_message(message).add(
+                        "Server-Timing", self.server_timing(stats)
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_query_stats.reset(token)
+            if stats.count:
+                logger.info(
+                    self.config.log_event,
+                    path=get_route_path(scope),
+                    queries=stats.count,
+                    db_ms=round(stats.duration * 1000, 3),
+                    slowest_ms=round(stats.slowest_duration * 1000, 3),
+                    slowest_statement=stats.slowest_statement[
+                        : self.config.max_statement_length
+                    ],
+                )
+
+    def check_budget(self, scope: Scope, stats: QueryStats) -> None:
+        budget = scope["route_handler"].opt.get("query_budget")
+        if budget is None or stats.count <= budget:
+            return
+
+        path = get_route_path(scope)
+        logger.warning(
+            "Query budget exceeded", path=path, queries=stats.count, budget=budget
+        )
+        if self.config.enforce_budgets:
+            raise QueryBudgetExceededError(
+                f"{path} issued {stats.count} queries (budget: {budget})"
+            )
+
+    @staticmethod
+    def server_timing(stats: QueryStats) -> str:
+        return (
+            f'db;dur={stats.duration * 1000:.3f};desc="{stats.count} queries", '
+            f"db-slowest;dur={stats.slowest_duration * 1000:.3f}"
+        )
+
+
+SAFE_METHODS = frozenset({"GET", "HEAD"})
+
+
+class ReadReplicaMiddleware(AbstractMiddleware):
+    """Routes the reads of ``GET``/``HEAD`` requests to a replica.
+
+    A request that wrote to the primary answers with a short-lived
+    read-your-writes token, as a cookie and a header. While a client sends it
+    back its reads stay on the primary. Handlers opt out of replicas with
+    ``opt={"read_replica": False}``.
+    """
+
+    def __init__(self, app: ASGIApp, config: "ReadReplicaConfig") -> None:
+        super().__init__(app=app, scopes={"http"})
+        self.config = config
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        pinned = self.is_pinned(scope)
+        route = ReadRoute(
+            replica=not pinned
+            and scope["method"] in SAFE_METHODS
+            and scope["route_handler"].opt.get("read_replica", True),
+            pinned=pinned,
+        )
+        token = current_read_route.set(route)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and route.wrote:
+                message = {**message, "headers": list(message.get("headers", ()))}
+                self.add_token(MutableScopeHeaders.from_message(message))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_read_route.reset(token)
+
+    def is_pinned(self, scope: Scope) -> bool:
+        connection = ASGIConnection[Any, Any, Any, Any](scope)
+        value: Optional[str] = connection.headers.get(
+            self.config.header
+        ) or connection.cookies.get(self.config.cookie)
+        if not value:
+            return False
+        try:
+            until = int(value)
+        except ValueError:
+            return False
+        # the token is client controlled, never honour more than one window
+        now = time.time()
+        return now < until <= now + self.config.read_your_writes_window
+
+    def add_token(self, headers: MutableScopeHeaders) -> None:
+        window = self.config.read_your_writes_window
+        until = str(int(time.time()) + window)
+        headers.add(self.config.header, until)
+        cookie = Cookie(
+            key=self.config.cookie,
+            value=until,
+            max_age=window,
+            httponly=True,
+            samesite="lax",
+        )
+        headers.add("set-cookie", cookie.to_header(header=""))
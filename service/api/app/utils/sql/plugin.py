@@ -0,0 +1,74 @@
+from dataclasses import dataclass
+from typing import Callable, Sequence
+
+from litestar.config.app import AppConfig
+from litestar.middleware.base import DefineMiddleware
+from litestar.plugins import InitPluginProtocol
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .middleware import QueryStatsMiddleware, ReadReplicaMiddleware
+from .replicas import ReplicaRouter
+from .stats import instrument_engine
+
+
+@dataclass(kw_only=True, frozen=True)
+class QueryStatsConfig:
+    engines: Callable[[], Sequence[AsyncEngine]]
+    """Engines to instrument, called on startup so they can be created lazily"""
+    enabled: bool = True
+    server_timing: bool = True
+    enforce_budgets: bool = False
+    """Fail requests going over their ``query_budget`` opt, meant for tests"""
+    log_event: str = "SQL"
+    max_statement_length: int = 500
+
+
+class QueryStatsPlugin(InitPluginProtocol):
+    def __init__(self, config: QueryStatsConfig) -> None:
+        self._config = config
+
+    def on_app_init(self, app_config: AppConfig) -> AppConfig:
+        if not self._config.enabled:
+            return app_config
+
+        app_config.middleware.insert(
+            0, DefineMiddleware(QueryStatsMiddleware, config=self._config)
+        )
+        app_config.on_startup.append(self.instrument_engines)
+        return app_config
+
+    def instrument_engines(self) -> None:
+        for engine in self._config.engines():
+            instrument_engine(engine)
+
+
+@dataclass(kw_only=True, frozen=True)
+class ReadReplicaConfig:
+    router: ReplicaRouter
+    read_your_writes_window: int = 5
+    """Seconds a client keeps reading from the primary after it wrote"""
+    cookie: str = "read_primary_until"
+    header: str = "X-Read-Primary-Until"
+
+
+class ReadReplicaPlugin(InitPluginProtocol):
+    """Reads of safe requests go to the replicas of ``router``.
+
+    The sessions must be :class:`RoutingSession` with the router in their
+    ``info``, without replicas the plugin does nothing.
+    """
+
+    def __init__(self, config: ReadReplicaConfig) -> None:
+        self._config = config
+
+    def on_app_init(self, app_config: AppConfig) -> AppConfig:
+        router = self._config.router
+        if not router.enabled:
+            return app_config
+
+        app_config.middleware.insert(
+            0, DefineMiddleware(ReadReplicaMiddleware, config=self._config)
+        )
+        app_config.on_startup.append(router.start)
+        app_config.on_shutdown.append(router.stop)
+        return app_config
@@ -0,0 +1,210 @@
+import asyncio
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Iterator, Literal, Mapping, Optional, Sequence, Union
+
+import structlog
+from sqlalchemy import Select, StatementLambdaElement, text
+from sqlalchemy.engine import URL, Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ClauseElement
+
+logger = structlog.get_logger()
+
+ROUTER_INFO_KEY = "replica_router"
+"""``Session.info`` key holding the :class:`ReplicaRouter` of a session"""
+
+REPLICATION_LAG = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery()"
+    " OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())"
+    " END"
+)
+"""Seconds the server is behind its primary, 0 when caught up or not a standby"""
+
+
+@dataclass
+class ReadRoute:
+    """Where the current request may read from, see :class:`RoutingSession`"""
+
+    replica: bool = False
+    pinned: bool = False
+    """Read-your-writes: the client wrote recently, stay on the primary"""
+    wrote: bool = False
+    engine: Optional[Engine] = None
+    """Replica picked for the request, every read of a request uses the same one"""
+
+
+current_read_route: ContextVar[Optional[ReadRoute]] = ContextVar(
+    "current_read_route", default=None
+)
+
+
+@contextmanager
+def use_replica() -> Iterator[None]:
+    """Let reads of the block go to a replica, unless the request is pinned"""
+    route = current_read_route.get()
+    if route is None or route.replica or route.pinned:
+        yield
+        return
+
+    route.replica = True
+    try:
+        yield
+    finally:
+        route.replica = False
+
+
+class ReplicaRouter:
+    """Picks the replica for a read, skipping replicas lagging past ``max_lag``.
+
+    Replicas given as URLs get an engine created with ``engine_options`` on
+    first use. Lag is polled by a background task between ``start`` and
+    ``stop``, when no replica is usable reads fall back to the primary.
+    """
+
+    def __init__(
+        self,
+        replicas: Sequence[Union[str, URL, AsyncEngine]],
+        *,
+        engine_options: Optional[Mapping[str, Any]] = None,
+        selection: Literal["round_robin", "least_busy"] = "round_robin",
+        max_lag: float = 5.0,
+        check_interval: float = 2.0,
+    ) -> None:
+        self.engine_options = dict(engine_options or {})
+        self.selection = selection
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag: dict[AsyncEngine, Optional[float]] = {}
+        """Last measured lag per replica, ``None`` when it couldn't be reached"""
+        self._replicas = list(replicas)
+        self._engines: Optional[list[AsyncEngine]] = None
+        self._available: list[Engine] = []
+        self._turn = itertools.count()
+        self._task: Optional[asyncio.Task[None]] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._replicas)
+
+    @property
+    def replicas(self) -> list[AsyncEngine]:
+        if self._engines is None:
+            self._engines = self._create_engines()
+        return self._engines
+
+    def _create_engines(self) -> list[AsyncEngine]:
+        engines = [
+            replica
+            if isinstance(replica, AsyncEngine)
+            else create_async_engine(replica, **self.engine_options)
+            for replica in self._replicas
+        ]
+        self.lag = dict.fromkeys(engines, 0.0)
+        self._available = [engine.sync_engine for engine in engines]
+        return engines
+
+    def choose(self) -> Optional[Engine]:
+        if self._engines is None:
+            self._engines = self._create_engines()
+        available = self._available
+        if not available:
+            return None
+
+        start = next(self._turn) % len(available)
+        if self.selection == "round_robin":
+            return available[start]
+        # rotating the candidates spreads ties over the replicas
+        candidates = available[start:] + available[:start]
+        return min(candidates, key=lambda engine: engine.pool.checkedout())
+
+    async def check(self) -> None:
+        for engine in self.replicas:
+            lag = await self._measure(engine)
+            healthy = lag is not None and lag <= self.max_lag
+            previous = self.lag[engine]
+            if healthy != (previous is not None and previous <= self.max_lag):
+                log = logger.info if healthy else logger.warning
+                log(
+                    "Replica available" if healthy else "Replica skipped",
+                    replica=engine.url.render_as_string(hide_password=True),
+                    lag=lag,
+                    max_lag=self.max_lag,
+                )
+            self.lag[engine] = lag
+
+        self._available = [
+            engine.sync_engine
+            for engine, lag in self.lag.items()
+            if lag is not None and lag <= self.max_lag
+        ]
+
+    async def _measure(self, engine: AsyncEngine) -> Optional[float]:
+        try:
+            async with engine.connect() as conn:
+                lag = await asyncio.wait_for(
+                    conn.scalar(REPLICATION_LAG), timeout=self.check_interval
+                )
+        except Exception:  # noqa: BLE001
+            if self.lag[engine] is not None:
+                logger.warning(
+                    "Replica lag check failed",
+                    replica=engine.url.render_as_string(hide_password=True),
+                    exc_info=True,
+                )
+            return None
+        return float(lag or 0)
+
+    async def _monitor(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            await self.check()
+
+    async def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        await self.check()
+        self._task = asyncio.create_task(self._monitor())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for engine in self._engines or ():
+            await engine.dispose()
+
+
+def _is_read(clause: Optional[ClauseElement]) -> bool:
+    if isinstance(clause, StatementLambdaElement):
+        # advanced-alchemy repositories execute lambda statements
+        clause = clause._resolved
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+class RoutingSession(Session):
+    """``Session`` sending reads to a replica while the :class:`ReadRoute` allows.
+
+    Flushes, DML, ``FOR UPDATE`` and textual statements always go to the
+    primary (the session's own bind), flushes and DML also mark the request as
+    having written.
+    """
+
+    def get_bind(
+        self, mapper: Any = None, *, clause: Optional[ClauseElement] = None, **kw: Any
+    ) -> Union[Engine, Connection]:
+        route = current_read_route.get()
+        if route is not None:
+            if self._flushing or (clause is not None and clause.is_dml):
+                route.wrote = True
+            elif route.replica and _is_read(clause):
+                router: Optional[ReplicaRouter] = self.info.get(ROUTER_INFO_KEY)
+                if route.engine is None and router is not None:
+                    route.engine = router.choose()
+                if route.engine is not None:
+                    return route.engine
+        return super().get_bind(mapper, clause=clause, **kw)
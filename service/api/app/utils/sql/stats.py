@@ -0,0 +1,96 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, ExceptionContext, ExecutionContext
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+_QUERY_START_ATTRIBUTE = "_query_stats_start"
+
+
+@dataclass
+class QueryStats:
+    """Queries issued while the stats object is current.
+
+    Stats nest: a request records into its own object and every parent (e.g. a
+    :func:`query_budget` around a test client call) sees the same queries.
+    """
+
+    parent: Optional["QueryStats"] = None
+    count: int = 0
+    duration: float = 0.0
+    slowest_duration: float = 0.0
+    slowest_statement: Optional[str] = None
+    statements: list[str] = field(default_factory=list)
+    keep_statements: bool = False
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        if duration >= self.slowest_duration:
+            self.slowest_duration = duration
+            self.slowest_statement = statement
+        if self.keep_statements:
+            self.statements.append(statement)
+        if self.parent is not None:
+            self.parent.record(statement, duration)
+
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+def _before_cursor_execute(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: ExecutionContext,
+    executemany: bool,
+) -> None:
+    # on the statement's own context, nothing outlives a failed statement
+    setattr(context, _QUERY_START_ATTRIBUTE, time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: ExecutionContext,
+    executemany: bool,
+) -> None:
+    _record(statement, context)
+
+
+def _handle_error(exception_context: ExceptionContext) -> None:
+    """Failed statements count too, ``after_cursor_execute`` skips them"""
+    context = exception_context.execution_context
+    if context is not None and exception_context.statement is not None:
+        _record(exception_context.statement, context)
+
+
+def _record(statement: str, context: ExecutionContext) -> None:
+    # popped, an error raised after the statement ran doesn't count it twice
+    started = vars(context).pop(_QUERY_START_ATTRIBUTE, None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    # session bookkeeping such as the deadline's SET LOCAL opts out
+    if context.execution_options.get("query_stats") is False:
+        return
+    if (stats := current_query_stats.get()) is not None:
+        stats.record(statement, duration)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Record every statement of ``engine`` into the current :class:`QueryStats`"""
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
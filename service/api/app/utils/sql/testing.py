@@ -0,0 +1,42 @@
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from .stats import QueryStats, current_query_stats
+
+
+class QueryBudgetExceededError(AssertionError):
+    """More queries were issued than the budget allows"""
+
+
+@contextmanager
+def query_budget(
+    max_queries: int, *, max_duration: Optional[float] = None, label: str = ""
+) -> Iterator[QueryStats]:
+    """Fail when the block issues more than ``max_queries`` statements.
+
+    Wrap a service call or a request made through an in-process client
+    (``AsyncTestClient`` / ``httpx.ASGITransport``), the request's own stats
+    report to this one::
+
+        with query_budget(3, label="GET /api/users/{id}"):
+            await client.get("/api/users/1", headers=auth_headers)
+
+    Raises:
+        QueryBudgetExceededError: with every issued statement, to spot the N+1.
+    """
+    stats = QueryStats(parent=current_query_stats.get(), keep_statements=True)
+    token = current_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_query_stats.reset(token)
+
+    over_duration = max_duration is not None and stats.duration > max_duration
+    if stats.count > max_queries or over_duration:
+        statements = "\n".join(f"  {i}. {s}" for i, s in enumerate(stats.statements, 1))
+        raise QueryBudgetExceededError(
+            f"{label or 'block'} issued {stats.count} queries "
+            f"in {stats.duration * 1000:.1f}ms (budget: {max_queries} queries"
+            + (f", {max_duration * 1000:.1f}ms" if max_duration is not None else "")
+            + f"):\n{statements}"
+        )
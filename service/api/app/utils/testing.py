@@ -0,0 +1,27 @@
+import os
+import sys
+
+TEST_SETTINGS = {"TEST_POSTGRES_DB": "POSTGRES_DB", "TEST_REDIS_URL": "REDIS_URL"}
+"""Variable naming each service the suites may wipe -> setting it replaces"""
+
+
+def use_test_services() -> None:
+    """Point the settings at the database and Redis of ``TEST_POSTGRES_DB``
+    and ``TEST_REDIS_URL``, the tests and the e2e benchmark drop and flush
+    them. The ones of ``.env`` are the development server's and never used.
+
+    Call it before ``app.core`` is imported, the settings are read then.
+
+    Raises:
+        RuntimeError: when a variable is missing or the settings were read.
+    """
+    if "app.core.config" in sys.modules:
+        raise RuntimeError("use_test_services() must run before app.core is imported")
+    missing = [name for name in TEST_SETTINGS if not os.environ.get(name)]
+    if missing:
+        raise RuntimeError(
+            f"Set {' and '.join(missing)} to a database and a Redis that may be "
+            "wiped, the ones of .env are never used"
+        )
+    for test_name, name in TEST_SETTINGS.items():
+        os.environ[name] = os.environ[test_name]
@@ -0,0 +1,71 @@
+"""Compare two saved benchmark runs.
+
+    python -m benchmarks.compare results/e2e-old.json results/e2e-new.json
+
+Prints the relative change of every result both runs have in common, with a
+positive change always meaning faster.
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Any
+
+THROUGHPUTS = ("throughput_rps", "ops_per_sec")
+LATENCIES = ("p50", "p95", "p99")
+
+
+def result_key(result: dict[str, Any]) -> str:
+    if "concurrency" in result:
+        return f"{result['scenario']}@c{result['concurrency']}"
+    return result["scenario"]
+
+
+def load(path: Path) -> dict[str, dict[str, Any]]:
+    payload = json.loads(path.read_text())
+    return {result_key(result): result for result in payload["results"]}
+
+
+def change(old: float, new: float, *, higher_is_better: bool) -> str:
+    if not old:
+        return "n/a"
+    delta = (new - old) / old * 100
+    return f"{delta if higher_is_better else -delta:+.1f}%"
+
+
+def compare(old: dict[str, Any], new: dict[str, Any]) -> list[str]:
+    columns = []
+    for throughput in THROUGHPUTS:
+        if throughput in old:
+            columns.append(
+                f"{throughput} "
+                + change(old[throughput], new[throughput], higher_is_better=True)
+            )
+    latency = next(key for key in old if key.startswith("latency_"))
+    for name in LATENCIES:
+        columns.append(
+            f"{name} "
+            + change(
+                old[latency].get(name, 0),
+                new[latency].get(name, 0),
+                higher_is_better=False,
+            )
+        )
+    return columns
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("old", type=Path)
+    parser.add_argument("new", type=Path)
+    args = parser.parse_args()
+
+    old, new = load(args.old), load(args.new)
+    for key in sorted(old.keys() & new.keys()):
+        print(f"{key:<32} " + "  ".join(compare(old[key], new[key])))  # noqa: T201
+    for key in sorted(old.keys() ^ new.keys()):
+        print(f"{key:<32} only in {'old' if key in old else 'new'} run")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
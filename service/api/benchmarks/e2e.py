@@ -0,0 +1,335 @@
+"""End-to-end load benchmark.
+
+Boots ``create_app()`` against the Postgres database and the Redis named by
+``TEST_POSTGRES_DB`` and ``TEST_REDIS_URL`` (the RabbitMQ plugin is swapped
+for an in-process fake) and drives the main endpoints at fixed concurrency
+levels::
+
+    TEST_POSTGRES_DB=api_test TEST_REDIS_URL=redis://localhost:6379/15 \
+        python -m benchmarks.e2e --concurrency 1 10 50 --requests 500
+
+The database schema is dropped and recreated for every run, like the tests it
+refuses to run on the database and Redis of ``.env``.
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+from unittest import mock
+
+from app.utils.testing import use_test_services
+
+try:
+    use_test_services()
+except RuntimeError as ex:
+    sys.exit(str(ex))
+
+# request logs would dominate the measurements, keep only warnings
+os.environ.setdefault("LEVEL", "30")
+os.environ.setdefault("SQLALCHEMY_LEVEL", "30")
+# every simulated client shares one address, the auth rate limits would reject them
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+# fixed concurrency levels are the point, shed requests would read as errors
+os.environ.setdefault("CONCURRENCY_LIMIT_ENABLED", "false")
+
+from httpx import ASGITransport, AsyncClient, Response  # noqa: E402
+from litestar import Litestar  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app.core.config import alchemy_config, get_cache_store  # noqa: E402
+from app.database.models import Base, User  # noqa: E402
+from app.lib.security.crypt import generate_hashed_password  # noqa: E402
+from app.utils.message_brokers.testing import FakeConnection  # noqa: E402
+
+from .stats import environment, summarize, write_results  # noqa: E402
+
+PASSWORD = "benchmark-password"  # noqa: S105
+ADMIN_EMAIL = "bench-admin@example.com"
+REFRESH_SESSIONS = 50
+"""Users kept away from the login scenario, their first login stores the
+refresh token the refresh scenario replays."""
+CACHED_USERS = 10
+
+
+@dataclass
+class Context:
+    client: AsyncClient
+    users: list[tuple[int, str]]
+    refresh_users: list[tuple[int, str]]
+    auth: dict[str, str] = field(default_factory=dict)
+    refresh_sessions: list[dict[str, str]] = field(default_factory=list)
+    sequence: itertools.count = field(default_factory=itertools.count)
+
+    def user(self, n: int, pool: int | None = None) -> tuple[int, str]:
+        return self.users[n % (pool or len(self.users))]
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    request: Callable[[Context, int], Awaitable[Response]]
+    expected: frozenset[int] = frozenset({200})
+    prepare: Callable[[Context], Awaitable[None]] | None = None
+
+
+async def register(ctx: Context, n: int) -> Response:
+    return await ctx.client.post(
+        "/api/auth/register",
+        json={"email": f"bench-register-{n}@example.com", "password": PASSWORD},
+    )
+
+
+async def login(ctx: Context, n: int) -> Response:
+    _, email = ctx.user(n)
+    return await ctx.client.post(
+        "/api/auth/login", data={"username": email, "password": PASSWORD}
+    )
+
+
+async def prepare_refresh(ctx: Context) -> None:
+    for _, email in ctx.refresh_users:
+        response = await ctx.client.post(
+            "/api/auth/login", data={"username": email, "password": PASSWORD}
+        )
+        ctx.refresh_sessions.append(
+            {
+                "Authorization": response.headers["authorization"],
+                "Cookie": f"refresh_token={response.cookies['refresh_token']}",
+            }
+        )
+    # the jar would override the per-session cookie headers
+    ctx.client.cookies.clear()
+
+
+async def refresh(ctx: Context, n: int) -> Response:
+    headers = ctx.refresh_sessions[n % len(ctx.refresh_sessions)]
+    return await ctx.client.post("/api/auth/refresh/access-token", headers=headers)
+
+
+async def get_user_uncached(ctx: Context, n: int) -> Response:
+    user_id, _ = ctx.user(n)
+    # a unique query string makes every request a cache miss
+    return await ctx.client.get(
+        f"/api/users/{user_id}", params={"run": n}, headers=ctx.auth
+    )
+
+
+async def prepare_cached(ctx: Context) -> None:
+    for n in range(CACHED_USERS):
+        await get_user_cached(ctx, n)
+
+
+async def get_user_cached(ctx: Context, n: int) -> Response:
+    user_id, _ = ctx.user(n, pool=CACHED_USERS)
+    return await ctx.client.get(f"/api/users/{user_id}", headers=ctx.auth)
+
+
+async def list_users(ctx: Context, n: int) -> Response:
+    return await ctx.client.get(
+        "/api/users",
+        params={
+            "limit": 20,
+            "offset": n % 5 + 1,
+            "orderBy": "created_at",
+            "sortOrder": "desc",
+            "searchField": "email",
+            "searchString": "bench-user",
+            "searchIgnoreCase": "true",
+            "createdAfter": "2000-01-01T00:00:00Z",
+        },
+        headers=ctx.auth,
+    )
+
+
+async def patch_user(ctx: Context, n: int) -> Response:
+    user_id, _ = ctx.user(n)
+    return await ctx.client.patch(
+        f"/api/users/{user_id}", json={"is_activated": n % 2 == 0}, headers=ctx.auth
+    )
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (
+        Scenario("register", register, expected=frozenset({201})),
+        Scenario("login", login, expected=frozenset({201})),
+        Scenario("refresh", refresh, prepare=prepare_refresh),
+        Scenario("get_user_uncached", get_user_uncached),
+        Scenario("get_user_cached", get_user_cached, prepare=prepare_cached),
+        Scenario("list_users", list_users),
+        Scenario("patch_user", patch_user),
+    )
+}
+
+
+async def reset_database(seed_users: int) -> list[tuple[int, str]]:
+    """Recreate the schema and insert the users every scenario works on"""
+    hashed_password = generate_hashed_password(password=PASSWORD)
+    emails = [ADMIN_EMAIL] + [
+        f"bench-user-{i}@example.com" for i in range(seed_users + REFRESH_SESSIONS)
+    ]
+    rows = [
+        {
+            "email": email,
+            "hashed_password": hashed_password,
+            "is_superuser": email == ADMIN_EMAIL,
+        }
+        for email in emails
+    ]
+
+    async with alchemy_config.get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        result = await conn.execute(insert(User).returning(User.id, User.email), rows)
+        users = list(result.tuples())
+
+    await get_cache_store().delete_all()
+    return users[1:]
+
+
+def create_benchmark_app(connection: FakeConnection) -> Litestar:
+    from app.main import create_app
+    from app.server import builder
+    from app.utils.message_brokers import RabbitMQConfig, RabbitMQPlugin
+
+    plugin = RabbitMQPlugin(config=RabbitMQConfig(connection=connection))
+    with mock.patch.object(builder, "rabbitmq_plugin", plugin):
+        return create_app()
+
+
+async def run_level(
+    ctx: Context, scenario: Scenario, concurrency: int, requests: int, warmup: int
+) -> dict[str, Any]:
+    latencies: list[float] = []
+    statuses: Counter[str] = Counter()
+
+    async def worker(jobs: range, record: bool) -> None:
+        for _ in jobs:
+            n = next(ctx.sequence)
+            started = time.perf_counter()
+            try:
+                response = await scenario.request(ctx, n)
+            except Exception as ex:  # noqa: BLE001
+                statuses[type(ex).__name__] += 1
+                continue
+            elapsed = time.perf_counter() - started
+            if not record:
+                continue
+            statuses[str(response.status_code)] += 1
+            if response.status_code in scenario.expected:
+                latencies.append(elapsed)
+
+    async def run(total: int, record: bool) -> float:
+        jobs = iter(range(total))
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(jobs, record) for _ in range(concurrency)))
+        return time.perf_counter() - started
+
+    await run(warmup, record=False)
+    duration = await run(requests, record=True)
+
+    return {
+        "scenario": scenario.name,
+        "concurrency": concurrency,
+        "requests": requests,
+        "ok": len(latencies),
+        "errors": requests - len(latencies),
+        "status_codes": dict(sorted(statuses.items())),
+        "duration_s": round(duration, 4),
+        "throughput_rps": round(len(latencies) / duration, 2) if duration else 0.0,
+        "latency_ms": summarize(latencies),
+    }
+
+
+def report(result: dict[str, Any]) -> None:
+    latency = result["latency_ms"]
+    print(  # noqa: T201
+        f"{result['scenario']:<20} c={result['concurrency']:<4} "
+        f"rps={result['throughput_rps']:>9.2f}  "
+        f"p50={latency.get('p50', 0):>8.2f}ms  p95={latency.get('p95', 0):>8.2f}ms  "
+        f"p99={latency.get('p99', 0):>8.2f}ms  errors={result['errors']}"
+    )
+
+
+async def main(args: argparse.Namespace) -> Path:
+    users = await reset_database(args.seed_users)
+    connection = FakeConnection()
+    app = create_benchmark_app(connection)
+
+    results = []
+    # litestar's test client serializes requests through a blocking portal, an
+    # ASGI transport keeps them concurrent on this loop
+    transport = ASGITransport(app=app)  # type: ignore[arg-type]
+    async with (
+        app.lifespan(),
+        AsyncClient(transport=transport, base_url="http://benchmark") as client,
+    ):
+        ctx = Context(
+            client=client,
+            users=users[:-REFRESH_SESSIONS],
+            refresh_users=users[-REFRESH_SESSIONS:],
+        )
+        response = await client.post(
+            "/api/auth/login", data={"username": ADMIN_EMAIL, "password": PASSWORD}
+        )
+        ctx.auth = {"Authorization": response.headers["authorization"]}
+
+        for name in args.scenarios:
+            scenario = SCENARIOS[name]
+            if scenario.prepare is not None:
+                await scenario.prepare(ctx)
+            for concurrency in args.concurrency:
+                result = await run_level(
+                    ctx, scenario, concurrency, args.requests, args.warmup
+                )
+                report(result)
+                results.append(result)
+
+    await get_cache_store().delete_all()
+
+    return write_results(
+        "e2e",
+        {
+            "benchmark": "e2e",
+            "environment": environment(),
+            "config": {
+                "requests": args.requests,
+                "warmup": args.warmup,
+                "seed_users": args.seed_users,
+                "concurrency": args.concurrency,
+            },
+            "published_messages": len(connection.published),
+            "results": results,
+        },
+        args.output,
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 10, 50])
+    parser.add_argument(
+        "--requests", type=int, default=200, help="measured requests per level"
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=20, help="unmeasured requests per level"
+    )
+    parser.add_argument("--seed-users", type=int, default=200)
+    parser.add_argument("--output", type=Path, default=None)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    path = asyncio.run(main(parse_args()))
+    print(f"results saved to {path}")  # noqa: T201
@@ -0,0 +1,137 @@
+"""Import-time budget of ``create_app()``.
+
+Starts a fresh interpreter per run, imports ``app.main`` and calls
+``create_app()``, the same work a new worker does before it can serve. Fails
+when the median run uses more than ``--budget`` ms of CPU, or when a module
+meant to load on first use (see ``LAZY_MODULES``) was imported. CPU time is
+what the budget is checked against, wall time swings with the load of the
+machine::
+
+    python -m benchmarks.importtime
+    python -m benchmarks.importtime --budget 1500 --repeat 10 --top 25
+
+One extra run under ``python -X importtime`` gives the per-package breakdown.
+The settings have to load, use the same environment as the app.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Any
+
+from .stats import environment, summarize, write_results
+
+ROOT = Path(__file__).parent.parent
+
+DEFAULT_BUDGET_MS = 1800.0
+
+LAZY_MODULES = ("passlib", "aio_pika", "aiormq", "pamqp", "email_validator")
+"""Loaded on first use or in the lifespan, never by ``create_app()``"""
+
+STARTUP = f"""
+import json, sys, time
+started, cpu_started = time.perf_counter(), time.process_time()
+from app.main import create_app
+create_app()
+elapsed, cpu = time.perf_counter() - started, time.process_time() - cpu_started
+lazy = {LAZY_MODULES!r}
+print(json.dumps({{
+    "elapsed": elapsed,
+    "cpu": cpu,
+    "loaded": sorted(name for name in lazy if name in sys.modules),
+}}))
+"""
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def start(*options: str) -> tuple[dict[str, Any], str]:
+    """Run ``STARTUP`` in a new interpreter, return its report and stderr"""
+    # this interpreter with the benchmark's own flags and script
+    process = subprocess.run(
+        [sys.executable, *options, "-c", STARTUP],  # noqa: S603
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=ROOT,
+        # request and SQL logs are irrelevant here, keep only warnings
+        env={"LEVEL": "30", "SQLALCHEMY_LEVEL": "30", **os.environ},
+    )
+    return json.loads(process.stdout.strip().splitlines()[-1]), process.stderr
+
+
+def breakdown(stderr: str) -> dict[str, float]:
+    """Self import time per top-level package in ms, slowest first"""
+    packages: dict[str, float] = defaultdict(float)
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            packages[match[4].split(".")[0]] += int(match[1]) / 1000
+    return dict(
+        sorted(
+            ((name, round(ms, 3)) for name, ms in packages.items()),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=DEFAULT_BUDGET_MS,
+        help="CPU ms allowed for importing app.main and calling create_app()",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="packages to print")
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    # the first run may still have to write the bytecode caches
+    start()
+    runs = [start() for _ in range(args.repeat)]
+    elapsed = summarize(report["elapsed"] for report, _ in runs)
+    cpu = summarize(report["cpu"] for report, _ in runs)
+    loaded = sorted({name for report, _ in runs for name in report["loaded"]})
+    packages = breakdown(start("-X", "importtime")[1])
+
+    for name, ms in list(packages.items())[: args.top]:
+        print(f"{name:<30} {ms:>10.3f}ms")  # noqa: T201
+    print(  # noqa: T201
+        f"create_app() cpu p50={cpu['p50']:.3f}ms min={cpu['min']:.3f}ms, "
+        f"wall p50={elapsed['p50']:.3f}ms, budget={args.budget:.0f}ms"
+    )
+
+    path = write_results(
+        "importtime",
+        {
+            "benchmark": "importtime",
+            "environment": environment(),
+            "config": {"budget_ms": args.budget, "repeat": args.repeat},
+            "elapsed_ms": elapsed,
+            "cpu_ms": cpu,
+            "eagerly_loaded": loaded,
+            "packages_ms": packages,
+        },
+        args.output,
+    )
+    print(f"results saved to {path}")  # noqa: T201
+
+    failures = []
+    if cpu["p50"] > args.budget:
+        failures.append(f"create_app() used {cpu['p50']:.0f}ms of CPU")
+    if loaded:
+        failures.append(f"imported at startup: {', '.join(loaded)}")
+    if failures:
+        raise SystemExit("import-time budget exceeded, " + "; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+"""Hot-path microbenchmarks.
+
+Times the security helpers, JWT handling, collection filter providers, user
+schemas/serialization and the JSON/MessagePack payloads in isolation, no
+database or broker needed (the settings still have to load, use the same
+environment as the app)::
+
+    python -m benchmarks.micro
+    python -m benchmarks.micro --filter jwt --repeat 20
+
+Every benchmark is auto-calibrated like ``timeit``, results are per call.
+"""
+
+import argparse
+import fnmatch
+import statistics
+import timeit
+from collections.abc import Callable
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import msgspec
+from advanced_alchemy.service import OffsetPagination
+from litestar import MediaType
+from litestar.security.jwt import Token
+from litestar.serialization import encode_json
+from litestar.testing import RequestFactory
+from litestar.typing import FieldDefinition
+from pydantic import TypeAdapter
+from sqlalchemy.engine.result import IteratorResult, SimpleResultMetaData
+
+from app.database.models import User
+from app.domain.guards import o2auth, token_verifier
+from app.domain.schemas import (
+    PydanticUser,
+    PydanticUserCreate,
+    StructUserOutput,
+    UserOutputDTO,
+    user_output_type,
+)
+from app.lib.dependencies import (
+    provide_created_filter,
+    provide_filter_dependencies,
+    provide_id_filter,
+    provide_limit_offset_filter,
+    provide_order_by,
+    provide_search_filter,
+    provide_updated_filter,
+)
+from app.lib.negotiation import MSGPACK, NegotiatedResponse
+from app.lib.schemas import BaseStructModel
+from app.lib.security.crypt import generate_hashed_password, verify_password
+from app.lib.security.jwt import decode_jwt_token, encode_jwt_token
+from app.lib.security.tokens import TokenVerifier
+from app.lib.serialization import encode_json as encode_struct_json
+from app.lib.serialization import to_struct, to_structs
+from app.utils.revocation import BloomFilter
+
+from .stats import environment, summarize, write_results
+
+PASSWORD = "benchmark-password"  # noqa: S105
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+PAGE_SIZE = 20
+USER_CREATE = {
+    "email": "bench-user@example.com",
+    "password": PASSWORD,
+    "is_active": True,
+    "is_superuser": False,
+    "is_activated": False,
+}
+"""``create_user`` body, decoded by both the pydantic and the struct schema"""
+
+
+class StructUserCreate(BaseStructModel):
+    """Struct counterpart of ``PydanticUserCreate``, same fields and keys"""
+
+    email: str
+    password: str
+    is_active: bool = True
+    is_superuser: bool = False
+    is_activated: bool = False
+
+
+BENCHMARKS: dict[str, Callable[[], Callable[[], Any]]] = {}
+"""Name -> factory doing the setup and returning the timed callable"""
+
+COMPARISONS = [
+    ("jwt.auth_middleware_decode", "jwt.auth_middleware_cached"),
+    ("schemas.pydantic_user_create", "schemas.struct_user_create"),
+    ("serialization.dto_user", "serialization.struct_user"),
+    ("serialization.pydantic_user", "serialization.struct_user"),
+    ("serialization.dto_users_page", "serialization.struct_users_page"),
+    ("serialization.pydantic_users_page", "serialization.struct_users_page"),
+    ("serialization.struct_users_page", "serialization.struct_users_page_rows"),
+    (
+        "serialization.struct_users_page_rows",
+        "serialization.sparse_users_page_rows",
+    ),
+    ("payload.json_user", "payload.msgpack_user"),
+    ("payload.json_users_page", "payload.msgpack_users_page"),
+    ("payload.json_users_page_decode", "payload.msgpack_users_page_decode"),
+]
+
+
+def benchmark(
+    name: str,
+) -> Callable[[Callable[[], Callable[[], Any]]], Callable[[], Callable[[], Any]]]:
+    def register(
+        factory: Callable[[], Callable[[], Any]],
+    ) -> Callable[[], Callable[[], Any]]:
+        BENCHMARKS[name] = factory
+        return factory
+
+    return register
+
+
+def make_user(user_id: int = 1) -> User:
+    return User(
+        id=user_id,
+        email=f"bench-user-{user_id}@example.com",
+        hashed_password="$2b$12$" + "x" * 53,
+        is_active=True,
+        is_superuser=False,
+        is_activated=True,
+        created_at=NOW,
+        updated_at=NOW,
+    )
+
+
+@benchmark("security.generate_hashed_password")
+def bench_generate_hashed_password() -> Callable[[], Any]:
+    return lambda: generate_hashed_password(password=PASSWORD)
+
+
+@benchmark("security.verify_password")
+def bench_verify_password() -> Callable[[], Any]:
+    hashed_password = generate_hashed_password(password=PASSWORD)
+    return lambda: verify_password(PASSWORD, hashed_password)
+
+
+@benchmark("jwt.encode_jwt_token")
+def bench_encode_jwt_token() -> Callable[[], Any]:
+    return lambda: encode_jwt_token("1")
+
+
+@benchmark("jwt.decode_jwt_token")
+def bench_decode_jwt_token() -> Callable[[], Any]:
+    header = f"Bearer {encode_jwt_token('1')}"
+    return lambda: decode_jwt_token(header)
+
+
+@benchmark("jwt.auth_middleware_decode")
+def bench_auth_middleware_decode() -> Callable[[], Any]:
+    """Signature check of the ``Authorization`` header, uncached"""
+    key_ring, token = token_verifier.key_ring, o2auth.create_token(identifier="1")
+    return lambda: Token.decode(
+        encoded_token=token,
+        secret=key_ring.public_key(key_ring.signing_kid),
+        algorithm=key_ring.algorithm,
+    )
+
+
+@benchmark("jwt.auth_middleware_cached")
+def bench_auth_middleware_cached() -> Callable[[], Any]:
+    """What the auth middleware does for a token it has already seen"""
+    verifier = TokenVerifier(key_ring=token_verifier.key_ring)
+    token = o2auth.create_token(identifier="1")
+    verifier.verify(token)
+    return lambda: verifier.verify(token)
+
+
+@benchmark("jwt.revocation_filter")
+def bench_revocation_filter() -> Callable[[], Any]:
+    """Revocation check of a valid token by a full filter, no Redis lookup"""
+    bloom = BloomFilter(100_000)
+    for i in range(100_000):
+        bloom.add(f"revoked-{i}")
+    return lambda: "valid" in bloom
+
+
+def provide_filters() -> dict[str, Any]:
+    return {
+        "id_filter": provide_id_filter(ids=["1,2,3,4,5"]),
+        "created_filter": provide_created_filter(before=None, after=NOW),
+        "updated_filter": provide_updated_filter(before=NOW, after=None),
+        "limit_offset": provide_limit_offset_filter(limit=20, offset=2),
+        "search_filter": provide_search_filter(
+            field="email", search="bench", ignore_case=True
+        ),
+        "order_by": provide_order_by(field_name="created_at", sort_order="desc"),
+    }
+
+
+@benchmark("filters.providers")
+def bench_filter_providers() -> Callable[[], Any]:
+    return provide_filters
+
+
+@benchmark("filters.provide_filter_dependencies")
+def bench_provide_filter_dependencies() -> Callable[[], Any]:
+    filters = provide_filters()
+    return lambda: provide_filter_dependencies(**filters)
+
+
+@benchmark("schemas.pydantic_user_create")
+def bench_pydantic_user_create() -> Callable[[], Any]:
+    raw = encode_json(USER_CREATE)
+    return lambda: PydanticUserCreate.model_validate_json(raw)
+
+
+@benchmark("schemas.struct_user_create")
+def bench_struct_user_create() -> Callable[[], Any]:
+    raw = encode_json(USER_CREATE)
+    return lambda: msgspec.json.decode(raw, type=StructUserCreate)
+
+
+def make_page() -> list[User]:
+    return [make_user(user_id) for user_id in range(1, PAGE_SIZE + 1)]
+
+
+def make_rows(struct_type: type[msgspec.Struct] = StructUserOutput) -> list[Any]:
+    """Core rows with the output columns, as a column-projected select returns"""
+    fields = list(struct_type.__struct_fields__)
+    users = [[getattr(user, field) for field in fields] for user in make_page()]
+    return IteratorResult(SimpleResultMetaData(fields), iter(users)).all()
+
+
+def make_dto(annotation: Any) -> UserOutputDTO:
+    """``UserOutputDTO`` of a request to a handler returning ``annotation``,
+    as ``return_dto`` sets it up, without an app"""
+    handler_id = f"benchmarks.micro:{annotation}"
+    UserOutputDTO.create_for_field_definition(
+        FieldDefinition.from_annotation(annotation), handler_id
+    )
+    # the DTO only reads the handler id of the request's route handler
+    request = RequestFactory().get(
+        "/users", route_handler=SimpleNamespace(handler_id=handler_id)
+    )
+    return UserOutputDTO(request)
+
+
+@benchmark("serialization.dto_user")
+def bench_dto_user() -> Callable[[], Any]:
+    dto, user = make_dto(User), make_user()
+    return lambda: encode_json(dto.data_to_encodable_type(user))
+
+
+@benchmark("serialization.pydantic_user")
+def bench_pydantic_user() -> Callable[[], Any]:
+    user = make_user()
+    return lambda: PydanticUser.model_validate(user).model_dump_json()
+
+
+@benchmark("serialization.struct_user")
+def bench_struct_user() -> Callable[[], Any]:
+    user = make_user()
+    return lambda: encode_struct_json(to_struct(user, StructUserOutput))
+
+
+@benchmark("serialization.struct_user_row")
+def bench_struct_user_row() -> Callable[[], Any]:
+    row = make_rows()[0]
+    return lambda: encode_struct_json(to_struct(row, StructUserOutput))
+
+
+@benchmark("serialization.dto_users_page")
+def bench_dto_users_page() -> Callable[[], Any]:
+    dto, users = make_dto(list[User]), make_page()
+    return lambda: encode_json(dto.data_to_encodable_type(users))
+
+
+@benchmark("serialization.pydantic_users_page")
+def bench_pydantic_users_page() -> Callable[[], Any]:
+    """The former ``get_users`` path, ``to_schema`` into ``PydanticUser``"""
+    adapter, users = TypeAdapter(list[PydanticUser]), make_page()
+    return lambda: adapter.dump_json(adapter.validate_python(users))
+
+
+@benchmark("serialization.struct_users_page")
+def bench_struct_users_page() -> Callable[[], Any]:
+    users = make_page()
+    return lambda: encode_struct_json(to_structs(users, StructUserOutput))
+
+
+@benchmark("serialization.struct_users_page_rows")
+def bench_struct_users_page_rows() -> Callable[[], Any]:
+    rows = make_rows()
+    return lambda: encode_struct_json(to_structs(rows, StructUserOutput))
+
+
+@benchmark("serialization.sparse_users_page_rows")
+def bench_sparse_users_page_rows() -> Callable[[], Any]:
+    """``?fields=id,email``, the columns most callers need"""
+    struct_type = user_output_type(("email", "id"))
+    rows = make_rows(struct_type)
+    return lambda: encode_struct_json(to_structs(rows, struct_type))
+
+
+def make_users_page() -> OffsetPagination[StructUserOutput]:
+    """``GET /users`` response body"""
+    items = to_structs(make_rows(), StructUserOutput)
+    return OffsetPagination(items=items, limit=PAGE_SIZE, offset=1, total=1000)
+
+
+def render(content: Any, media_type: str) -> Callable[[], bytes]:
+    """Body encoding of the negotiated response, as the handlers send it"""
+    response = NegotiatedResponse(content)
+    return lambda: response.render(content, media_type)
+
+
+@benchmark("payload.json_user")
+def bench_json_user() -> Callable[[], Any]:
+    return render(to_struct(make_user(), StructUserOutput), MediaType.JSON)
+
+
+@benchmark("payload.msgpack_user")
+def bench_msgpack_user() -> Callable[[], Any]:
+    return render(to_struct(make_user(), StructUserOutput), MSGPACK)
+
+
+@benchmark("payload.json_users_page")
+def bench_json_users_page() -> Callable[[], Any]:
+    return render(make_users_page(), MediaType.JSON)
+
+
+@benchmark("payload.msgpack_users_page")
+def bench_msgpack_users_page() -> Callable[[], Any]:
+    return render(make_users_page(), MSGPACK)
+
+
+@benchmark("payload.json_users_page_decode")
+def bench_json_users_page_decode() -> Callable[[], Any]:
+    """What a client pays to read the page.
+
+    MessagePack decodes the timestamps into datetimes, JSON leaves strings.
+    """
+    raw = render(make_users_page(), MediaType.JSON)()
+    return lambda: msgspec.json.decode(raw)
+
+
+@benchmark("payload.msgpack_users_page_decode")
+def bench_msgpack_users_page_decode() -> Callable[[], Any]:
+    raw = render(make_users_page(), MSGPACK)()
+    return lambda: msgspec.msgpack.decode(raw)
+
+
+def measure(fn: Callable[[], Any], *, repeat: int, min_time: float) -> dict[str, Any]:
+    timer = timeit.Timer(fn)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+
+    per_call = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "number": number,
+        "repeat": repeat,
+        "ops_per_sec": round(1 / statistics.median(per_call), 2),
+        "latency_us": summarize(per_call, scale=1_000_000),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--filter", default="*", help="glob on benchmark names, e.g. 'jwt.*'"
+    )
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument(
+        "--min-time", type=float, default=0.05, help="seconds per repeat, at least"
+    )
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    pattern = (
+        args.filter if any(c in args.filter for c in "*?[") else f"*{args.filter}*"
+    )
+    results = []
+    for name, factory in BENCHMARKS.items():
+        if not fnmatch.fnmatch(name, pattern):
+            continue
+        result = {
+            "scenario": name,
+            **measure(factory(), repeat=args.repeat, min_time=args.min_time),
+        }
+        latency = result["latency_us"]
+        print(  # noqa: T201
+            f"{name:<40} {result['ops_per_sec']:>14.2f} ops/s  "
+            f"p50={latency['p50']:>12.3f}us  stdev={latency['stdev']:>10.3f}us"
+        )
+        results.append(result)
+
+    by_name = {result["scenario"]: result for result in results}
+    comparisons = {
+        f"{a} / {b}": round(
+            by_name[a]["latency_us"]["p50"] / by_name[b]["latency_us"]["p50"], 2
+        )
+        for a, b in COMPARISONS
+        if a in by_name and b in by_name
+    }
+    for pair, ratio in comparisons.items():
+        print(f"{pair}: {ratio}x")  # noqa: T201
+
+    path = write_results(
+        "micro",
+        {
+            "benchmark": "micro",
+            "environment": environment(),
+            "config": {"repeat": args.repeat, "min_time": args.min_time},
+            "comparisons": comparisons,
+            "results": results,
+        },
+        args.output,
+    )
+    print(f"results saved to {path}")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def percentile(sorted_samples: list[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted samples, ``q`` in ``[0, 100]``"""
+    if not sorted_samples:
+        return 0.0
+    rank = max(math.ceil(q / 100 * len(sorted_samples)), 1)
+    return sorted_samples[rank - 1]
+
+
+def summarize(samples: Iterable[float], *, scale: float = 1000.0) -> dict[str, float]:
+    """Latency summary of ``samples`` (seconds), reported in ms by default"""
+    ordered = sorted(s * scale for s in samples)
+    if not ordered:
+        return {}
+
+    return {
+        "min": round(ordered[0], 4),
+        "mean": round(statistics.fmean(ordered), 4),
+        "stdev": round(statistics.pstdev(ordered), 4),
+        "p50": round(percentile(ordered, 50), 4),
+        "p95": round(percentile(ordered, 95), 4),
+        "p99": round(percentile(ordered, 99), 4),
+        "max": round(ordered[-1], 4),
+    }
+
+
+def environment() -> dict[str, Any]:
+    """What the numbers were measured on, to tell apart incomparable runs"""
+    try:
+        # fixed arguments, nothing comes from the user
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],  # noqa: S603, S607
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def write_results(name: str, payload: dict[str, Any], output: Path | None) -> Path:
+    """Save ``payload`` as JSON, by default to ``results/<name>-<timestamp>.json``"""
+    if output is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIR / f"{name}-{stamp}.json"
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(payload, indent=2, sort_keys=True) + "\n")
+    return output
@@ -2,4 +2,10 @@
 
 set -e
 
-exec uvicorn --factory app.main:create_app --host 0.0.0.0 --port 80
+# Prometheus multiprocess mode: every worker writes its samples here and
+# /metrics aggregates them, so the directory must be empty on boot
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}"
+rm -rf "${PROMETHEUS_MULTIPROC_DIR:?}" && mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+# one worker per CPU by default, see app/server/launcher.py for the settings
+exec python -m app.server.launcher
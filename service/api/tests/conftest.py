@@ -0,0 +1,93 @@
+"""Fixtures of the API tests.
+
+The app runs in-process against the Postgres database and the Redis named by
+``TEST_POSTGRES_DB`` and ``TEST_REDIS_URL``, the RabbitMQ plugin is swapped
+for an in-process fake. The schema is dropped and recreated and Redis flushed
+for every test, the suite doesn't run without them.
+"""
+
+import os
+from collections.abc import AsyncIterator
+from unittest import mock
+
+import pytest
+
+from app.utils.testing import use_test_services
+
+try:
+    use_test_services()
+except RuntimeError as ex:
+    raise pytest.UsageError(str(ex)) from None
+
+# every test client shares one address, the auth rate limits would reject them
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+from litestar import Litestar  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app.core import settings  # noqa: E402
+from app.core.config import alchemy_config  # noqa: E402
+from app.database.models import Base, User  # noqa: E402
+from app.domain.guards import o2auth  # noqa: E402
+from app.utils.message_brokers.testing import FakeConnection  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture
+async def app() -> AsyncIterator[Litestar]:
+    from app.main import create_app
+    from app.server import builder
+    from app.utils.message_brokers import RabbitMQConfig, RabbitMQPlugin
+
+    async with alchemy_config.get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    # the response and record caches would answer from the previous test
+    await settings.redis.instance.flushdb()
+
+    plugin = RabbitMQPlugin(config=RabbitMQConfig(connection=FakeConnection()))
+    with mock.patch.object(builder, "rabbitmq_plugin", plugin):
+        app = create_app()
+    yield app
+
+    # the pools are bound to this test's event loop
+    await alchemy_config.get_engine().dispose()
+    await settings.redis.instance.connection_pool.disconnect()
+
+
+@pytest.fixture
+async def client(app: Litestar) -> AsyncIterator[AsyncClient]:
+    # unlike litestar's test client, the ASGI transport runs the requests in the
+    # test's context: ``query_budget`` sees their queries
+    transport = ASGITransport(app=app)  # type: ignore[arg-type]
+    async with (
+        app.lifespan(),
+        AsyncClient(transport=transport, base_url="http://test") as client,
+    ):
+        yield client
+
+
+@pytest.fixture
+async def users(app: Litestar) -> list[int]:
+    """Ids of a superuser followed by regular users"""
+    rows = [
+        {
+            "email": f"user-{i}@example.com",
+            "hashed_password": "not-a-hash",
+            "is_superuser": i == 0,
+        }
+        for i in range(5)
+    ]
+    async with alchemy_config.get_engine().begin() as conn:
+        result = await conn.execute(insert(User).returning(User.id), rows)
+        return list(result.scalars())
+
+
+@pytest.fixture
+def auth_headers(users: list[int]) -> dict[str, str]:
+    return {"Authorization": f"Bearer {o2auth.create_token(identifier=str(users[0]))}"}
@@ -0,0 +1,55 @@
+import pytest
+from httpx import AsyncClient
+
+from app.domain.controllers.users import UserController
+from app.utils.sql import QueryBudgetExceededError, query_budget
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_get_user_within_budget(
+    client: AsyncClient, users: list[int], auth_headers: dict[str, str]
+) -> None:
+    budget = UserController.get_user.opt["query_budget"]
+    with query_budget(budget, label="GET /api/users/{id}"):
+        response = await client.get(f"/api/users/{users[1]}", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json()["email"] == "user-1@example.com"
+
+
+async def test_get_me_within_budget(
+    client: AsyncClient, auth_headers: dict[str, str]
+) -> None:
+    budget = UserController.get_me.opt["query_budget"]
+    with query_budget(budget, label="GET /api/users/me"):
+        response = await client.get("/api/users/me", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json()["is_superuser"] is True
+
+
+async def test_list_users_within_budget(
+    client: AsyncClient, users: list[int], auth_headers: dict[str, str]
+) -> None:
+    budget = UserController.get_users.opt["query_budget"]
+    # ``offset`` is the page number, from 1
+    with query_budget(budget, label="GET /api/users"):
+        response = await client.get(
+            "/api/users?limit=10&offset=1", headers=auth_headers
+        )
+
+    assert response.status_code == 200
+    assert response.json()["total"] == len(users)
+
+
+async def test_query_budget_lists_the_statements(
+    client: AsyncClient, users: list[int], auth_headers: dict[str, str]
+) -> None:
+    with (
+        pytest.raises(QueryBudgetExceededError, match="SELECT") as excinfo,
+        query_budget(0, label="GET /api/users"),
+    ):
+        await client.get("/api/users?limit=10&offset=1", headers=auth_headers)
+
+    assert "GET /api/users issued" in str(excinfo.value)